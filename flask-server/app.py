@@ -8,7 +8,13 @@ from models.submission import Submission
 from routes.assignments import assignments_bp
 from routes.auth import auth_bp
 from routes.users import users_bp
+from routes.profiling import profiling_bp
 from config import Config
+from utils.upload_stream import SpooledUploadRequest
+from utils.mongo_session import MongoSessionInterface
+from utils.metrics import init_metrics
+from utils.profiling import init_profiling
+from utils.structured_logging import configure_logging, init_request_logging
 import os
 import logging
 from datetime import timedelta
@@ -26,6 +32,11 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.config.from_object(Config)
 
+# JSON logs written off the request path by a background thread
+if app.config['STRUCTURED_LOGGING']:
+    configure_logging(level=getattr(logging, app.config['LOG_LEVEL'], logging.INFO))
+app.request_class = SpooledUploadRequest
+
 # Environment detection
 IS_PRODUCTION = os.getenv('FLASK_ENV') == 'production'
 logger.info(f"Running in {'PRODUCTION' if IS_PRODUCTION else 'DEVELOPMENT'} mode")
@@ -73,12 +84,15 @@ app.config.update(
     SESSION_COOKIE_HTTPONLY=True,
     SESSION_COOKIE_SAMESITE='None' if IS_PRODUCTION else 'Lax',
     SESSION_COOKIE_NAME='assignment_checker_session',
-    PERMANENT_SESSION_LIFETIME=timedelta(days=1),
-    SESSION_TYPE='filesystem'
+    PERMANENT_SESSION_LIFETIME=timedelta(days=1)
 )
 
-# Initialize Flask-Session
-Session(app)
+# Session storage: Mongo with a TTL index by default, Flask-Session's filesystem store on request
+if app.config['SESSION_BACKEND'] == 'filesystem':
+    app.config['SESSION_TYPE'] = 'filesystem'
+    Session(app)
+else:
+    app.session_interface = MongoSessionInterface(cache_ttl=app.config['SESSION_CACHE_TTL'])
 
 # Set secret key - use environment variable or generate a random one
 app.secret_key = os.getenv('SECRET_KEY', os.urandom(24).hex())
@@ -88,9 +102,9 @@ CORS(app,
     resources={r"/*": {
         "origins": allowed_origins,
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
+        "allow_headers": ["Content-Type", "Authorization", "Range", "If-None-Match", "If-Modified-Since", "If-Range"],
         "supports_credentials": True,
-        "expose_headers": ["Set-Cookie", "Access-Control-Allow-Origin"]
+        "expose_headers": ["Set-Cookie", "Access-Control-Allow-Origin", "X-Next-Cursor", "ETag", "Last-Modified", "Content-Range", "Accept-Ranges"]
     }})
 
 # Explicitly handle OPTIONS requests for all routes
@@ -103,12 +117,17 @@ def options_handler(path):
     origin = request.headers.get('Origin')
     if origin in allowed_origins:
         response.headers.add('Access-Control-Allow-Origin', origin)
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,Range,If-None-Match,If-Modified-Since,If-Range')
         response.headers.add('Access-Control-Allow-Methods', 'GET,POST,PUT,DELETE,OPTIONS')
         response.headers.add('Access-Control-Allow-Credentials', 'true')
 
     return response
 
+# Metrics must be set up before connecting so Mongo commands are timed
+init_metrics(app)
+init_profiling(app)
+init_request_logging(app)
+
 # MongoDB connection with error handling
 try:
     mongodb_uri = os.getenv('MONGODB_URI')
@@ -130,6 +149,7 @@ except Exception as e:
 app.register_blueprint(assignments_bp)
 app.register_blueprint(auth_bp)
 app.register_blueprint(users_bp)
+app.register_blueprint(profiling_bp)
 
 # Non-prefixed route handlers (to support both /api and non-/api routes)
 # Auth routes
@@ -173,28 +193,19 @@ def api_logout_direct():
         'message': 'Logout successful'
     })
 
-@app.before_request
-def log_request_info():
-    # Log every request for debugging
-    logger.info(f"Request: {request.method} {request.path}")
-    logger.info(f"Headers: Origin={request.headers.get('Origin')}, Content-Type={request.headers.get('Content-Type')}")
-    logger.info(f"Session data: {dict(session)}")
-
 @app.after_request
 def add_cors_headers(response):
-    # Log request details for debugging
-    logger.info(f"Request: {request.method} {request.path}")
-
     # Only add CORS headers if they aren't already present
     origin = request.headers.get('Origin')
     if origin in allowed_origins and 'Access-Control-Allow-Origin' not in response.headers:
         response.headers.add('Access-Control-Allow-Origin', origin)
         response.headers.add('Access-Control-Allow-Credentials', 'true')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,Range,If-None-Match,If-Modified-Since,If-Range')
         response.headers.add('Access-Control-Allow-Methods', 'GET,POST,PUT,DELETE,OPTIONS')
 
     # For debugging - check response headers
-    logger.debug(f"Response headers: {dict(response.headers)}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Response headers: %s", dict(response.headers))
     return response
 
 # Health check endpoints (accessible with or without /api prefix)
@@ -0,0 +1,170 @@
+"""
+Compressed field storage benchmark.
+
+Builds submission-sized payloads from the synthetic corpus: extracted
+essay text, and plagiarism_details with one comparison per classmate. Each
+codec and level is then measured for stored size, compression throughput
+and per-document decompression latency, which is what a full-document
+load now pays on first access to the field.
+
+With --mongodb-uri the same documents are also written to two scratch
+collections, one with raw fields and one compressed, and the collection
+sizes and full-document read latencies are compared.
+
+Usage (from flask-server/):
+    python benchmarks/bench_compression.py --documents 500 --class-size 200
+    python benchmarks/bench_compression.py --words 3000 --output compression.json
+    python benchmarks/bench_compression.py --mongodb-uri mongodb://localhost:27017/compression_bench
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import CorpusGenerator
+from utils.compression import compress, decompress, zstandard
+
+LEVELS = {'zlib': (1, 6, 9), 'zstd': (1, 3, 6, 12, 19)}
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[max(int(len(values) * pct / 100) - 1, 0)]
+
+
+def build_payloads(documents, class_size, words, seed):
+    rng = random.Random(seed)
+    texts = [d.text for d in CorpusGenerator(seed, words_per_document=words).generate(documents)]
+    details = []
+    for _ in range(documents):
+        comparisons = [
+            {'submission_id': '%024x' % rng.getrandbits(96), 'similarity_score': rng.random() * 100}
+            for _ in range(class_size - 1)
+        ]
+        score = max(c['similarity_score'] for c in comparisons)
+        details.append({'overall_score': score, 'comparisons': comparisons, 'exact_duplicates': []})
+    return {
+        'ocr_text': [text.encode('utf-8') for text in texts],
+        'plagiarism_details': [json.dumps(d, separators=(',', ':')).encode('utf-8') for d in details]
+    }
+
+
+def measure(field, payloads, codec, level):
+    raw_bytes = sum(len(p) for p in payloads)
+    started = time.perf_counter()
+    packed = [compress(p, codec, level) for p in payloads]
+    compress_seconds = time.perf_counter() - started
+
+    latencies = []
+    for payload in packed:
+        start = time.perf_counter()
+        decompress(payload)
+        latencies.append(time.perf_counter() - start)
+
+    stored = sum(len(p) for p in packed)
+    return {
+        'field': field,
+        'codec': codec,
+        'level': level,
+        'raw_bytes': raw_bytes,
+        'stored_bytes': stored,
+        'ratio': round(raw_bytes / stored, 2),
+        'compress_mb_s': round(raw_bytes / compress_seconds / 1e6, 1),
+        'decompress_p50_us': round(statistics.median(latencies) * 1e6, 1),
+        'decompress_p95_us': round(percentile(latencies, 95) * 1e6, 1),
+        'decompress_p99_us': round(percentile(latencies, 99) * 1e6, 1)
+    }
+
+
+def measure_mongo(uri, payloads, codec, level, reads):
+    """Raw versus compressed fields in real collections: size on disk and full-document read time."""
+    from bson import Binary
+    from pymongo import MongoClient
+
+    db = MongoClient(uri).get_default_database()
+    results = []
+    for variant in ('raw', 'compressed'):
+        collection = db[f'compression_bench_{variant}']
+        collection.drop()
+        documents = []
+        for i, (text, details) in enumerate(zip(payloads['ocr_text'], payloads['plagiarism_details'])):
+            if variant == 'raw':
+                documents.append({'_id': i, 'ocr_text': text.decode('utf-8'), 'plagiarism_details': json.loads(details)})
+            else:
+                documents.append({
+                    '_id': i,
+                    'ocr_text': Binary(compress(text, codec, level)),
+                    'plagiarism_details': Binary(compress(details, codec, level))
+                })
+        collection.insert_many(documents)
+        stats = db.command('collStats', collection.name)
+
+        latencies = []
+        rng = random.Random(0)
+        for _ in range(reads):
+            start = time.perf_counter()
+            document = collection.find_one({'_id': rng.randrange(len(documents))})
+            if variant == 'compressed':
+                decompress(document['ocr_text'])
+                json.loads(decompress(document['plagiarism_details']))
+            latencies.append(time.perf_counter() - start)
+
+        results.append({
+            'variant': variant,
+            'size_bytes': stats['size'],
+            'storage_bytes': stats['storageSize'],
+            'read_p50_ms': round(statistics.median(latencies) * 1000, 3),
+            'read_p95_ms': round(percentile(latencies, 95) * 1000, 3),
+            'read_p99_ms': round(percentile(latencies, 99) * 1000, 3)
+        })
+        collection.drop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documents', type=int, default=500)
+    parser.add_argument('--class-size', type=int, default=200, help='Comparisons per plagiarism_details')
+    parser.add_argument('--words', type=int, default=1500, help='Words per essay')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--mongodb-uri', help='Also compare real collections on this database')
+    parser.add_argument('--mongo-reads', type=int, default=2000)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    payloads = build_payloads(args.documents, args.class_size, args.words, args.seed)
+    codecs = ['zlib'] + (['zstd'] if zstandard else [])
+    if not zstandard:
+        print('zstandard is not installed; measuring zlib only')
+
+    results = {'codecs': []}
+    for field, field_payloads in payloads.items():
+        for codec in codecs:
+            for level in LEVELS[codec]:
+                results['codecs'].append(measure(field, field_payloads, codec, level))
+
+    print(f"{'field':<20}{'codec':<6}{'level':>6}{'ratio':>8}{'MB/s':>8}{'p50 us':>9}{'p99 us':>9}")
+    for r in results['codecs']:
+        print(f"{r['field']:<20}{r['codec']:<6}{r['level']:>6}{r['ratio']:>8}{r['compress_mb_s']:>8}"
+              f"{r['decompress_p50_us']:>9}{r['decompress_p99_us']:>9}")
+
+    if args.mongodb_uri:
+        codec = codecs[-1]
+        results['mongo'] = measure_mongo(args.mongodb_uri, payloads, codec, None, args.mongo_reads)
+        print(f"\n{'collection':<12}{'size':>12}{'storage':>12}{'p50 ms':>9}{'p99 ms':>9}")
+        for r in results['mongo']:
+            print(f"{r['variant']:<12}{r['size_bytes']:>12}{r['storage_bytes']:>12}{r['read_p50_ms']:>9}{r['read_p99_ms']:>9}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
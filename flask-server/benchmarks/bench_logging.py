@@ -0,0 +1,177 @@
+"""
+Request logging overhead benchmark.
+
+Compares the old per-request INFO logging (method, path, headers and the
+whole session dict before the request, the path again after it, and the
+full form on assignment creation) with the queue-based JSON access log,
+unsampled and with per-route sampling. Requests go through the Flask test
+client from several threads and every mode writes to a real file.
+
+Usage (from flask-server/):
+    python benchmarks/bench_logging.py --requests 20000 --threads 8
+    python benchmarks/bench_logging.py --modes verbose,sampled --output logging.json
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, request, session, jsonify
+from utils.structured_logging import configure_logging, init_request_logging, stop_logging
+
+MODES = ('verbose', 'structured', 'sampled')
+
+# Share of requests that are status polls; the rest create assignments
+POLL_RATIO = 0.9
+
+
+def build_app(mode, log_file):
+    app = Flask(__name__)
+    app.secret_key = 'bench'
+    logger = logging.getLogger('bench')
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    stop_logging()
+
+    handler = None
+    if mode == 'verbose':
+        # What logging.basicConfig(level=logging.INFO) gives every module
+        writer = logging.StreamHandler(log_file)
+        writer.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+        root.addHandler(writer)
+        root.setLevel(logging.INFO)
+
+        @app.before_request
+        def log_request_info():
+            logger.info(f"Request: {request.method} {request.path}")
+            logger.info(f"Headers: Origin={request.headers.get('Origin')}, Content-Type={request.headers.get('Content-Type')}")
+            logger.info(f"Session data: {dict(session)}")
+
+        @app.after_request
+        def log_after(response):
+            logger.info(f"Request: {request.method} {request.path}")
+            return response
+    else:
+        handler = configure_logging(stream=log_file)
+        if mode == 'sampled':
+            app.config['REQUEST_LOG_ROUTE_RATES'] = {'status': 0.05}
+        init_request_logging(app)
+
+    @app.route('/login', methods=['POST'])
+    def login():
+        session['user_id'] = '64b7f0c2a1e4c3d2b1a09876'
+        session['user_type'] = 'professor'
+        session['email'] = 'professor@example.edu'
+        return jsonify({'ok': True})
+
+    @app.route('/status')
+    def status():
+        return jsonify({'processing_status': 'Processing', 'user_id': session.get('user_id')})
+
+    @app.route('/create', methods=['POST'])
+    def create():
+        if mode == 'verbose':
+            logger.info(f"Form data: {request.form}")
+            logger.info(f"Received data: name={request.form.get('name')}, course={request.form.get('course')}, "
+                        f"description={request.form.get('description')}, due_date={request.form.get('due_date')}")
+            logger.info("Creating new assignment...")
+            logger.info("Saving assignment...")
+        else:
+            logger.info("Assignment created", extra={'fields': {'sections': len(request.form.getlist('sections[]'))}})
+        return jsonify({'id': 'new'}), 201
+
+    return app, handler
+
+
+def run_mode(mode, total_requests, threads):
+    fd, path = tempfile.mkstemp(prefix='logging-bench-', suffix='.log')
+    os.close(fd)
+    latencies = []
+    lock = threading.Lock()
+    per_thread = total_requests // threads
+    form = {
+        'name': 'Essay 3',
+        'course': 'CS101',
+        'description': 'Compare two sorting algorithms. ' * 20,
+        'due_date': '2026-12-01T23:59:00',
+        'sections[]': ['A', 'B']
+    }
+
+    with open(path, 'a') as log_file:
+        app, handler = build_app(mode, log_file)
+
+        def worker(seed):
+            client = app.test_client()
+            client.post('/login')
+            local = []
+            for i in range(per_thread):
+                start = time.perf_counter()
+                if (i + seed) % 10 < POLL_RATIO * 10:
+                    client.get('/status', headers={'Origin': 'http://localhost:3000'})
+                else:
+                    client.post('/create', data=form)
+                local.append(time.perf_counter() - start)
+            with lock:
+                latencies.extend(local)
+
+        started = time.perf_counter()
+        pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        # Drain the writer so the file holds everything that was logged
+        stop_logging()
+
+    with open(path) as f:
+        lines = sum(1 for _ in f)
+    size = os.path.getsize(path)
+    os.remove(path)
+
+    latencies.sort()
+    return {
+        'mode': mode,
+        'requests': len(latencies),
+        'threads': threads,
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 3),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 3),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 3),
+        'log_lines': lines,
+        'log_bytes': size,
+        'dropped': handler.dropped if handler else 0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = [run_mode(mode.strip(), args.requests, args.threads) for mode in args.modes.split(',')]
+
+    print(f"{'mode':<12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'lines':>10}{'dropped':>10}")
+    for result in results:
+        print(f"{result['mode']:<12}{result['throughput_rps']:>10}{result['p50_ms']:>10}"
+              f"{result['p95_ms']:>10}{result['p99_ms']:>10}{result['log_lines']:>10}{result['dropped']:>10}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
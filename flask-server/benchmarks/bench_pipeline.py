@@ -0,0 +1,402 @@
+"""
+End-to-end benchmark of the upload-to-verdict pipeline.
+
+Builds a synthetic corpus (benchmarks/corpus.py) with planted exact copies
+and paraphrases, then times each stage on its own:
+
+    pdf_extraction     DocumentProcessor text extraction of typed PDFs
+    ocr                OCRProcessor on scanned-style PDFs (needs Tesseract)
+    cheating_detector  CheatingDetector exact-copy and paraphrase passes,
+                       with precision and recall against the planted pairs
+    similarity         SimilarityChecker answer scoring (needs sentence-transformers)
+    end_to_end         submit_assignment through the Flask app until every
+                       submission is Completed (needs a mongod; uses the
+                       processing timelines the pipeline records)
+
+Per-document stages run on a sample; class-size stages run once per size.
+A stage whose dependencies are missing is recorded as skipped. Results are
+written as JSON so runs can be diffed.
+
+Usage (from flask-server/):
+    python benchmarks/bench_pipeline.py --sizes 50,500,2000,10000 --output pipeline.json
+    MONGODB_URI=mongodb://localhost:27017/pipeline_bench \\
+        python benchmarks/bench_pipeline.py --stages end_to_end --e2e-sizes 50,500
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import CorpusGenerator, planted_pairs, render_pdf
+
+STAGES = ('pdf_extraction', 'ocr', 'cheating_detector', 'similarity', 'end_to_end')
+
+
+class Skipped(Exception):
+    """A stage cannot run in this environment."""
+
+
+def summarize(seconds):
+    """Latency summary of a list of durations, in milliseconds."""
+    if not seconds:
+        return {}
+    ordered = sorted(seconds)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 3)
+
+    return {
+        'count': len(ordered),
+        'total_s': round(sum(ordered), 4),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+        'p50_ms': pick(0.50),
+        'p95_ms': pick(0.95),
+        'p99_ms': pick(0.99),
+        'max_ms': round(ordered[-1] * 1000, 3)
+    }
+
+
+def score_pairs(found, planted):
+    """Precision and recall of detected id pairs against the planted ones."""
+    found = {frozenset(pair) for pair in found}
+    hits = len(found & planted)
+    return {
+        'found': len(found),
+        'planted': len(planted),
+        'precision': round(hits / len(found), 4) if found else None,
+        'recall': round(hits / len(planted), 4) if planted else None
+    }
+
+
+def group_pairs(cases):
+    """Expand detector cases, whose id lists can hold a whole group, into pairs."""
+    pairs = []
+    for case in cases:
+        ids = case['submission_ids']
+        pairs.extend((a, b) for i, a in enumerate(ids) for b in ids[i + 1:])
+    return pairs
+
+
+def bench_pdf_extraction(corpus, args):
+    from utils.document_processor import DocumentProcessor
+
+    processor = DocumentProcessor()
+    typed = [doc for doc in corpus if doc.kind == 'typed'][:args.sample]
+    per_document, per_page, pages = [], [], 0
+    for doc in typed:
+        pdf = render_pdf(doc)
+        page_count = []
+        start = time.perf_counter()
+        processor._extract_text_from_pdf(pdf, progress_callback=lambda page, total: page_count.append(total))
+        elapsed = time.perf_counter() - start
+        per_document.append(elapsed)
+        if page_count:
+            pages += page_count[-1]
+            per_page.append(elapsed / page_count[-1])
+    return {
+        'per_document': summarize(per_document),
+        'per_page': summarize(per_page),
+        'pages': pages
+    }
+
+
+def bench_ocr(corpus, args):
+    try:
+        import pytesseract
+        pytesseract.get_tesseract_version()
+    except Exception as e:
+        raise Skipped(f"Tesseract unavailable: {e}")
+    from ml_models.ocr_processor import OCRProcessor
+
+    processor = OCRProcessor()
+    scanned = [doc for doc in corpus if doc.kind == 'scanned'][:args.ocr_sample]
+    per_document, word_recall = [], []
+    with tempfile.TemporaryDirectory() as workdir:
+        for doc in scanned:
+            path = os.path.join(workdir, f"{doc.id}.pdf")
+            with open(path, 'wb') as f:
+                f.write(render_pdf(doc))
+            start = time.perf_counter()
+            text = processor.extract_text_from_pdf(path)
+            per_document.append(time.perf_counter() - start)
+            expected = set(doc.text.lower().replace('.', '').split())
+            recognized = set(text.lower().split())
+            word_recall.append(len(expected & recognized) / len(expected))
+    return {
+        'per_document': summarize(per_document),
+        'word_recall': round(statistics.fmean(word_recall), 4) if word_recall else None
+    }
+
+
+def bench_cheating_detector(corpus, size, args):
+    from ml_models.cheating_detector import CheatingDetector
+
+    documents = corpus[:size]
+    planted = planted_pairs(documents)
+    submissions = [{'id': doc.id, 'text': doc.text} for doc in documents]
+    detector = CheatingDetector()
+
+    start = time.perf_counter()
+    exact = detector.detect_exact_copies(submissions)
+    exact_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    paraphrases = detector.detect_paraphrases(submissions)
+    paraphrase_s = time.perf_counter() - start
+
+    return {
+        'exact_copies_s': round(exact_s, 4),
+        'paraphrases_s': round(paraphrase_s, 4),
+        'total_s': round(exact_s + paraphrase_s, 4),
+        'exact_copies': score_pairs(group_pairs(exact), planted['exact']),
+        # A paraphrase pass also flags exact copies, so score it against both
+        'paraphrases': score_pairs(group_pairs(paraphrases), planted['paraphrase'] | planted['exact'])
+    }
+
+
+def bench_similarity(corpus, args):
+    try:
+        from ml_models.similarity_checker import SimilarityChecker
+    except ImportError as e:
+        raise Skipped(f"sentence-transformers unavailable: {e}")
+
+    by_id = {doc.id: doc for doc in corpus}
+    pairs = [
+        (doc.text, by_id[doc.source_id].text)
+        for doc in corpus if doc.relation == 'paraphrase'
+    ][:args.sample]
+    if not pairs:
+        raise Skipped('No paraphrases in the corpus')
+
+    start = time.perf_counter()
+    checker = SimilarityChecker()
+    load_s = time.perf_counter() - start
+
+    per_pair = []
+    for answer, reference in pairs:
+        start = time.perf_counter()
+        checker.check_answer_correctness(answer, reference)
+        per_pair.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    checker.batch_check_answers([a for a, _ in pairs], [r for _, r in pairs])
+    batch_s = time.perf_counter() - start
+
+    return {
+        'model_load_s': round(load_s, 4),
+        'per_pair': summarize(per_pair),
+        'batch_s': round(batch_s, 4),
+        'batch_pairs': len(pairs)
+    }
+
+
+def bench_end_to_end(corpus, size, args):
+    if not os.getenv('MONGODB_URI'):
+        raise Skipped('Set MONGODB_URI to a scratch database to run the end-to-end stage')
+
+    from app import app
+    from models.user import User
+    from models.assignment import Assignment
+    from models.submission import Submission
+    from utils.timeline import stage_percentiles
+    from utils.blob_store import release_blob
+
+    documents = corpus[:size]
+    run = datetime.datetime.utcnow().strftime('%Y%m%d%H%M%S')
+    professor = User(
+        email=f"bench-prof-{run}@example.edu", password_hash='-', first_name='Bench',
+        last_name='Professor', user_type='professor', is_professor=True
+    ).save()
+    students = User.objects.insert([
+        User(email=f"bench-{run}-{doc.id}@example.edu", password_hash='-', first_name='Bench',
+             last_name=doc.id, user_type='student', section='A')
+        for doc in documents
+    ])
+    assignment = Assignment(
+        name=f"Benchmark {run}", course='BENCH', description='Synthetic pipeline benchmark',
+        due_date=datetime.datetime.utcnow() + datetime.timedelta(days=1), sections=['A'], professor=professor
+    )
+    assignment.question_file.put(b'%PDF-1.4\n', content_type='application/pdf', filename='question.pdf')
+    assignment.save()
+
+    pdfs = [render_pdf(doc) for doc in documents]
+    submit_latency = []
+    errors = []
+    lock = threading.Lock()
+
+    def submitter(indices):
+        client = app.test_client()
+        local = []
+        for i in indices:
+            with client.session_transaction() as session:
+                session['user_id'] = str(students[i].id)
+                session['user_type'] = 'student'
+            start = time.perf_counter()
+            response = client.post(
+                f"/api/assignments/submit/{assignment.id}",
+                data={'answerFile': (io.BytesIO(pdfs[i]), f"{documents[i].id}.pdf", 'application/pdf')},
+                content_type='multipart/form-data'
+            )
+            local.append(time.perf_counter() - start)
+            if response.status_code != 201:
+                with lock:
+                    errors.append(response.status_code)
+        with lock:
+            submit_latency.extend(local)
+
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=submitter, args=(range(k, size, args.clients),))
+        for k in range(args.clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    submitted_s = time.perf_counter() - started
+
+    # Wait for the background pipeline to finish every submission
+    deadline = time.monotonic() + args.e2e_timeout
+    while time.monotonic() < deadline:
+        pending = Submission.objects(assignment=assignment.id, processing_status__in=['Pending', 'Processing']).count()
+        if not pending:
+            break
+        time.sleep(1)
+    all_done_s = time.perf_counter() - started
+
+    timelines = [
+        doc['processing_timeline']
+        for doc in Submission.objects(assignment=assignment.id, processing_timeline__exists=True)
+        .only('processing_timeline').as_pymongo()
+    ]
+    statuses = {
+        status: Submission.objects(assignment=assignment.id, processing_status=status).count()
+        for status in ('Pending', 'Processing', 'Completed', 'Failed')
+    }
+
+    if not args.keep_data:
+        # Answer files are deduplicated blobs the next class size reuses, so
+        # only references are dropped; the collector deletes the files
+        for submission in Submission.objects(assignment=assignment.id):
+            release_blob(submission.answer_file, submission.answer_file.grid_id)
+            submission.delete()
+        release_blob(assignment.question_file, assignment.question_file.grid_id)
+        assignment.delete()
+        User.objects(id__in=[student.id for student in students] + [professor.id]).delete()
+
+    return {
+        'submit_request': summarize(submit_latency),
+        'submit_errors': len(errors),
+        'all_submitted_s': round(submitted_s, 4),
+        'all_completed_s': round(all_done_s, 4),
+        'timed_out': statuses['Pending'] + statuses['Processing'] > 0,
+        'statuses': statuses,
+        # Seconds from queueing to Completed, per stage and in total
+        'stages': stage_percentiles(timelines)
+    }
+
+
+def run_stage(name, fn, *fn_args):
+    print(f"Running {name}...", file=sys.stderr)
+    start = time.perf_counter()
+    try:
+        result = fn(*fn_args)
+        status = 'ok'
+    except Skipped as e:
+        result, status = {'reason': str(e)}, 'skipped'
+    except ImportError as e:
+        result, status = {'reason': f"Missing dependency: {e}"}, 'skipped'
+    return {'stage': name, 'status': status, 'wall_s': round(time.perf_counter() - start, 4), **result}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def parse_sizes(value):
+    return [int(size) for size in value.split(',') if size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stages', default=','.join(STAGES))
+    parser.add_argument('--sizes', default='50,500,2000,10000', help='Class sizes for the detector stage')
+    parser.add_argument('--e2e-sizes', default='50,500', help='Class sizes for the end-to-end stage')
+    parser.add_argument('--sample', type=int, default=200, help='Documents timed by per-document stages')
+    parser.add_argument('--ocr-sample', type=int, default=10)
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent submitters in the end-to-end stage')
+    parser.add_argument('--e2e-timeout', type=float, default=1800)
+    parser.add_argument('--keep-data', action='store_true', help='Leave end-to-end data in the database')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--exact-rate', type=float, default=0.05)
+    parser.add_argument('--paraphrase-rate', type=float, default=0.05)
+    parser.add_argument('--scanned-rate', type=float, default=0.2)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    stages = [stage.strip() for stage in args.stages.split(',')]
+    sizes = parse_sizes(args.sizes)
+    e2e_sizes = parse_sizes(args.e2e_sizes)
+    largest = max(sizes + e2e_sizes + [args.sample])
+
+    started_at = datetime.datetime.utcnow()
+    start = time.perf_counter()
+    corpus = CorpusGenerator(args.seed).generate(
+        largest, args.exact_rate, args.paraphrase_rate, args.scanned_rate
+    )
+    corpus_s = time.perf_counter() - start
+
+    results = []
+    if 'pdf_extraction' in stages:
+        results.append(run_stage('pdf_extraction', bench_pdf_extraction, corpus, args))
+    if 'ocr' in stages:
+        results.append(run_stage('ocr', bench_ocr, corpus, args))
+    if 'cheating_detector' in stages:
+        for size in sizes:
+            results.append({'class_size': size, **run_stage('cheating_detector', bench_cheating_detector, corpus, size, args)})
+    if 'similarity' in stages:
+        results.append(run_stage('similarity', bench_similarity, corpus, args))
+    if 'end_to_end' in stages:
+        for size in e2e_sizes:
+            results.append({'class_size': size, **run_stage('end_to_end', bench_end_to_end, corpus, size, args)})
+
+    report = {
+        'meta': {
+            'started_at': started_at.isoformat() + 'Z',
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'corpus_seconds': round(corpus_s, 4),
+            'args': vars(args)
+        },
+        'results': results
+    }
+
+    for result in results:
+        size = f" n={result['class_size']}" if 'class_size' in result else ''
+        print(f"{result['stage']}{size}: {result['status']} in {result['wall_s']}s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
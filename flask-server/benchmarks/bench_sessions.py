@@ -0,0 +1,138 @@
+"""
+Session backend throughput benchmark.
+
+Compares Flask-Session's filesystem store with MongoSessionInterface on a
+mix of session-reading and session-writing requests, driven through the
+Flask test client from several threads.
+
+Usage (from flask-server/, with a local mongod running):
+    python benchmarks/bench_sessions.py --requests 5000 --threads 8 --write-ratio 0.1
+    MONGODB_URI=mongodb://localhost:27017/session_bench python benchmarks/bench_sessions.py --output sessions.json
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, session, jsonify
+from mongoengine import connect, disconnect
+from flask_session import Session
+from utils.mongo_session import MongoSessionInterface
+
+
+def build_app(backend, workdir):
+    app = Flask(__name__)
+    app.secret_key = 'bench'
+    app.config['PERMANENT_SESSION_LIFETIME'] = 86400
+
+    if backend == 'filesystem':
+        app.config.update(SESSION_TYPE='filesystem', SESSION_FILE_DIR=workdir)
+        Session(app)
+    else:
+        app.session_interface = MongoSessionInterface(collection_name='bench_sessions', cache_ttl=5)
+
+    @app.route('/login', methods=['POST'])
+    def login():
+        session.clear()
+        session['user_id'] = 'bench-user'
+        session['user_type'] = 'student'
+        session.permanent = True
+        return jsonify({'ok': True})
+
+    @app.route('/read')
+    def read():
+        return jsonify({'user_id': session.get('user_id')})
+
+    @app.route('/write', methods=['POST'])
+    def write():
+        session['counter'] = session.get('counter', 0) + 1
+        return jsonify({'counter': session['counter']})
+
+    return app
+
+
+def run_backend(backend, total_requests, threads, write_ratio):
+    workdir = tempfile.mkdtemp(prefix='session-bench-')
+    app = build_app(backend, workdir)
+    latencies = []
+    lock = threading.Lock()
+    per_thread = total_requests // threads
+
+    def worker(seed):
+        rng = random.Random(seed)
+        client = app.test_client()
+        client.post('/login')
+        local = []
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            if rng.random() < write_ratio:
+                client.post('/write')
+            else:
+                client.get('/read')
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    if backend == 'mongodb':
+        app.session_interface.collection.drop()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    latencies.sort()
+    return {
+        'backend': backend,
+        'requests': len(latencies),
+        'threads': threads,
+        'write_ratio': write_ratio,
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 3),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 3),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--write-ratio', type=float, default=0.1)
+    parser.add_argument('--backends', default='filesystem,mongodb')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    connect(host=os.getenv('MONGODB_URI', 'mongodb://localhost:27017/session_bench'))
+    try:
+        results = [
+            run_backend(backend.strip(), args.requests, args.threads, args.write_ratio)
+            for backend in args.backends.split(',')
+        ]
+    finally:
+        disconnect()
+
+    print(f"{'backend':<12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for result in results:
+        print(f"{result['backend']:<12}{result['throughput_rps']:>10}{result['p50_ms']:>10}"
+              f"{result['p95_ms']:>10}{result['p99_ms']:>10}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
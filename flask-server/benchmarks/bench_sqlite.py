@@ -0,0 +1,246 @@
+"""
+SQLite connection layer benchmark.
+
+Runs a mix of reads (verify_session, get_assignments) and writes
+(save_submission, update_submission_analysis) from several threads against
+a scratch database built from schema.sql, in two modes:
+
+    legacy  a new sqlite3.connect per call, rollback journal, commit and close
+    pooled  the per-thread WAL connections in utils/db_utils.py
+
+Reports throughput, p50/p95/p99 latency and "database is locked" errors.
+
+Usage (from flask-server/):
+    python benchmarks/bench_sqlite.py --threads 8 --operations 2000
+    python benchmarks/bench_sqlite.py --write-ratio 0.5 --output sqlite.json
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.db_utils as db_utils
+
+MODES = ('legacy', 'pooled')
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'schema.sql')
+
+STUDENTS = 200
+ASSIGNMENTS = 20
+
+
+class LegacyBackend:
+    """The query patterns of the old db_utils: connect, run, commit, close."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def verify_session(self, token):
+        conn = self._connect()
+        try:
+            return conn.execute('''
+                SELECT u.id, u.email, u.full_name, u.user_type
+                FROM sessions s
+                JOIN users u ON s.user_id = u.id
+                WHERE s.token = ? AND s.expires_at > ? AND s.is_valid = 1
+            ''', (token, datetime.now())).fetchone()
+        finally:
+            conn.close()
+
+    def get_assignments(self, user_id, user_type):
+        conn = self._connect()
+        try:
+            return conn.execute('''
+                SELECT a.*, c.name as course_name,
+                       CASE WHEN s.id IS NOT NULL THEN 1 ELSE 0 END as is_submitted
+                FROM assignments a
+                JOIN courses c ON a.course_id = c.id
+                JOIN course_enrollments ce ON ce.course_id = c.id
+                LEFT JOIN submissions s ON s.assignment_id = a.id AND s.student_id = ?
+                WHERE ce.student_id = ? AND a.status = 'active'
+                ORDER BY a.due_date ASC
+            ''', (user_id, user_id)).fetchall()
+        finally:
+            conn.close()
+
+    def save_submission(self, student_id, assignment_id, file_path, extracted_text, word_count):
+        conn = self._connect()
+        try:
+            cursor = conn.execute('''
+                INSERT INTO submissions (student_id, assignment_id, file_path,
+                                       extracted_text, word_count, correctness)
+                VALUES (?, ?, ?, ?, ?, 'pending')
+            ''', (student_id, assignment_id, file_path, extracted_text, word_count))
+            conn.commit()
+            return cursor.lastrowid
+        finally:
+            conn.close()
+
+    def update_submission_analysis(self, submission_id, similarity_score, correctness):
+        conn = self._connect()
+        try:
+            conn.execute('''
+                UPDATE submissions
+                SET similarity_score = ?, correctness = ?
+                WHERE id = ?
+            ''', (similarity_score, correctness, submission_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def seed_database(path):
+    """Users, one course, enrollments, assignments and a live session per student."""
+    conn = sqlite3.connect(path)
+    with open(SCHEMA_PATH) as f:
+        conn.executescript(f.read())
+    conn.execute("INSERT INTO users (email, password_hash, full_name, user_type) VALUES ('prof@example.edu', 'x', 'Prof', 'professor')")
+    conn.execute("INSERT INTO courses (name, code, professor_id) VALUES ('Course', 'C101', 1)")
+    expires = datetime.now() + timedelta(days=7)
+    tokens = []
+    student_ids = []
+    for i in range(STUDENTS):
+        cursor = conn.execute(
+            "INSERT INTO users (email, password_hash, full_name, user_type) VALUES (?, 'x', ?, 'student')",
+            (f'student{i}@example.edu', f'Student {i}')
+        )
+        student_ids.append(cursor.lastrowid)
+        conn.execute('INSERT INTO course_enrollments (student_id, course_id) VALUES (?, 1)', (cursor.lastrowid,))
+        token = f'token-{i:05d}'
+        conn.execute('INSERT INTO sessions (user_id, token, expires_at, is_valid) VALUES (?, ?, ?, 1)',
+                     (cursor.lastrowid, token, expires))
+        tokens.append(token)
+    for i in range(ASSIGNMENTS):
+        conn.execute(
+            "INSERT INTO assignments (professor_id, course_id, name, due_date) VALUES (1, 1, ?, ?)",
+            (f'Assignment {i}', expires)
+        )
+    conn.commit()
+    conn.close()
+    return student_ids, tokens
+
+
+def run_mode(mode, threads, operations, write_ratio, seed):
+    workdir = tempfile.mkdtemp(prefix='sqlite-bench-')
+    path = os.path.join(workdir, 'bench.db')
+    student_ids, tokens = seed_database(path)
+
+    if mode == 'pooled':
+        db_utils.pool = db_utils.ConnectionPool(path)
+        backend = db_utils
+    else:
+        backend = LegacyBackend(path)
+
+    latencies = {'read': [], 'write': []}
+    errors = {'locked': 0, 'other': 0}
+    lock = threading.Lock()
+    text = 'lorem ipsum dolor sit amet ' * 200
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        local = {'read': [], 'write': []}
+        local_errors = {'locked': 0, 'other': 0}
+        submitted = []
+        for _ in range(operations):
+            is_write = rng.random() < write_ratio
+            start = time.perf_counter()
+            try:
+                if is_write:
+                    if submitted and rng.random() < 0.5:
+                        backend.update_submission_analysis(rng.choice(submitted), rng.random(), 'correct')
+                    else:
+                        submission_id = backend.save_submission(
+                            rng.choice(student_ids), rng.randint(1, ASSIGNMENTS), '/uploads/bench.pdf', text, 1000
+                        )
+                        if submission_id:
+                            submitted.append(submission_id)
+                elif rng.random() < 0.5:
+                    backend.verify_session(rng.choice(tokens))
+                else:
+                    backend.get_assignments(rng.choice(student_ids), 'student')
+            except sqlite3.OperationalError as e:
+                local_errors['locked' if 'locked' in str(e) else 'other'] += 1
+                continue
+            local['write' if is_write else 'read'].append(time.perf_counter() - start)
+        if mode == 'pooled':
+            db_utils.pool.close()
+        with lock:
+            for kind in local:
+                latencies[kind].extend(local[kind])
+            for kind in local_errors:
+                errors[kind] += local_errors[kind]
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {
+        'mode': mode,
+        'threads': threads,
+        'operations': sum(len(v) for v in latencies.values()),
+        'write_ratio': write_ratio,
+        'throughput_ops': round(sum(len(v) for v in latencies.values()) / elapsed, 1),
+        'locked_errors': errors['locked'],
+        'other_errors': errors['other']
+    }
+    for kind, values in latencies.items():
+        values.sort()
+        if not values:
+            continue
+        result[kind] = {
+            'count': len(values),
+            'p50_ms': round(statistics.median(values) * 1000, 3),
+            'p95_ms': round(values[max(int(len(values) * 0.95) - 1, 0)] * 1000, 3),
+            'p99_ms': round(values[max(int(len(values) * 0.99) - 1, 0)] * 1000, 3)
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--operations', type=int, default=2000, help='Operations per thread')
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = [
+        run_mode(mode.strip(), args.threads, args.operations, args.write_ratio, args.seed)
+        for mode in args.modes.split(',')
+    ]
+
+    print(f"{'mode':<8}{'ops/s':>10}{'read p50':>10}{'read p99':>10}{'write p50':>11}{'write p99':>11}{'locked':>8}")
+    for result in results:
+        read = result.get('read', {})
+        write = result.get('write', {})
+        print(f"{result['mode']:<8}{result['throughput_ops']:>10}{read.get('p50_ms', '-'):>10}{read.get('p99_ms', '-'):>10}"
+              f"{write.get('p50_ms', '-'):>11}{write.get('p99_ms', '-'):>11}{result['locked_errors']:>8}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
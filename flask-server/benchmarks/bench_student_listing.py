@@ -0,0 +1,189 @@
+"""
+Student dashboard listing benchmark.
+
+Seeds a scratch database on a local mongod with ``--assignments`` active
+and archived assignments spread over ``--sections`` sections, students in
+those sections and a few submissions per student, then times the student
+listing two ways for randomly picked students:
+
+    legacy     every active assignment in the system, serialized with
+               to_json (one professor lookup each), joined in Python with
+               a dict of the student's submissions
+    section    utils.student_listing.student_assignments: one aggregation
+               over the multikey sections index with the submission and
+               professor attached by $lookup
+
+The legacy path reads the whole institution on every call, so it gets its
+own, smaller iteration count.
+
+Usage (from flask-server/, with mongod on localhost):
+    python benchmarks/bench_student_listing.py --assignments 100000 --sections 500
+    python benchmarks/bench_student_listing.py --iterations 500 --legacy-iterations 0 --output listing.json
+    MONGODB_URI=mongodb://localhost:27017/listing_bench python benchmarks/bench_student_listing.py --keep-data
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from mongoengine import connect, disconnect
+from models.user import User
+from models.assignment import Assignment
+from models.submission import Submission
+from utils.identity import referenced_id
+from utils.student_listing import student_assignments
+
+MODELS = (User, Assignment, Submission)
+INSERT_BATCH = 10000
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[max(int(len(values) * pct / 100) - 1, 0)]
+
+
+def insert_batched(model, documents):
+    collection = model._get_collection()
+    for start in range(0, len(documents), INSERT_BATCH):
+        collection.insert_many(documents[start:start + INSERT_BATCH], ordered=False)
+
+
+def seed(args):
+    """Insert professors, students, assignments and submissions; return the students as (id, section)."""
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    sections = [f'S{i:04d}' for i in range(args.sections)]
+
+    professors = [ObjectId() for _ in range(max(args.sections // 5, 1))]
+    students = [(ObjectId(), rng.choice(sections)) for _ in range(args.students)]
+    insert_batched(User, [
+        {'_id': oid, 'email': f'prof{i}@example.edu', 'password_hash': 'x', 'first_name': 'Prof',
+         'last_name': str(i), 'user_type': 'professor', 'is_professor': True}
+        for i, oid in enumerate(professors)
+    ] + [
+        {'_id': oid, 'email': f'student{i}@example.edu', 'password_hash': 'x', 'first_name': 'Student',
+         'last_name': str(i), 'user_type': 'student', 'section': section}
+        for i, (oid, section) in enumerate(students)
+    ])
+
+    by_section = {section: [] for section in sections}
+    assignments = []
+    for i in range(args.assignments):
+        assignment_sections = rng.sample(sections, rng.randint(1, 3))
+        is_active = rng.random() < args.active_ratio
+        document = {
+            '_id': ObjectId(), 'name': f'Assignment {i}', 'course': f'CS{100 + i % 50}',
+            'description': 'Seeded for the student listing benchmark', 'due_date': now + timedelta(days=7),
+            'question_file': ObjectId(), 'sections': assignment_sections, 'status': 'Active',
+            'professor': rng.choice(professors), 'created_at': now - timedelta(seconds=i), 'is_active': is_active
+        }
+        assignments.append(document)
+        if is_active:
+            for section in assignment_sections:
+                by_section[section].append(document['_id'])
+    insert_batched(Assignment, assignments)
+
+    submissions = []
+    for student, section in students:
+        open_assignments = by_section[section]
+        for assignment in rng.sample(open_assignments, min(args.submissions_per_student, len(open_assignments))):
+            submissions.append({
+                '_id': ObjectId(), 'student': student, 'assignment': assignment, 'answer_file': ObjectId(),
+                'status': 'Submitted', 'grade': None, 'submitted_at': now - timedelta(minutes=rng.randrange(10000)),
+                'processing_status': 'Completed'
+            })
+    insert_batched(Submission, submissions)
+
+    for model in MODELS:
+        model.ensure_indexes()
+    return students
+
+
+def legacy_listing(student_id, section):
+    """The listing as it was built before it became section-scoped."""
+    submissions = Submission.objects(student=student_id)
+    submission_map = {referenced_id(sub, 'assignment'): sub for sub in submissions}
+    listing = []
+    for assignment in Assignment.objects(is_active=True):
+        data = assignment.to_json()
+        submission = submission_map.get(str(assignment.id))
+        data.update({
+            'status': submission.status if submission else 'Not Started',
+            'grade': submission.grade if submission else None,
+            'submitted_at': submission.submitted_at.isoformat() if submission and submission.submitted_at else None
+        })
+        listing.append(data)
+    return listing
+
+
+def run(name, listing, students, iterations, rng):
+    latencies, sizes = [], []
+    for _ in range(iterations):
+        student_id, section = rng.choice(students)
+        start = time.perf_counter()
+        result = listing(student_id, section)
+        latencies.append(time.perf_counter() - start)
+        sizes.append(len(result))
+    return {
+        'path': name,
+        'iterations': iterations,
+        'mean_assignments': round(statistics.mean(sizes), 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mongodb-uri', default=os.getenv('MONGODB_URI', 'mongodb://localhost:27017/listing_bench'))
+    parser.add_argument('--assignments', type=int, default=100000)
+    parser.add_argument('--sections', type=int, default=500)
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--submissions-per-student', type=int, default=10)
+    parser.add_argument('--active-ratio', type=float, default=0.8, help='Share of assignments still active')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--legacy-iterations', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keep-data', action='store_true', help='Leave the seeded database in place')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    connect(host=args.mongodb_uri)
+    for model in MODELS:
+        model.drop_collection()
+    try:
+        started = time.perf_counter()
+        students = seed(args)
+        print(f"Seeded {args.assignments} assignments in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        rng = random.Random(args.seed)
+        results = [run('section', lambda sid, section: student_assignments(str(sid), section),
+                       students, args.iterations, rng)]
+        if args.legacy_iterations:
+            results.append(run('legacy', legacy_listing, students, args.legacy_iterations, rng))
+    finally:
+        if not args.keep_data:
+            for model in MODELS:
+                model.drop_collection()
+        disconnect()
+
+    print(f"{'path':<10}{'runs':>6}{'rows':>10}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}")
+    for r in results:
+        print(f"{r['path']:<10}{r['iterations']:>6}{r['mean_assignments']:>10}{r['p50_ms']:>12}"
+              f"{r['p95_ms']:>12}{r['p99_ms']:>12}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'assignments': args.assignments, 'sections': args.sections, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
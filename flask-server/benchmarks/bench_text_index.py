@@ -0,0 +1,121 @@
+"""
+Full-text candidate retrieval benchmark.
+
+Builds a scratch SQLite database from schema.sql, loads the extracted text
+of a synthetic corpus (benchmarks/corpus.py) with planted paraphrases into
+one assignment, then takes a random ``--excerpt-words`` excerpt of every
+paraphrased submission and asks utils.db_utils.find_candidate_sources for
+its top ``--top`` candidates, excluding the submission itself. Reports how
+many queries found the planted source and the query latency.
+
+Usage (from flask-server/):
+    python benchmarks/bench_text_index.py
+    python benchmarks/bench_text_index.py --size 5000 --top 10 --output text_index.json
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import utils.db_utils as db_utils
+from corpus import CorpusGenerator
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'schema.sql')
+ASSIGNMENT_ID = 1
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[max(int(len(values) * pct / 100) - 1, 0)]
+
+
+def seed(path, documents):
+    """Create the schema and one submission per document; return document id -> submission id."""
+    conn = sqlite3.connect(path)
+    with open(SCHEMA_PATH) as f:
+        conn.executescript(f.read())
+    conn.execute(
+        "INSERT INTO users (id, email, password_hash, full_name, user_type) "
+        "VALUES (1, 'prof@example.edu', 'x', 'Prof', 'professor')"
+    )
+    conn.execute("INSERT INTO courses (id, name, code, professor_id) VALUES (1, 'Bench', 'BENCH', 1)")
+    conn.execute(
+        "INSERT INTO assignments (id, professor_id, course_id, name) VALUES (?, 1, 1, 'Text index benchmark')",
+        (ASSIGNMENT_ID,)
+    )
+    rows = {}
+    for number, document in enumerate(documents, start=1):
+        conn.execute(
+            "INSERT INTO submissions (id, student_id, assignment_id, file_path, extracted_text, word_count) "
+            "VALUES (?, 1, ?, ?, ?, ?)",
+            (number, ASSIGNMENT_ID, f"{document.id}.pdf", document.text, len(document.text.split()))
+        )
+        rows[document.id] = number
+    conn.commit()
+    conn.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=2000, help='Submissions in the corpus')
+    parser.add_argument('--paraphrase-rate', type=float, default=0.05)
+    parser.add_argument('--excerpt-words', type=int, default=60)
+    parser.add_argument('--top', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    documents = CorpusGenerator(seed=args.seed).generate(
+        args.size, exact_rate=0.0, paraphrase_rate=args.paraphrase_rate, scanned_rate=0.0
+    )
+    directory = tempfile.mkdtemp(prefix='text_index_bench_')
+    try:
+        rows = seed(os.path.join(directory, 'bench.db'), documents)
+        db_utils.pool = db_utils.ConnectionPool(os.path.join(directory, 'bench.db'))
+
+        rng = random.Random(args.seed)
+        latencies, hits = [], 0
+        paraphrases = [document for document in documents if document.relation == 'paraphrase']
+        for document in paraphrases:
+            words = document.text.split()
+            start = rng.randrange(max(len(words) - args.excerpt_words, 1))
+            excerpt = ' '.join(words[start:start + args.excerpt_words])
+            started = time.perf_counter()
+            candidates = db_utils.find_candidate_sources(
+                excerpt, ASSIGNMENT_ID, exclude_submission_id=rows[document.id], limit=args.top
+            )
+            latencies.append(time.perf_counter() - started)
+            hits += rows[document.source_id] in [candidate['id'] for candidate in candidates]
+        db_utils.pool.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    result = {
+        'submissions': args.size,
+        'queries': len(paraphrases),
+        'source_in_top': hits,
+        'top': args.top,
+        'p50_ms': round(statistics.median(latencies) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3)
+    }
+    print(f"Source in top {args.top} for {hits} of {len(paraphrases)} excerpts over {args.size} submissions")
+    print(f"p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, p99 {result['p99_ms']} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
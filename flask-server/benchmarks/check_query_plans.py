@@ -0,0 +1,366 @@
+"""
+Query plan check for the MongoDB queries behind each route.
+
+Seeds a scratch database on a local mongod with users, assignments,
+submissions, analysis jobs and blobs, creates the indexes declared in the
+models' meta, then runs ``explain()`` on every query the routes and
+background workers issue, aggregations included. Each query is listed
+with its winning plan's stages, keys and documents examined; for an
+aggregation, the collection scans its $lookup stages ran are counted too
+where the server reports them (MongoDB 5.0+), and each lookup
+sub-pipeline is also explained on its own with the join variables bound.
+Any query whose plan contains a COLLSCAN is reported together with a
+suggested compound index (equality fields, then sort fields, then range
+fields) and the command exits non-zero, so it can gate a change to a
+query or to ``meta['indexes']``.
+
+The queries here mirror the ones in routes/ and utils/; when a query
+changes or a new one is added, update QUERIES to match.
+
+Usage (from flask-server/, with mongod on localhost):
+    python benchmarks/check_query_plans.py
+    python benchmarks/check_query_plans.py --assignments 200 --students 300 --output plans.json
+    MONGODB_URI=mongodb://localhost:27017/plans python benchmarks/check_query_plans.py --keep-data
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId, Binary, SON
+from mongoengine import connect, disconnect, Q
+from mongoengine.connection import get_db
+from models.user import User
+from models.assignment import Assignment
+from models.submission import Submission
+from models.analysis_job import AnalysisJob
+from models.blob import Blob
+from utils.compression import compress
+from utils.student_listing import section_assignments, student_assignments_pipeline
+
+MODELS = (User, Assignment, Submission, AnalysisJob, Blob)
+SECTIONS = ['A', 'B', 'C', 'D']
+RANGE_OPERATORS = {'$gt', '$gte', '$lt', '$lte', '$ne', '$nin', '$exists'}
+
+
+def seed(args):
+    """Insert raw documents for every model and return the ids the queries look up."""
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+
+    professors = [ObjectId() for _ in range(max(args.assignments // 10, 1))]
+    students = [ObjectId() for _ in range(args.students)]
+    User._get_collection().insert_many(
+        [{'_id': oid, 'email': f'prof{i}@example.edu', 'password_hash': 'x', 'first_name': 'Prof',
+          'last_name': str(i), 'user_type': 'professor', 'is_professor': True}
+         for i, oid in enumerate(professors)] +
+        [{'_id': oid, 'email': f'student{i}@example.edu', 'password_hash': 'x', 'first_name': 'Student',
+          'last_name': str(i), 'user_type': 'student', 'section': SECTIONS[i % len(SECTIONS)]}
+         for i, oid in enumerate(students)]
+    )
+
+    assignments = []
+    for i in range(args.assignments):
+        assignments.append({
+            '_id': ObjectId(), 'name': f'Assignment {i}', 'course': f'CS{100 + i % 20}',
+            'description': 'Seeded for the query plan check', 'due_date': now + timedelta(days=7),
+            'question_file': ObjectId(), 'sections': rng.sample(SECTIONS, rng.randint(1, 2)),
+            'status': 'Active', 'professor': professors[i % len(professors)],
+            'created_at': now - timedelta(minutes=i), 'is_active': rng.random() < 0.8
+        })
+    Assignment._get_collection().insert_many(assignments)
+
+    submissions = []
+    for assignment in assignments:
+        for student in rng.sample(students, min(args.submissions_per_assignment, len(students))):
+            status = rng.choice(['Pending', 'Processing', 'Completed', 'Completed', 'Failed'])
+            document = {
+                '_id': ObjectId(), 'student': student, 'assignment': assignment['_id'],
+                'answer_file': ObjectId(), 'content_hash': '%064x' % rng.getrandbits(256),
+                'status': 'Submitted', 'submitted_at': now - timedelta(seconds=rng.randrange(86400)),
+                'processing_status': status, 'processing_timeline': {'extraction': {'seconds': 1.0}}
+            }
+            if status == 'Pending':
+                size = rng.randrange(1024, 4 * 1024 * 1024)
+                document['processing_queue'] = {'priority': now.timestamp() + size / (256 * 1024),
+                                                'bytes': size, 'queued_at': now}
+            if status == 'Completed':
+                document['ocr_text'] = Binary(compress(b'seeded essay text ' * 40))
+                document['plagiarism_score'] = rng.random() * 100
+            submissions.append(document)
+    Submission._get_collection().insert_many(submissions)
+
+    jobs = [
+        {'_id': ObjectId(), 'assignment': assignment['_id'], 'cache_key': '%064x' % rng.getrandbits(256),
+         'status': 'Completed', 'created_at': now}
+        for assignment in assignments
+    ]
+    AnalysisJob._get_collection().insert_many(jobs)
+    Blob._get_collection().insert_many([
+        {'_id': sub['content_hash'], 'grid_id': sub['answer_file'], 'size': 1024,
+         'refcount': rng.randint(0, 2), 'created_at': now}
+        for sub in submissions
+    ])
+
+    for model in MODELS:
+        model.ensure_indexes()
+
+    sample = rng.choice(submissions)
+    return {
+        'now': now,
+        'professor': professors[0],
+        'student': sample['student'],
+        'student_email': 'student0@example.edu',
+        'section': SECTIONS[0],
+        'assignment': sample['assignment'],
+        'submission': sample['_id'],
+        'job': next(job['_id'] for job in jobs if job['assignment'] == sample['assignment']),
+        'content_hash': sample['content_hash'],
+        'grid_id': sample['answer_file'],
+        'students': rng.sample(students, min(20, len(students)))
+    }
+
+
+def keyset(queryset, field, value=None, limit=20):
+    """The page query keyset_page issues for a cursor past the first page."""
+    value, last_id = value if value is not None else datetime.utcnow(), ObjectId()
+    return queryset.filter(
+        Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': last_id})
+    ).order_by(f'-{field}', '-id').limit(limit + 1)
+
+
+class Aggregation:
+    """
+    An aggregation explained like a queryset.
+
+    ``_query`` and ``_ordering`` come from the pipeline's leading $match
+    and first $sort, which is where mongoengine puts a queryset's filter
+    and ordering when it aggregates.
+    """
+
+    def __init__(self, document, pipeline):
+        self._document = document
+        self.pipeline = pipeline
+        self._query = pipeline[0].get('$match', {}) if pipeline else {}
+        self._ordering = next((list(stage['$sort'].items()) for stage in pipeline if '$sort' in stage), [])
+
+    @classmethod
+    def of(cls, queryset, pipeline):
+        """The aggregation ``queryset.aggregate(pipeline)`` sends."""
+        prefix = [{'$match': queryset._query}]
+        if queryset._ordering:
+            prefix.append({'$sort': SON(queryset._ordering)})
+        return cls(queryset._document, prefix + pipeline)
+
+    def explain(self):
+        return get_db().command(SON([
+            ('explain', {'aggregate': self._document._get_collection_name(), 'pipeline': self.pipeline,
+                         'cursor': {}}),
+            ('verbosity', 'executionStats')
+        ]))
+
+
+def bind(value, variables):
+    """``value`` with every ``$$name`` reference replaced by ``variables[name]``."""
+    if isinstance(value, str) and value.startswith('$$') and value[2:] in variables:
+        return variables[value[2:]]
+    if isinstance(value, dict):
+        return {key: bind(item, variables) for key, item in value.items()}
+    if isinstance(value, list):
+        return [bind(item, variables) for item in value]
+    return value
+
+
+def lookup_subpipeline(document, pipeline, index, variables):
+    """The sub-pipeline of the ``index``th stage of ``pipeline``, a $lookup, as run for ``variables``."""
+    lookup = pipeline[index]['$lookup']
+    return Aggregation(document, bind(lookup['pipeline'], variables))
+
+
+# (name, where the query is issued, queryset or Aggregation factory)
+QUERIES = [
+    ('student_assignments', 'utils/student_listing.py student_assignments',
+     lambda s: Aggregation.of(section_assignments(s['section']), student_assignments_pipeline(s['student']))),
+    ('student_submission_lookup', 'utils/student_listing.py student_assignments_pipeline',
+     lambda s: lookup_subpipeline(Submission, student_assignments_pipeline(s['student']), 0,
+                                  {'assignment_id': s['assignment']})),
+    ('professor_assignments', 'routes/assignments.py load_professor_assignments',
+     lambda s: keyset(Assignment.objects(professor=s['professor'], is_active=True), 'created_at')),
+    ('submission_by_student', 'routes/assignments.py submit_assignment',
+     lambda s: Submission.objects(student=s['student'], assignment=s['assignment']).limit(1)),
+    ('bulk_import_students', 'routes/assignments.py bulk_import_submissions',
+     lambda s: User.objects(email__in=[s['student_email']], user_type='student')),
+    ('bulk_import_existing', 'routes/assignments.py bulk_import_submissions',
+     lambda s: Submission.objects(assignment=s['assignment'], student__in=s['students'])),
+    ('analysis_job', 'routes/assignments.py get_assignment_analysis',
+     lambda s: AnalysisJob.objects(id=s['job'], assignment=s['assignment']).limit(1)),
+    ('processing_stats', 'routes/assignments.py get_processing_stats',
+     lambda s: Submission.objects(assignment=s['assignment'], processing_timeline__exists=True,
+                                  processing_status__in=['Completed'])),
+    ('assignment_submissions', 'routes/assignments.py get_assignment_submissions',
+     lambda s: keyset(Submission.objects(assignment=s['assignment']), 'submitted_at')),
+    ('assignment_submissions_by_score', 'routes/assignments.py get_assignment_submissions',
+     lambda s: keyset(Submission.objects(assignment=s['assignment'], plagiarism_score__gte=50.0),
+                      'plagiarism_score', 90.0)),
+    ('assignment_submissions_by_status', 'routes/assignments.py get_assignment_submissions',
+     lambda s: keyset(Submission.objects(assignment=s['assignment'], processing_status__in=['Completed']),
+                      'submitted_at')),
+    ('own_submissions', 'routes/assignments.py get_assignment_submissions',
+     lambda s: keyset(Submission.objects(assignment=s['assignment'], student=s['student']), 'submitted_at')),
+    ('login', 'routes/auth.py login',
+     lambda s: User.objects(email=s['student_email']).limit(1)),
+    ('check_plagiarism', 'utils/document_processor.py _check_plagiarism',
+     lambda s: Submission.objects(assignment=s['assignment'], id__ne=s['submission'], ocr_text__exists=True)),
+    ('score_corpus', 'utils/document_processor.py _score_assignment',
+     lambda s: Submission.objects(assignment=s['assignment'], ocr_text__exists=True)
+     .only('id', 'ocr_text', 'content_hash')),
+    ('extracted_copy', 'utils/document_processor.py _extracted_copy_text',
+     lambda s: Submission.objects(content_hash=s['content_hash'], id__ne=s['submission'],
+                                  processing_status='Completed').limit(1)),
+    ('analysis_corpus', 'utils/analysis_jobs.py cache_key, _analyze',
+     lambda s: Submission.objects(assignment=s['assignment'], processing_status='Completed',
+                                  ocr_text__exists=True).only('id', 'content_hash', 'submitted_at')),
+    ('analysis_cached', 'utils/analysis_jobs.py AnalysisRunner.start',
+     lambda s: AnalysisJob.objects(assignment=s['assignment'], cache_key='0' * 64, status='Completed')
+     .order_by('-created_at').limit(1)),
+    ('analysis_in_flight', 'utils/analysis_jobs.py AnalysisRunner.start',
+     lambda s: AnalysisJob.objects(assignment=s['assignment'], cache_key='0' * 64,
+                                   status__in=['Queued', 'Running'],
+                                   created_at__gte=s['now'] - timedelta(hours=1)).limit(1)),
+    ('processing_claim', 'utils/processing_queue.py ProcessingScheduler._claim',
+     lambda s: Submission.objects(__raw__={'processing_queue.priority': {'$exists': True},
+                                           'processing_queue.claimed_by': {'$exists': False}})
+     .order_by('processing_queue__priority').limit(1)),
+    ('processing_batch', 'utils/processing_queue.py ProcessingScheduler._claim',
+     lambda s: Submission.objects(__raw__={'processing_queue.batch': '0' * 32}).only('id')),
+    ('processing_ahead', 'utils/processing_queue.py ProcessingScheduler._ahead',
+     lambda s: Aggregation(Submission, [
+         {'$match': {'processing_queue.priority': {'$lt': s['now'].timestamp()},
+                     'processing_queue.claimed_by': {'$exists': False}}},
+         {'$group': {'_id': None, 'jobs': {'$sum': 1}, 'bytes': {'$sum': '$processing_queue.bytes'}}}
+     ])),
+    ('processing_stale_claims', 'utils/processing_queue.py ProcessingScheduler._requeue_stale',
+     lambda s: Submission.objects(__raw__={'processing_queue.claimed_at': {'$lt': s['now'] - timedelta(hours=1)}})),
+    ('blob_release', 'utils/blob_store.py release_blob',
+     lambda s: Blob.objects(grid_id=s['grid_id'])),
+    ('blob_collect', 'utils/blob_store.py BlobCollector.collect',
+     lambda s: Blob.objects(refcount__lte=0, released_at__lte=s['now']).only('sha256', 'grid_id').limit(500)),
+]
+
+
+def plan_stages(plan):
+    """Every stage of an explain plan, outermost first."""
+    if not plan:
+        return []
+    stages = [plan] if 'stage' in plan else []
+    # Servers using the slot-based engine nest the classic plan under queryPlan
+    for key in ('queryPlan', 'inputStage'):
+        stages += plan_stages(plan.get(key))
+    for child in plan.get('inputStages', []):
+        stages += plan_stages(child)
+    return stages
+
+
+def suggest_index(queryset):
+    """A compound index for the query: equality fields, then sort fields, then range fields."""
+    equality, ranges = [], []
+    for field, condition in queryset._query.items():
+        if field.startswith('$'):
+            continue
+        operators = set(condition) if isinstance(condition, dict) else set()
+        if operators & RANGE_OPERATORS:
+            ranges.append(field)
+        else:
+            equality.append(field)
+    keys = [(field, 1) for field in equality]
+    keys += [(field, direction) for field, direction in queryset._ordering or [] if field not in equality]
+    keys += [(field, 1) for field in ranges if field not in dict(keys)]
+    return keys
+
+
+def check(name, source, queryset):
+    explain = queryset.explain()
+    # An aggregation's explain nests the find it starts with under $cursor,
+    # unless the server ran the whole pipeline in the query engine
+    pipeline = explain.get('stages', [])
+    cursor = pipeline[0]['$cursor'] if pipeline and '$cursor' in pipeline[0] else explain
+    stages = plan_stages(cursor['queryPlanner']['winningPlan'])
+    stats = cursor.get('executionStats', {})
+    lookups = [
+        {'from': stage['$lookup']['from'], 'indexes': stage.get('indexesUsed'),
+         'collection_scans': stage.get('collectionScans')}
+        for stage in pipeline if '$lookup' in stage
+    ]
+    result = {
+        'query': name,
+        'source': source,
+        'collection': queryset._document._get_collection_name(),
+        'stages': [stage['stage'] for stage in stages],
+        'indexes': sorted({stage['indexName'] for stage in stages if 'indexName' in stage}),
+        'keys_examined': stats.get('totalKeysExamined'),
+        'docs_examined': stats.get('totalDocsExamined'),
+        'returned': stats.get('nReturned'),
+        'collscan': (any(stage['stage'] == 'COLLSCAN' for stage in stages) or
+                     any(lookup['collection_scans'] for lookup in lookups))
+    }
+    if lookups:
+        result['lookups'] = lookups
+    if any(stage['stage'] == 'COLLSCAN' for stage in stages):
+        result['suggested_index'] = suggest_index(queryset)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mongodb-uri', default=os.getenv('MONGODB_URI', 'mongodb://localhost:27017/query_plan_check'))
+    parser.add_argument('--assignments', type=int, default=100)
+    parser.add_argument('--students', type=int, default=200)
+    parser.add_argument('--submissions-per-assignment', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keep-data', action='store_true', help='Leave the seeded database in place')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    connect(host=args.mongodb_uri)
+    db = get_db()
+    for model in MODELS:
+        model.drop_collection()
+    try:
+        seeded = seed(args)
+        results = [check(name, source, factory(seeded)) for name, source, factory in QUERIES]
+    finally:
+        if not args.keep_data:
+            for model in MODELS:
+                model.drop_collection()
+        disconnect()
+
+    print(f"{'query':<34}{'plan':<34}{'keys':>8}{'docs':>8}{'returned':>10}")
+    for r in results:
+        plan = ' <- '.join(r['stages'])
+        print(f"{r['query']:<34}{plan:<34}{r['keys_examined']!s:>8}{r['docs_examined']!s:>8}{r['returned']!s:>10}")
+
+    scans = [r for r in results if r['collscan']]
+    for r in scans:
+        if 'suggested_index' in r:
+            keys = ', '.join(f"('{field}', {direction})" for field, direction in r['suggested_index'])
+            print(f"\nCOLLSCAN in {r['query']} ({r['source']}) on {r['collection']}; suggested index: [{keys}]")
+        for lookup in r.get('lookups', []):
+            if lookup['collection_scans']:
+                print(f"\nCOLLSCAN in {r['query']} ({r['source']}): $lookup from {lookup['from']} "
+                      f"scanned the collection {lookup['collection_scans']} times")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'database': db.name, 'queries': results}, f, indent=2)
+
+    if scans:
+        sys.exit(1)
+    print(f"\nAll {len(results)} queries use an index")
+
+
+if __name__ == '__main__':
+    main()
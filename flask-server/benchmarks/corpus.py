@@ -0,0 +1,252 @@
+"""
+Synthetic submission corpus for the pipeline benchmarks.
+
+Generates essay-like texts from a seeded Zipf-distributed vocabulary, plants
+exact copies (same text under another student's header) and paraphrases
+(synonym swaps, reordered sentences, dropped words), and renders each
+document as a typed PDF (real text objects, no dependencies) or a
+scanned-style PDF (rasterized, rotated and speckled pages; needs Pillow).
+
+The same seed always gives the same corpus, so runs are comparable.
+
+Usage (from flask-server/):
+    python benchmarks/corpus.py --size 200 --out /tmp/corpus
+"""
+import argparse
+import io
+import itertools
+import json
+import os
+import random
+import textwrap
+import zlib
+from collections import namedtuple
+
+# One generated submission. ``source_id`` is the original it was derived from.
+CorpusDocument = namedtuple('CorpusDocument', ['id', 'text', 'kind', 'relation', 'source_id'])
+
+VOCABULARY_SIZE = 4000
+TOPIC_WORDS = 60
+SYLLABLES = (
+    'ka', 'lo', 'mi', 'ne', 'ru', 'ta', 'vo', 'si', 'pe', 'da', 'gu', 'fi', 'ho', 'ja', 'be',
+    'zo', 'ri', 'mu', 'te', 'no', 'la', 'xi', 'qu', 'sta', 'tro', 'pla', 'gri', 'ven', 'dor', 'mal'
+)
+
+# Typed page layout, in PDF points
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792
+LINE_CHARS = 90
+LINES_PER_PAGE = 48
+
+# Scanned page raster at 150 dpi
+SCAN_SIZE = (1275, 1650)
+SCAN_LINE_CHARS = 70
+SCAN_LINES_PER_PAGE = 40
+
+
+def build_vocabulary(rng, size=VOCABULARY_SIZE):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4))))
+    return sorted(words)
+
+
+class CorpusGenerator:
+    def __init__(self, seed=0, words_per_document=600):
+        self.rng = random.Random(seed)
+        self.words_per_document = words_per_document
+        self.vocabulary = build_vocabulary(self.rng)
+        self.rng.shuffle(self.vocabulary)
+        # Zipf-like weights by list position so a few words dominate, as in real prose
+        self.cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(self.vocabulary))))
+        shuffled = self.vocabulary[:]
+        self.rng.shuffle(shuffled)
+        # Symmetric synonym pairs used by the paraphraser
+        self.synonyms = {}
+        for a, b in zip(shuffled[::2], shuffled[1::2]):
+            self.synonyms[a] = b
+            self.synonyms[b] = a
+
+    def essay(self):
+        """An original text: common words plus a topic of its own."""
+        topic = self.rng.sample(self.vocabulary[len(self.vocabulary) // 2:], TOPIC_WORDS)
+        common = self.rng.choices(self.vocabulary, cum_weights=self.cum_weights, k=self.words_per_document)
+        words = [self.rng.choice(topic) if self.rng.random() < 0.3 else word for word in common]
+        sentences = []
+        i = 0
+        while i < len(words):
+            length = self.rng.randint(8, 20)
+            sentence = words[i:i + length]
+            sentences.append(sentence[0].capitalize() + ' ' + ' '.join(sentence[1:]) + '.')
+            i += length
+        return ' '.join(sentences)
+
+    def paraphrase(self, text, strength=0.2):
+        """Swap ``strength`` of the words for synonyms, drop a few and reorder sentences."""
+        sentences = [s for s in text.split('. ') if s]
+        self.rng.shuffle(sentences)
+        rewritten = []
+        for sentence in sentences:
+            words = []
+            for word in sentence.rstrip('.').split():
+                roll = self.rng.random()
+                if roll < strength / 4:
+                    continue
+                if roll < strength:
+                    word = self.synonyms.get(word.lower(), word)
+                words.append(word.lower())
+            if words:
+                rewritten.append(words[0].capitalize() + ' ' + ' '.join(words[1:]) + '.')
+        return ' '.join(rewritten)
+
+    def generate(self, size, exact_rate=0.05, paraphrase_rate=0.05, scanned_rate=0.2, paraphrase_strength=0.2):
+        """
+        Generate ``size`` documents.
+
+        Returns:
+            list: CorpusDocument entries; copies and paraphrases point at an original
+        """
+        documents = []
+        originals = []
+        for index in range(size):
+            doc_id = f"sub-{index:05d}"
+            kind = 'scanned' if self.rng.random() < scanned_rate else 'typed'
+            roll = self.rng.random()
+            if originals and roll < exact_rate:
+                source = self.rng.choice(originals)
+                documents.append(CorpusDocument(doc_id, source.text, kind, 'exact', source.id))
+            elif originals and roll < exact_rate + paraphrase_rate:
+                source = self.rng.choice(originals)
+                text = self.paraphrase(source.text, paraphrase_strength)
+                documents.append(CorpusDocument(doc_id, text, kind, 'paraphrase', source.id))
+            else:
+                document = CorpusDocument(doc_id, self.essay(), kind, 'original', None)
+                originals.append(document)
+                documents.append(document)
+        return documents
+
+
+def planted_pairs(documents):
+    """Ground truth: {'exact': set of pairs, 'paraphrase': set of pairs} as frozensets of ids."""
+    pairs = {'exact': set(), 'paraphrase': set()}
+    by_source = {}
+    for document in documents:
+        if document.source_id:
+            pairs[document.relation].add(frozenset((document.id, document.source_id)))
+            by_source.setdefault(document.source_id, []).append(document)
+    # Two exact copies of the same original are copies of each other too
+    for copies in by_source.values():
+        exact = [d.id for d in copies if d.relation == 'exact']
+        for i, a in enumerate(exact):
+            for b in exact[i + 1:]:
+                pairs['exact'].add(frozenset((a, b)))
+    return pairs
+
+
+def _pdf_escape(line):
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def render_typed_pdf(text, header=None):
+    """Render text as a multi-page PDF with Helvetica text objects."""
+    lines = ([header, ''] if header else []) + textwrap.wrap(text, LINE_CHARS)
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+
+    objects = []
+    page_ids = []
+    # 1: catalog, 2: page tree, 3: font; pages and their content streams follow
+    for page_lines in pages:
+        body = '\n'.join(f"({_pdf_escape(line)}) Tj T*" for line in page_lines)
+        stream = f"BT /F1 11 Tf 14 TL 56 {PAGE_HEIGHT - 56} Td\n{body}\nET".encode('latin-1', 'replace')
+        content_id = 4 + len(objects)
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(4 + len(objects))
+        objects.append((
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            "/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, content_id)
+        ).encode('latin-1'))
+
+    kids = ' '.join(f"{page_id} 0 R" for page_id in page_ids)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode('latin-1'),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    ] + objects
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + obj + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def render_scanned_pdf(text, header=None, seed=0):
+    """Render text as page images with skew and speckle noise, saved as an image-only PDF."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    rng = random.Random(seed)
+    try:
+        font = ImageFont.truetype('DejaVuSans.ttf', 24)
+    except OSError:
+        font = ImageFont.load_default()
+
+    lines = ([header, ''] if header else []) + textwrap.wrap(text, SCAN_LINE_CHARS)
+    images = []
+    for start in range(0, max(len(lines), 1), SCAN_LINES_PER_PAGE):
+        image = Image.new('L', SCAN_SIZE, 255)
+        draw = ImageDraw.Draw(image)
+        for row, line in enumerate(lines[start:start + SCAN_LINES_PER_PAGE]):
+            draw.text((90, 90 + row * 36), line, fill=rng.randint(0, 60), font=font)
+        for _ in range(400):
+            x, y = rng.randrange(SCAN_SIZE[0]), rng.randrange(SCAN_SIZE[1])
+            draw.point((x, y), fill=rng.randint(0, 160))
+        images.append(image.rotate(rng.uniform(-1.5, 1.5), fillcolor=255))
+
+    out = io.BytesIO()
+    images[0].save(out, 'PDF', save_all=True, append_images=images[1:], resolution=150)
+    return out.getvalue()
+
+
+def render_pdf(document):
+    """Render a corpus document the way its kind says; each copy gets its own header."""
+    header = f"Student submission {document.id}"
+    if document.kind == 'scanned':
+        return render_scanned_pdf(document.text, header, seed=zlib.crc32(document.id.encode()))
+    return render_typed_pdf(document.text, header)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--exact-rate', type=float, default=0.05)
+    parser.add_argument('--paraphrase-rate', type=float, default=0.05)
+    parser.add_argument('--scanned-rate', type=float, default=0.2)
+    parser.add_argument('--out', required=True, help='Directory for the PDFs and manifest.json')
+    args = parser.parse_args()
+
+    documents = CorpusGenerator(args.seed).generate(
+        args.size, args.exact_rate, args.paraphrase_rate, args.scanned_rate
+    )
+    os.makedirs(args.out, exist_ok=True)
+    for document in documents:
+        with open(os.path.join(args.out, f"{document.id}.pdf"), 'wb') as f:
+            f.write(render_pdf(document))
+
+    with open(os.path.join(args.out, 'manifest.json'), 'w') as f:
+        json.dump([
+            {'id': d.id, 'kind': d.kind, 'relation': d.relation, 'source_id': d.source_id, 'text': d.text}
+            for d in documents
+        ], f, indent=2)
+    print(f"Wrote {len(documents)} documents to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+"""
+Deadline load test for the Flask API.
+
+Boots app.py under gunicorn (gunicorn.conf.py, with workers and threads
+overridden per run) against a local mongod, seeds professors, students and
+assignments, then replays exam-deadline traffic over real HTTP:
+
+    students    log in, upload with submit_assignment, then poll
+                /api/submissions/<id>/status until Completed or Failed;
+                arrivals ramp up towards the deadline
+    professors  log in and refresh the dashboard listing and an
+                assignment's submission list for the whole run
+
+Each endpoint gets its request count, throughput, p50/p95/p99 latency and
+error rate. Every workers x threads combination is a separate run on the
+same seed, so configurations can be compared.
+
+Usage (from flask-server/, with mongod on localhost):
+    python benchmarks/load_test.py --students 500 --workers 2,4 --threads 2,8 --output load.json
+    MONGODB_URI=mongodb://localhost:27017/load_test python benchmarks/load_test.py --server flask
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+from mongoengine import connect, disconnect
+from werkzeug.security import generate_password_hash
+from corpus import CorpusGenerator, render_typed_pdf
+
+PASSWORD = 'load-test-password'
+TERMINAL_STATUSES = {'Completed', 'Failed'}
+
+
+class Recorder:
+    """Latency samples and failures per endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def call(self, endpoint, fn):
+        """Time ``fn()``; a non-2xx response or an exception counts as an error."""
+        start = time.perf_counter()
+        try:
+            response = fn()
+            ok = response.status_code < 400
+        except requests.RequestException:
+            response, ok = None, False
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append(elapsed)
+            if not ok:
+                code = response.status_code if response is not None else 'exception'
+                errors = self.errors.setdefault(endpoint, {})
+                errors[code] = errors.get(code, 0) + 1
+        return response if ok else None
+
+    def summary(self, wall_seconds):
+        report = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+            errors = self.errors.get(endpoint, {})
+            error_count = sum(errors.values())
+
+            def pick(q):
+                return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 2)
+
+            report[endpoint] = {
+                'requests': len(ordered),
+                'throughput_rps': round(len(ordered) / wall_seconds, 2),
+                'p50_ms': pick(0.50),
+                'p95_ms': pick(0.95),
+                'p99_ms': pick(0.99),
+                'max_ms': round(ordered[-1] * 1000, 2),
+                'mean_ms': round(statistics.fmean(ordered) * 1000, 2),
+                'error_rate': round(error_count / len(ordered), 4),
+                'errors': {str(code): count for code, count in errors.items()}
+            }
+        return report
+
+
+def seed(args, run_id):
+    """Create the users and assignments for a run directly in Mongo."""
+    from models.user import User
+    from models.assignment import Assignment
+
+    password_hash = generate_password_hash(PASSWORD)  # Hashed once; every account shares it
+    professors = User.objects.insert([
+        User(email=f"load-{run_id}-prof{i}@example.edu", password_hash=password_hash, first_name='Load',
+             last_name=f"Professor {i}", user_type='professor', is_professor=True)
+        for i in range(args.professors)
+    ])
+
+    assignments = []
+    for professor in professors:
+        for i in range(args.assignments_per_professor):
+            assignment = Assignment(
+                name=f"Load test {run_id} #{i}", course='LOAD', description='Deadline load test assignment',
+                due_date=datetime.datetime.utcnow() + datetime.timedelta(days=1),
+                sections=['A'], professor=professor
+            )
+            assignment.question_file.put(render_typed_pdf('Question'), content_type='application/pdf',
+                                         filename='question.pdf')
+            assignment.save()
+            assignments.append(assignment)
+
+    students = User.objects.insert([
+        User(email=f"load-{run_id}-student{i}@example.edu", password_hash=password_hash, first_name='Load',
+             last_name=f"Student {i}", user_type='student', section='A')
+        for i in range(args.students)
+    ])
+    return {
+        'professors': [(p.email, [str(a.id) for a in assignments if a.professor.id == p.id]) for p in professors],
+        'students': [s.email for s in students],
+        'assignments': [str(a.id) for a in assignments],
+        'user_ids': [p.id for p in professors] + [s.id for s in students]
+    }
+
+
+def cleanup(seeded):
+    from models.user import User
+    from models.assignment import Assignment
+    from utils.blob_store import release_blob
+
+    reset_submissions(seeded)
+    for assignment in Assignment.objects(id__in=seeded['assignments']):
+        release_blob(assignment.question_file, assignment.question_file.grid_id)
+        assignment.delete()
+    User.objects(id__in=seeded['user_ids']).delete()
+
+
+def reset_submissions(seeded):
+    """Remove submissions between runs so every configuration starts alike."""
+    from models.submission import Submission
+    from utils.blob_store import release_blob
+
+    # Answer files are deduplicated blobs that later runs may reuse, so
+    # only references are dropped; the collector deletes the files
+    for submission in Submission.objects(assignment__in=seeded['assignments']):
+        release_blob(submission.answer_file, submission.answer_file.grid_id)
+        submission.delete()
+
+
+def start_server(args, workers, threads, port, log_file):
+    env = dict(os.environ, MONGODB_URI=args.mongodb_uri, PORT=str(port), FLASK_ENV='development')
+    if args.server == 'gunicorn':
+        command = [
+            sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+            '--workers', str(workers), '--threads', str(threads),
+            '--bind', f"127.0.0.1:{port}", 'app:app'
+        ]
+    else:
+        # The development server from app.py's __main__ block, for comparison
+        command = [sys.executable, '-c', f"from app import app; app.run(port={port}, threaded=True)"]
+    process = subprocess.Popen(command, cwd=SERVER_DIR, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+
+    deadline = time.monotonic() + args.boot_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with {process.returncode}; see {log_file.name}")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health", timeout=1).ok:
+                return process
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    stop_server(process)
+    raise RuntimeError(f"Server did not become healthy; see {log_file.name}")
+
+
+def stop_server(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def login(session, base, email, recorder, is_student):
+    return recorder.call('login', lambda: session.post(
+        f"{base}/api/auth/login", json={'email': email, 'password': PASSWORD, 'isStudent': is_student}, timeout=30
+    ))
+
+
+def student(base, email, assignment_id, pdf, start_at, recorder, args):
+    time.sleep(max(0.0, start_at - time.monotonic()))
+    session = requests.Session()
+    if not login(session, base, email, recorder, True):
+        return
+    response = recorder.call('submit', lambda: session.post(
+        f"{base}/api/assignments/submit/{assignment_id}",
+        files={'answerFile': ('answer.pdf', pdf, 'application/pdf')},
+        timeout=120
+    ))
+    if not response:
+        return
+
+    submission_id = response.json()['id']
+    deadline = time.monotonic() + args.poll_timeout
+    while time.monotonic() < deadline:
+        time.sleep(args.poll_interval)
+        status = recorder.call('status', lambda: session.get(
+            f"{base}/api/submissions/{submission_id}/status", timeout=30
+        ))
+        if status and status.json().get('processing_status') in TERMINAL_STATUSES:
+            return
+
+
+def professor(base, email, assignment_ids, recorder, stop, args):
+    session = requests.Session()
+    if not login(session, base, email, recorder, False):
+        return
+    rng = random.Random(email)
+    while not stop.is_set():
+        recorder.call('professor_assignments', lambda: session.get(f"{base}/api/professor/assignments", timeout=30))
+        if assignment_ids:
+            assignment_id = rng.choice(assignment_ids)
+            recorder.call('assignment_submissions', lambda: session.get(
+                f"{base}/api/assignments/{assignment_id}/submissions", params={'limit': 50}, timeout=30
+            ))
+        stop.wait(args.dashboard_interval)
+
+
+def run_config(args, seeded, pdfs, workers, threads):
+    reset_submissions(seeded)
+    log_file = tempfile.NamedTemporaryFile('w', prefix=f"load-{workers}x{threads}-", suffix='.log', delete=False)
+    process = start_server(args, workers, threads, args.port, log_file)
+    base = f"http://127.0.0.1:{args.port}"
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+
+    # Arrival density grows linearly towards the deadline at the end of the burst
+    now = time.monotonic()
+    arrivals = sorted(now + args.burst_seconds * rng.random() ** 0.5 for _ in seeded['students'])
+    stop = threading.Event()
+    started = time.perf_counter()
+    try:
+        dashboards = [
+            threading.Thread(target=professor, args=(base, email, assignment_ids, recorder, stop, args))
+            for email, assignment_ids in seeded['professors']
+        ]
+        for thread in dashboards:
+            thread.start()
+
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            for i, (email, start_at) in enumerate(zip(seeded['students'], arrivals)):
+                assignment_id = seeded['assignments'][i % len(seeded['assignments'])]
+                pool.submit(student, base, email, assignment_id, pdfs[i % len(pdfs)], start_at, recorder, args)
+
+        stop.set()
+        for thread in dashboards:
+            thread.join()
+        wall = time.perf_counter() - started
+    finally:
+        stop.set()
+        stop_server(process)
+        log_file.close()
+
+    return {
+        'server': args.server,
+        'workers': workers,
+        'threads': threads,
+        'wall_s': round(wall, 2),
+        'server_log': log_file.name,
+        'endpoints': recorder.summary(wall)
+    }
+
+
+def parse_ints(value):
+    return [int(item) for item in value.split(',') if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mongodb-uri', default=os.getenv('MONGODB_URI', 'mongodb://localhost:27017/load_test'))
+    parser.add_argument('--server', choices=['gunicorn', 'flask'], default='gunicorn')
+    parser.add_argument('--workers', default='4', help='Comma-separated gunicorn worker counts')
+    parser.add_argument('--threads', default='2', help='Comma-separated gunicorn threads per worker')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--students', type=int, default=300)
+    parser.add_argument('--professors', type=int, default=5)
+    parser.add_argument('--assignments-per-professor', type=int, default=2)
+    parser.add_argument('--burst-seconds', type=float, default=60, help='Length of the deadline arrival window')
+    parser.add_argument('--concurrency', type=int, default=200, help='Students active at once')
+    parser.add_argument('--poll-interval', type=float, default=2.0)
+    parser.add_argument('--poll-timeout', type=float, default=300)
+    parser.add_argument('--dashboard-interval', type=float, default=5.0)
+    parser.add_argument('--boot-timeout', type=float, default=60)
+    parser.add_argument('--documents', type=int, default=50, help='Distinct PDFs cycled through by students')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keep-data', action='store_true')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    corpus = CorpusGenerator(args.seed).generate(args.documents)
+    pdfs = [render_typed_pdf(doc.text, f"Submission {doc.id}") for doc in corpus]
+
+    run_id = datetime.datetime.utcnow().strftime('%Y%m%d%H%M%S')
+    connect(host=args.mongodb_uri)
+    seeded = seed(args, run_id)
+    results = []
+    try:
+        configs = [(1, 1)] if args.server == 'flask' else [
+            (workers, threads) for workers in parse_ints(args.workers) for threads in parse_ints(args.threads)
+        ]
+        for workers, threads in configs:
+            print(f"Running {args.server} workers={workers} threads={threads}...", file=sys.stderr)
+            results.append(run_config(args, seeded, pdfs, workers, threads))
+    finally:
+        if not args.keep_data:
+            cleanup(seeded)
+        disconnect()
+
+    for result in results:
+        print(f"\n{result['server']} workers={result['workers']} threads={result['threads']} ({result['wall_s']}s)")
+        print(f"{'endpoint':<24}{'req':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'err %':>8}")
+        for endpoint, stats in result['endpoints'].items():
+            print(f"{endpoint:<24}{stats['requests']:>8}{stats['throughput_rps']:>9}{stats['p50_ms']:>10}"
+                  f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['error_rate'] * 100:>8.2f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'runs': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,7 +4,8 @@ from datetime import timedelta
 class Config:
     # Flask settings
     SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-here')  # Change this in production
-    SESSION_TYPE = 'filesystem'
+    SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'mongodb')  # 'mongodb' or 'filesystem'
+    SESSION_CACHE_TTL = 5  # Seconds a loaded session is reused within a worker
     PERMANENT_SESSION_LIFETIME = timedelta(days=1)
     
     # MongoDB settings - using environment variable
@@ -12,6 +13,25 @@ class Config:
     
     # File upload settings
     MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # 10MB max file size
+    UPLOAD_SPOOL_THRESHOLD = 512 * 1024  # Spool uploads to disk beyond 512KB
+    BULK_IMPORT_MAX_SIZE = 500 * 1024 * 1024  # 500MB max ZIP archive for bulk imports
+
+    # Seconds a compact user record is reused across requests (0 disables)
+    IDENTITY_CACHE_TTL = 30
+
+    # Logging: JSON lines written by a background thread, and access log sampling.
+    # Route rates are keyed by Flask endpoint; errors and slow requests are always logged.
+    STRUCTURED_LOGGING = os.environ.get('STRUCTURED_LOGGING', 'true').lower() == 'true'
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    REQUEST_LOG_SAMPLE_RATE = float(os.environ.get('REQUEST_LOG_SAMPLE_RATE', '1.0'))
+    REQUEST_LOG_ROUTE_RATES = {
+        'assignments.check_submission_status': 0.05,  # Polled every few seconds by each client
+        'health_check': 0.0
+    }
+    REQUEST_LOG_SLOW_MS = 1000
+
+    # Bearer token for the profiler admin endpoints (unset disables them)
+    PROFILER_TOKEN = os.environ.get('PROFILER_TOKEN')
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
     ALLOWED_EXTENSIONS = {'pdf'}
     
@@ -1,11 +1,25 @@
 """Gunicorn configuration for production deployment"""
+import os
+import shutil
+import tempfile
+
+# Workers write Prometheus metrics to files here so /metrics can aggregate them.
+# It must exist before the app is preloaded, and starts empty so stale worker
+# files from a previous run are not aggregated.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'assignment_checker_metrics'))
+shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
 
 # Worker Options
 workers = 4  # Adjust based on your server's CPU cores
-worker_class = 'sync'
-threads = 2
+# Threaded workers: submission status streams are 25s long polls that each hold a thread
+worker_class = 'gthread'
+threads = 8
 timeout = 120
 
+# At most half of each worker's threads serve status streams at once
+os.environ.setdefault('SSE_MAX_STREAMS', str(threads // 2))
+
 # Server Socket
 bind = "0.0.0.0:$PORT"  # Uses the PORT env var set by Render
 
@@ -27,3 +41,13 @@ wsgi_app = 'app:app'
 def on_starting(server):
     """Log when the server starts"""
     server.log.info("Starting Assignment Checker API server")
+
+def post_fork(server, worker):
+    """Start taking queued processing work in each worker without waiting for an upload"""
+    from utils.document_processor import document_processor
+    document_processor.scheduler.start()
+
+def child_exit(server, worker):
+    """Drop the live gauges of a worker that exited"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,432 @@
+"""
+Stream the legacy SQLite store (assignment_checker.db) into MongoDB.
+
+Users, assignments, submissions and cheating detections are read in
+primary-key order, ``--batch-size`` rows at a time, and written with
+unordered ``insert_many``; uploaded files are streamed into GridFS. No table
+is ever held in memory, so millions of rows move in constant space.
+
+Every SQLite row gets a deterministic ObjectId (zero timestamp, a table tag,
+then the row id), so references need no lookup table and a re-run cannot
+create duplicates. After each batch the last copied row id is stored in the
+``migration_checkpoints`` collection; an interrupted run picks up from
+there. When every table is done, row counts are compared and the command
+exits non-zero on any mismatch.
+
+Courses have no Mongo collection: an assignment's course code becomes its
+``course`` and its only section, and a student's first enrollment becomes
+their section. Sessions are not copied. Passwords keep their unsalted
+SHA-256 hash until the user's next login replaces it.
+
+Rows the models would reject get placeholders, and each one is logged: a
+user without a full name is named after their email address, a student
+without an enrollment is put in an "Unassigned" section, and an assignment
+whose due date cannot be parsed is due when it was created.
+Uploaded files are registered in the blob store like new uploads, so
+identical files share one GridFS copy and are freed by reference count.
+
+Usage (from flask-server/):
+    python migrate_sqlite_to_mongo.py --sqlite assignment_checker.db
+    python migrate_sqlite_to_mongo.py --batch-size 5000 --skip-files
+    python migrate_sqlite_to_mongo.py --verify-only
+    python migrate_sqlite_to_mongo.py --reset
+"""
+import argparse
+import hashlib
+import logging
+import os
+import sqlite3
+import sys
+from collections import Counter
+from datetime import datetime
+from bson import ObjectId, Binary
+from gridfs import GridFS
+from mongoengine import connect
+from mongoengine.connection import get_db
+from pymongo.errors import BulkWriteError
+from models.user import LEGACY_HASH_PREFIX
+from models.blob import Blob
+from models.cheating_detection import CheatingDetection
+from utils.compression import compress
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assignment_checker.db')
+DEFAULT_BATCH_SIZE = 1000
+FILE_CHUNK_SIZE = 255 * 1024
+DUPLICATE_KEY = 11000
+CHECKPOINTS = 'migration_checkpoints'
+# Last name of a legacy user whose full name has a single word or none
+MISSING_NAME = '-'
+# Section of a legacy student who was not enrolled in any course
+UNASSIGNED_SECTION = 'Unassigned'
+
+# Second-byte tag of the ObjectIds given to each kind of migrated row
+LEGACY_TAGS = {
+    'users': 1,
+    'assignments': 2,
+    'submissions': 3,
+    'cheating_detection': 4,
+    'assignment_files': 5,
+    'submission_files': 6
+}
+
+# Tables in dependency order, with their target collections and keyset queries
+TABLES = (
+    ('users', 'users', '''
+        SELECT u.*,
+               (SELECT c.code FROM course_enrollments ce JOIN courses c ON c.id = ce.course_id
+                WHERE ce.student_id = u.id ORDER BY ce.id LIMIT 1) AS section
+        FROM users u
+        WHERE u.id > ?
+        ORDER BY u.id
+        LIMIT ?
+    '''),
+    ('assignments', 'assignments', '''
+        SELECT a.*, c.code AS course_code
+        FROM assignments a
+        LEFT JOIN courses c ON c.id = a.course_id
+        WHERE a.id > ?
+        ORDER BY a.id
+        LIMIT ?
+    '''),
+    ('submissions', 'submissions', '''
+        SELECT * FROM submissions WHERE id > ? ORDER BY id LIMIT ?
+    '''),
+    ('cheating_detection', 'cheating_detections', '''
+        SELECT * FROM cheating_detection WHERE id > ? ORDER BY id LIMIT ?
+    ''')
+)
+
+ASSIGNMENT_STATUS = {'active': 'Active', 'inactive': 'Archived', 'archived': 'Archived'}
+
+# File field of the documents that hold uploads
+FILE_FIELDS = {'assignments': 'question_file', 'submissions': 'answer_file'}
+
+
+def legacy_id(kind, row_id):
+    """Deterministic ObjectId of a SQLite row."""
+    return ObjectId(b'\x00\x00\x00\x00' + bytes([LEGACY_TAGS[kind]]) + int(row_id).to_bytes(7, 'big'))
+
+
+def legacy_id_range(kind):
+    return {'$gte': legacy_id(kind, 0), '$lte': legacy_id(kind, 2 ** 56 - 1)}
+
+
+def parse_timestamp(value):
+    """SQLite stores timestamps as text; unparseable values become None."""
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def column(row, name):
+    """A column that older copies of the schema may not have."""
+    return row[name] if name in row.keys() else None
+
+
+class SqliteMigration:
+    def __init__(self, sqlite_path, batch_size=DEFAULT_BATCH_SIZE, copy_files=True):
+        self.sqlite_path = sqlite_path
+        self.batch_size = batch_size
+        self.copy_files = copy_files
+        # Relative file paths in the legacy tables are relative to flask-server/
+        self.file_root = os.path.dirname(os.path.abspath(sqlite_path))
+        self.source = sqlite3.connect(f'file:{sqlite_path}?mode=ro', uri=True)
+        self.source.row_factory = sqlite3.Row
+        self.db = get_db()
+        self.fs = GridFS(self.db)
+        self.checkpoints = self.db[CHECKPOINTS]
+        self.missing_files = 0
+        # Legacy user id -> id of an existing Mongo user with the same email
+        self.remapped_users = {}
+
+    def user_ref(self, row_id):
+        if row_id is None:
+            return None
+        return self.remapped_users.get(str(row_id), legacy_id('users', row_id))
+
+    def convert(self, table, row):
+        """Build the Mongo document for a SQLite row."""
+        if table == 'users':
+            names = (row['full_name'] or '').strip().split(None, 1)
+            if len(names) < 2:
+                # User requires both names, so the document could never be saved again
+                logger.warning(f"users: row {row['id']} has full name {row['full_name']!r}; using placeholders")
+                names = (names or [row['email'].split('@')[0]]) + [MISSING_NAME]
+            document = {
+                '_id': legacy_id('users', row['id']),
+                'email': row['email'],
+                'password_hash': LEGACY_HASH_PREFIX + row['password_hash'],
+                'first_name': names[0],
+                'last_name': names[1],
+                'user_type': row['user_type'],
+                'is_professor': row['user_type'] == 'professor',
+                'is_active': True,
+                'created_at': parse_timestamp(row['created_at']) or datetime.utcnow()
+            }
+            if row['section']:
+                document['section'] = row['section']
+            elif row['user_type'] == 'student':
+                # User.clean requires a section for students
+                logger.warning(f"users: student row {row['id']} has no enrollment; using section {UNASSIGNED_SECTION!r}")
+                document['section'] = UNASSIGNED_SECTION
+            return document
+
+        if table == 'assignments':
+            created_at = parse_timestamp(row['created_at']) or datetime.utcnow()
+            due_date = parse_timestamp(row['due_date'])
+            if due_date is None:
+                # Assignment.to_json and the listings need a due date
+                logger.warning(f"assignments: row {row['id']} has due date {row['due_date']!r}; using its creation time")
+                due_date = created_at
+            document = {
+                '_id': legacy_id('assignments', row['id']),
+                'name': row['name'],
+                'course': row['course_code'] or '',
+                'description': row['description'] or '',
+                'due_date': due_date,
+                'sections': [row['course_code']] if row['course_code'] else [],
+                'status': ASSIGNMENT_STATUS.get(column(row, 'status'), 'Active'),
+                'professor': self.user_ref(row['professor_id']),
+                'created_at': created_at,
+                'is_active': column(row, 'status') in (None, 'active')
+            }
+            path = column(row, 'file_path')
+            stored = self.copy_file('assignment_files', row['id'], path)
+            if stored:
+                document['question_file'] = stored[0]
+                document['question_file_name'] = os.path.basename(path)
+            return document
+
+        if table == 'submissions':
+            text = row['extracted_text']
+            document = {
+                '_id': legacy_id('submissions', row['id']),
+                'student': self.user_ref(row['student_id']),
+                'assignment': legacy_id('assignments', row['assignment_id']),
+                'status': 'Submitted',
+                'submitted_at': parse_timestamp(row['submitted_at']) or datetime.utcnow(),
+                'ocr_text': Binary(compress(text.encode('utf-8'))) if text else None,
+                'plagiarism_score': row['similarity_score'],
+                'feedback': column(row, 'feedback'),
+                'cheating_flag': column(row, 'cheating_detected'),
+                'processing_status': 'Completed' if text else 'Pending'
+            }
+            stored = self.copy_file('submission_files', row['id'], row['file_path'])
+            if stored:
+                document['answer_file'], document['content_hash'], document['file_size'] = stored
+                document['file_name'] = os.path.basename(row['file_path'])
+            # Leave out unset fields, as mongoengine does
+            return {key: value for key, value in document.items() if value is not None}
+
+        return {
+            '_id': legacy_id('cheating_detection', row['id']),
+            'submission': legacy_id('submissions', row['submission_id']),
+            'matched_submission': (
+                legacy_id('submissions', row['matched_submission_id'])
+                if row['matched_submission_id'] is not None else None
+            ),
+            'detection_type': row['detection_type'],
+            'similarity_score': row['similarity_score'],
+            'detected_at': parse_timestamp(row['detected_at']) or datetime.utcnow()
+        }
+
+    def copy_file(self, kind, row_id, path):
+        """
+        Store a legacy upload in the blob store.
+
+        A file whose content is already stored reuses that copy; otherwise
+        it is streamed into GridFS under a deterministic id, named by its
+        hash like every blob, and registered with no references yet.
+        References are counted as the documents are inserted.
+
+        Returns:
+            tuple: (GridFS id, SHA-256, size), or None when there is no file
+        """
+        if not self.copy_files or not path:
+            return None
+        full_path = path if os.path.isabs(path) else os.path.join(self.file_root, path)
+        if not os.path.isfile(full_path):
+            self.missing_files += 1
+            return None
+
+        file_id = legacy_id(kind, row_id)
+        existing = self.db.fs.files.find_one({'_id': file_id}, {'sha256': 1, 'length': 1})
+        if existing:
+            sha256, size = existing['sha256'], existing['length']
+        else:
+            digest = hashlib.sha256()
+            with open(full_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(FILE_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            sha256, size = digest.hexdigest(), os.path.getsize(full_path)
+
+        blob = self.db.blobs.find_one({'_id': sha256}, {'grid_id': 1})
+        if blob:
+            return blob['grid_id'], sha256, size
+
+        if not existing:
+            # Chunks left behind by an upload that was interrupted part way
+            self.db.fs.chunks.delete_many({'files_id': file_id})
+            with open(full_path, 'rb') as f:
+                self.fs.put(f, _id=file_id, filename=sha256, content_type='application/pdf', sha256=sha256)
+        self.db.blobs.update_one(
+            {'_id': sha256},
+            {'$setOnInsert': {'grid_id': file_id, 'size': size, 'refcount': 0, 'created_at': datetime.utcnow()}},
+            upsert=True
+        )
+        return file_id, sha256, size
+
+    def reference_blobs(self, collection, documents, field):
+        """
+        Count the references a batch is about to add to its blobs.
+
+        Only documents not copied yet are counted, and before they are
+        inserted, so an interrupted batch can only count a reference twice.
+        That keeps a file longer than needed instead of letting the
+        collector delete it while it is in use.
+        """
+        ids = [document['_id'] for document in documents]
+        present = {document['_id'] for document in collection.find({'_id': {'$in': ids}}, {'_id': 1})}
+        references = Counter(
+            document[field] for document in documents
+            if field in document and document['_id'] not in present
+        )
+        # Most files have one reference, so group the blobs by count
+        by_count = {}
+        for grid_id, count in references.items():
+            by_count.setdefault(count, []).append(grid_id)
+        for count, grid_ids in by_count.items():
+            self.db.blobs.update_many({'grid_id': {'$in': grid_ids}}, {'$inc': {'refcount': count}})
+
+    def insert(self, collection, documents):
+        """
+        Insert a batch, tolerating rows an interrupted run already copied.
+
+        Returns:
+            tuple: (documents now present, documents rejected as conflicts)
+        """
+        try:
+            return len(collection.insert_many(documents, ordered=False).inserted_ids), []
+        except BulkWriteError as e:
+            already_copied = 0
+            conflicts = []
+            for error in e.details['writeErrors']:
+                if error['code'] != DUPLICATE_KEY:
+                    raise
+                key_pattern = error.get('keyPattern') or {}
+                if list(key_pattern) == ['_id'] or 'index: _id_' in error['errmsg']:
+                    already_copied += 1
+                else:
+                    conflicts.append(documents[error['index']])
+            return e.details['nInserted'] + already_copied, conflicts
+
+    def resolve_user_conflicts(self, conflicts):
+        """Point references at existing Mongo users that share a legacy user's email."""
+        for document in conflicts:
+            existing = self.db.users.find_one({'email': document['email']}, {'_id': 1})
+            if existing is None:
+                raise RuntimeError(f"Could not insert user {document['email']}")
+            legacy_row_id = int.from_bytes(document['_id'].binary[5:], 'big')
+            self.remapped_users[str(legacy_row_id)] = existing['_id']
+            logger.warning(f"User {document['email']} already exists in MongoDB; linking legacy rows to it")
+
+    def copy_table(self, table, collection_name, query):
+        checkpoint = self.checkpoints.find_one({'_id': table}) or {}
+        if checkpoint.get('completed'):
+            logger.info(f"{table}: already migrated ({checkpoint.get('copied', 0)} rows)")
+            return
+
+        last_id = checkpoint.get('last_id', 0)
+        copied = checkpoint.get('copied', 0)
+        if last_id:
+            logger.info(f"{table}: resuming after row {last_id}")
+        collection = self.db[collection_name]
+
+        while True:
+            rows = self.source.execute(query, (last_id, self.batch_size)).fetchall()
+            if not rows:
+                break
+            documents = [self.convert(table, row) for row in rows]
+            if table in FILE_FIELDS:
+                self.reference_blobs(collection, documents, FILE_FIELDS[table])
+            present, conflicts = self.insert(collection, documents)
+            if conflicts and table == 'users':
+                self.resolve_user_conflicts(conflicts)
+                present += len(conflicts)
+            elif conflicts:
+                raise RuntimeError(f"{table}: {len(conflicts)} rows conflict with existing documents")
+
+            last_id = rows[-1]['id']
+            copied += present
+            update = {'last_id': last_id, 'copied': copied, 'updated_at': datetime.utcnow()}
+            if table == 'users':
+                update['remapped'] = self.remapped_users
+            self.checkpoints.update_one({'_id': table}, {'$set': update}, upsert=True)
+            logger.info(f"{table}: copied {copied} rows (up to id {last_id})")
+
+        self.checkpoints.update_one(
+            {'_id': table},
+            {'$set': {'completed': True, 'copied': copied, 'updated_at': datetime.utcnow()}},
+            upsert=True
+        )
+
+    def run(self):
+        users = self.checkpoints.find_one({'_id': 'users'}) or {}
+        self.remapped_users = users.get('remapped', {})
+        Blob.ensure_indexes()
+        for table, collection_name, query in TABLES:
+            self.copy_table(table, collection_name, query)
+        CheatingDetection.ensure_indexes()
+        if self.missing_files:
+            logger.warning(f"{self.missing_files} referenced files were not found on disk")
+
+    def verify(self):
+        """
+        Compare SQLite row counts with the migrated documents.
+
+        Returns:
+            bool: True when every table matches
+        """
+        users = self.checkpoints.find_one({'_id': 'users'}) or {}
+        remapped = len(users.get('remapped', {}))
+        ok = True
+        print(f"{'table':<20}{'sqlite':>12}{'mongo':>12}")
+        for table, collection_name, _ in TABLES:
+            expected = self.source.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+            actual = self.db[collection_name].count_documents({'_id': legacy_id_range(table)})
+            if table == 'users':
+                actual += remapped
+            ok = ok and expected == actual
+            print(f"{table:<20}{expected:>12}{actual:>12}{'' if expected == actual else '  MISMATCH'}")
+        return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sqlite', default=DEFAULT_SQLITE_PATH, help='Legacy SQLite database')
+    parser.add_argument('--mongodb-uri', default=os.getenv('MONGODB_URI', 'mongodb://localhost:27017/assignment_checker'))
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--skip-files', action='store_true', help='Do not copy uploaded files into GridFS')
+    parser.add_argument('--verify-only', action='store_true', help='Only compare row counts')
+    parser.add_argument('--reset', action='store_true', help='Forget checkpoints and start over')
+    args = parser.parse_args()
+
+    connect(host=args.mongodb_uri)
+    migration = SqliteMigration(args.sqlite, args.batch_size, copy_files=not args.skip_files)
+    if args.reset:
+        migration.checkpoints.delete_many({})
+    if not args.verify_only:
+        migration.run()
+    if not migration.verify():
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,9 +2,16 @@ from datasketch import MinHash, MinHashLSH
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
-from typing import List, Dict, Set, Tuple
+from contextlib import nullcontext
+from typing import List, Dict, Set, Tuple, Optional, Callable
 import logging
 
+# Stage timings are exported when running inside the Flask server
+try:
+    from utils.metrics import TFIDF_FIT_SECONDS, SIMILARITY_SECONDS
+except ImportError:
+    TFIDF_FIT_SECONDS = SIMILARITY_SECONDS = None
+
 class CheatingDetector:
     def __init__(self, 
                  num_perm: int = 128,
@@ -120,10 +127,12 @@ class CheatingDetector:
             submission_ids = [sub['id'] for sub in submissions]
             
             # Create TF-IDF matrix
-            tfidf_matrix = self.tfidf.fit_transform(texts)
+            with TFIDF_FIT_SECONDS.labels(caller='cheating_detector').time() if TFIDF_FIT_SECONDS else nullcontext():
+                tfidf_matrix = self.tfidf.fit_transform(texts)
             
             # Compute pairwise similarities
-            similarities = cosine_similarity(tfidf_matrix)
+            with SIMILARITY_SECONDS.labels(caller='cheating_detector').time() if SIMILARITY_SECONDS else nullcontext():
+                similarities = cosine_similarity(tfidf_matrix)
             
             paraphrases = []
             processed_pairs = set()
@@ -152,20 +161,26 @@ class CheatingDetector:
             self.logger.error(f"Error detecting paraphrases: {str(e)}")
             return []
 
-    def analyze_submissions(self, submissions: List[Dict]) -> Dict:
+    def analyze_submissions(self, submissions: List[Dict],
+                            progress_callback: Optional[Callable[[str, float], None]] = None) -> Dict:
         """
         Analyze submissions for both exact copies and paraphrases.
         
         Args:
             submissions (List[Dict]): List of submission dictionaries with 'id' and 'text' keys
+            progress_callback (Callable): Optional hook called with (stage, fraction done)
             
         Returns:
             Dict: Analysis results including detected copies and statistics
         """
+        report = progress_callback or (lambda stage, fraction: None)
         try:
             # Detect both types of copying
+            report('exact_copies', 0.0)
             exact_copies = self.detect_exact_copies(submissions)
+            report('paraphrases', 0.4)
             paraphrases = self.detect_paraphrases(submissions)
+            report('statistics', 0.9)
             
             # Collect all suspicious submissions
             suspicious_ids = set()
@@ -7,6 +7,13 @@ import re
 import tempfile
 import logging
 import datetime
+from contextlib import nullcontext
+
+# Stage timings are exported when running inside the Flask server
+try:
+    from utils.metrics import OCR_PAGE_SECONDS
+except ImportError:
+    OCR_PAGE_SECONDS = None
 
 class OCRProcessor:
     def __init__(self, use_cloud_vision=False, google_credentials_path=None):
@@ -43,22 +50,8 @@ class OCRProcessor:
                 text_content = []
 
                 for i, image in enumerate(images):
-                    # Try Tesseract first
-                    try:
-                        page_text = pytesseract.image_to_string(image)
-                        confidence = self._get_tesseract_confidence(image)
-                        
-                        # If confidence is low and Cloud Vision is enabled, use it as fallback
-                        if confidence < 80 and self.use_cloud_vision:
-                            self.logger.info(f"Low Tesseract confidence ({confidence}%), using Cloud Vision for page {i+1}")
-                            page_text = self._extract_text_with_cloud_vision(image)
-                    except Exception as e:
-                        self.logger.error(f"Tesseract failed on page {i+1}: {str(e)}")
-                        if self.use_cloud_vision:
-                            page_text = self._extract_text_with_cloud_vision(image)
-                        else:
-                            raise
-                    
+                    with OCR_PAGE_SECONDS.time() if OCR_PAGE_SECONDS else nullcontext():
+                        page_text = self._extract_page_text(image, i + 1)
                     text_content.append(page_text)
 
                 # Combine and clean text
@@ -69,6 +62,35 @@ class OCRProcessor:
             self.logger.error(f"Error processing PDF: {str(e)}")
             raise
 
+    def _extract_page_text(self, image, page_number):
+        """
+        Extract text from one page image, falling back to Cloud Vision if enabled.
+        
+        Args:
+            image: PIL Image object
+            page_number (int): 1-based page number, for logging
+            
+        Returns:
+            str: Extracted page text
+        """
+        # Try Tesseract first
+        try:
+            page_text = pytesseract.image_to_string(image)
+            confidence = self._get_tesseract_confidence(image)
+            
+            # If confidence is low and Cloud Vision is enabled, use it as fallback
+            if confidence < 80 and self.use_cloud_vision:
+                self.logger.info(f"Low Tesseract confidence ({confidence}%), using Cloud Vision for page {page_number}")
+                page_text = self._extract_text_with_cloud_vision(image)
+        except Exception as e:
+            self.logger.error(f"Tesseract failed on page {page_number}: {str(e)}")
+            if self.use_cloud_vision:
+                page_text = self._extract_text_with_cloud_vision(image)
+            else:
+                raise
+        
+        return page_text
+
     def _get_tesseract_confidence(self, image):
         """
         Get Tesseract's confidence score for an image.
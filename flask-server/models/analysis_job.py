@@ -0,0 +1,39 @@
+from mongoengine import Document, StringField, DateTimeField, ReferenceField, FloatField, DictField, IntField
+from datetime import datetime
+from .assignment import Assignment
+
+class AnalysisJob(Document):
+    assignment = ReferenceField(Assignment, required=True)
+    cache_key = StringField(required=True)  # Digest of the analyzed submission contents and thresholds
+    status = StringField(default='Queued', choices=['Queued', 'Running', 'Completed', 'Failed'])
+    stage = StringField()  # Current step of a running job
+    progress = FloatField(default=0.0)  # Fraction of the job done, 0 to 1
+    total_submissions = IntField(default=0)
+    result = DictField()  # Summary of CheatingDetector.analyze_submissions output, see stored_result
+    error = StringField()
+    created_at = DateTimeField(default=datetime.utcnow)
+    completed_at = DateTimeField()
+
+    meta = {
+        'collection': 'analysis_jobs',
+        'indexes': [
+            ('assignment', 'cache_key', 'status'),
+            ('assignment', '-created_at')
+        ]
+    }
+
+    def to_json(self, include_result=True):
+        data = {
+            "id": str(self.id),
+            "assignment_id": str(self.assignment.id),
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "total_submissions": self.total_submissions,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None
+        }
+        if include_result and self.status == 'Completed':
+            data["result"] = self.result
+        return data
@@ -8,6 +8,7 @@ class Assignment(Document):
     description = StringField(required=True, min_length=10)
     due_date = DateTimeField(required=True)
     question_file = FileField(required=True)
+    question_file_name = StringField()  # Filename as uploaded; the GridFS file may be shared and is named by hash
     sections = ListField(StringField(), required=True)  # List of section IDs
     status = StringField(default='Active', choices=['Active', 'Archived'])
     professor = ReferenceField(User, required=True)  # Reference to the professor who created it
@@ -18,6 +19,10 @@ class Assignment(Document):
         'collection': 'assignments',
         'indexes': [
             'professor',
+            # Keyset pagination of the professor dashboard listing
+            ('professor', 'is_active', '-created_at', '-id'),
+            # Student dashboard listing; multikey, one entry per section
+            ('sections', 'is_active', '-created_at', '-id'),
             'course',
             'due_date',
             'status'
@@ -0,0 +1,28 @@
+from mongoengine import Document, StringField, DateTimeField, ObjectIdField, IntField
+from datetime import datetime
+
+class Blob(Document):
+    sha256 = StringField(primary_key=True)  # Content hash; one stored copy per distinct file
+    grid_id = ObjectIdField(required=True)  # GridFS file holding the content
+    size = IntField()
+    refcount = IntField(default=0)  # FileFields currently pointing at grid_id
+    created_at = DateTimeField(default=datetime.utcnow)
+    released_at = DateTimeField()  # Last time a reference was dropped
+
+    meta = {
+        'collection': 'blobs',
+        'indexes': [
+            'grid_id',
+            # Garbage collection of unreferenced blobs
+            ('refcount', 'released_at')
+        ]
+    }
+
+    def to_json(self):
+        return {
+            "sha256": self.sha256,
+            "size": self.size,
+            "refcount": self.refcount,
+            "created_at": self.created_at.isoformat(),
+            "released_at": self.released_at.isoformat() if self.released_at else None
+        }
@@ -0,0 +1,28 @@
+from mongoengine import Document, StringField, DateTimeField, ReferenceField, FloatField
+from datetime import datetime
+from .submission import Submission
+
+class CheatingDetection(Document):
+    submission = ReferenceField(Submission, required=True)
+    matched_submission = ReferenceField(Submission)
+    detection_type = StringField(required=True, choices=['exact_copy', 'paraphrase'])
+    similarity_score = FloatField(required=True)
+    detected_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        'collection': 'cheating_detections',
+        'indexes': [
+            'submission',
+            'matched_submission'
+        ]
+    }
+
+    def to_json(self):
+        return {
+            "id": str(self.id),
+            "submission_id": str(self.submission.id),
+            "matched_submission_id": str(self.matched_submission.id) if self.matched_submission else None,
+            "detection_type": self.detection_type,
+            "similarity_score": self.similarity_score,
+            "detected_at": self.detected_at.isoformat()
+        }
@@ -0,0 +1,88 @@
+import json
+from bson import Binary
+from mongoengine.base import BaseField
+from utils.compression import compress, decompress
+
+
+class _Packed:
+    """A compressed value as loaded from Mongo, not yet decompressed."""
+
+    __slots__ = ('payload',)
+
+    def __init__(self, payload):
+        self.payload = bytes(payload)
+
+
+class CompressedField(BaseField):
+    """
+    Field stored as a compressed binary payload and decompressed on first access.
+
+    Loading a document keeps the payload as is, so queries that never touch
+    the field pay nothing for it, and saving a document whose field was
+    never read writes the same bytes back. Values written before
+    compression was introduced are read as they are and compressed on
+    their next save. Assign a new value to change the field; in-place
+    changes are not tracked.
+
+    Empty values are not stored, so ``__exists`` only matches non-empty
+    values and an empty value reads back as None. Where "empty" and "never
+    set" mean different things, record that elsewhere on the document.
+    """
+
+    def encode(self, value):
+        raise NotImplementedError
+
+    def decode(self, data):
+        raise NotImplementedError
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = instance._data.get(self.name)
+        if isinstance(value, _Packed):
+            value = self.decode(decompress(value.payload))
+            # Cache the decoded value without marking the field as changed
+            instance._data[self.name] = value
+        return value
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, Binary)):
+            return _Packed(value)
+        return value
+
+    def to_mongo(self, value):
+        if isinstance(value, _Packed):
+            return Binary(value.payload)
+        if not value:
+            # Empty values are unset, as mongoengine does for plain fields, so $exists skips them
+            return None
+        return Binary(compress(self.encode(value)))
+
+    def prepare_query_value(self, op, value):
+        if op == 'exists' or value is None:
+            return super().prepare_query_value(op, value)
+        return self.to_mongo(value)
+
+
+class CompressedStringField(CompressedField):
+    def encode(self, value):
+        return value.encode('utf-8')
+
+    def decode(self, data):
+        return data.decode('utf-8')
+
+    def validate(self, value):
+        if not isinstance(value, (str, _Packed)):
+            self.error('CompressedStringField only accepts string values')
+
+
+class CompressedDictField(CompressedField):
+    def encode(self, value):
+        return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+    def decode(self, data):
+        return json.loads(data)
+
+    def validate(self, value):
+        if not isinstance(value, (dict, _Packed)):
+            self.error('CompressedDictField only accepts dict values')
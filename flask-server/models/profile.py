@@ -0,0 +1,33 @@
+from mongoengine import Document, StringField, DateTimeField, FloatField, FileField, IntField
+from datetime import datetime
+
+class Profile(Document):
+    kind = StringField(required=True, choices=['request', 'job'])
+    target = StringField(required=True)  # Flask endpoint or job kind
+    label = StringField()  # Request path or job arguments
+    mode = StringField(required=True, choices=['sample', 'cprofile'])
+    duration = FloatField()  # Wall-clock seconds of the profiled work
+    samples = IntField()  # Stack samples taken, for the sampling mode
+    output = FileField()  # Collapsed stacks (text) or pstats (binary) in GridFS
+    created_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        'collection': 'profiles',
+        'indexes': [
+            '-created_at',
+            ('target', '-created_at')
+        ]
+    }
+
+    def to_json(self):
+        return {
+            "id": str(self.id),
+            "kind": self.kind,
+            "target": self.target,
+            "label": self.label,
+            "mode": self.mode,
+            "duration": self.duration,
+            "samples": self.samples,
+            "size": self.output.length if self.output else 0,
+            "created_at": self.created_at.isoformat()
+        }
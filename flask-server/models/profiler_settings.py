@@ -0,0 +1,32 @@
+from mongoengine import Document, StringField, DateTimeField, FloatField, BooleanField, ListField
+from datetime import datetime
+
+class ProfilerSettings(Document):
+    # A single document holds the settings shared by every worker
+    key = StringField(required=True, unique=True, default='default')
+    enabled = BooleanField(default=False)
+    mode = StringField(default='sample', choices=['sample', 'cprofile'])
+    request_rate = FloatField(default=0.0)  # Fraction of requests profiled, 0 to 1
+    job_rate = FloatField(default=0.0)  # Fraction of processing jobs profiled, 0 to 1
+    endpoints = ListField(StringField())  # Limit request profiling to these endpoints when set
+    expires_at = DateTimeField()  # Profiling switches itself off after this time
+    updated_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        'collection': 'profiler_settings'
+    }
+
+    def is_active(self):
+        return self.enabled and (self.expires_at is None or self.expires_at > datetime.utcnow())
+
+    def to_json(self):
+        return {
+            "enabled": self.enabled,
+            "active": self.is_active(),
+            "mode": self.mode,
+            "request_rate": self.request_rate,
+            "job_rate": self.job_rate,
+            "endpoints": list(self.endpoints),
+            "expires_at": self.expires_at.isoformat() if self.expires_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
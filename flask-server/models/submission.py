@@ -1,12 +1,16 @@
-from mongoengine import Document, StringField, DateTimeField, ReferenceField, FloatField, FileField, DictField
+from mongoengine import Document, StringField, DateTimeField, ReferenceField, FloatField, FileField, DictField, IntField
 from datetime import datetime
 from .user import User
 from .assignment import Assignment
+from .fields import CompressedStringField, CompressedDictField
 
 class Submission(Document):
     student = ReferenceField(User, required=True)
     assignment = ReferenceField(Assignment, required=True)
     answer_file = FileField(required=True)  # Using FileField to store files in GridFS
+    content_hash = StringField()  # SHA-256 of the uploaded file, computed while streaming
+    file_size = IntField()  # Size of the uploaded file in bytes
+    file_name = StringField()  # Filename as uploaded; the GridFS file may be shared and is named by hash
     status = StringField(default='Submitted', choices=['Submitted', 'Processing', 'Graded', 'Late'])
     grade = FloatField()
     feedback = StringField()
@@ -14,16 +18,44 @@ class Submission(Document):
     graded_at = DateTimeField()
     
     # New fields for OCR and plagiarism
-    ocr_text = StringField()  # Extracted text from PDF
+    ocr_text = CompressedStringField()  # Extracted text from PDF, compressed; unset if it had none
     plagiarism_score = FloatField()  # Overall plagiarism percentage
-    plagiarism_details = DictField()  # Detailed plagiarism results
+    plagiarism_details = CompressedDictField()  # Detailed plagiarism results, compressed
+    cheating_flag = StringField(choices=['exact_copy', 'paraphrase'])  # Set by the latest assignment analysis
     processing_status = StringField(default='Pending', choices=['Pending', 'Processing', 'Completed', 'Failed'])
     processing_error = StringField()  # Store any errors during processing
+    processing_queue = DictField()  # Priority, bytes, batch and queue time while waiting to be processed
+    processing_timeline = DictField()  # Start/end time, pages and bytes of each processing stage
 
     meta = {
         'collection': 'submissions',
         'indexes': [
             ('student', 'assignment'),
+            # Keyset pagination of assignment submission listings
+            ('assignment', '-submitted_at', '-id'),
+            ('assignment', '-plagiarism_score', '-id'),
+            ('assignment', 'processing_status', '-submitted_at', '-id'),
+            # Plagiarism corpus of an assignment; only submissions with extracted text are indexed
+            {
+                'fields': ['assignment', 'processing_status'],
+                'partialFilterExpression': {'ocr_text': {'$exists': True}}
+            },
+            # Processing queue, next job first; only queued submissions are indexed
+            {
+                'fields': ['processing_queue.priority', 'processing_queue.bytes'],
+                'partialFilterExpression': {'processing_queue.priority': {'$exists': True}}
+            },
+            {
+                'fields': ['processing_queue.batch'],
+                'partialFilterExpression': {'processing_queue.batch': {'$exists': True}}
+            },
+            # Claims the dispatchers check for lost workers
+            {
+                'fields': ['processing_queue.claimed_at'],
+                'partialFilterExpression': {'processing_queue.claimed_at': {'$exists': True}}
+            },
+            # Reuse of text extracted from a byte-identical file
+            'content_hash',
             'submitted_at',
             'status',
             'processing_status'
@@ -44,6 +76,7 @@ class Submission(Document):
             "submitted_at": self.submitted_at.isoformat(),
             "graded_at": self.graded_at.isoformat() if self.graded_at else None,
             "plagiarism_score": self.plagiarism_score,
+            "cheating_flag": self.cheating_flag,
             "processing_status": self.processing_status,
             "processing_error": self.processing_error if self.processing_error else None
         } 
\ No newline at end of file
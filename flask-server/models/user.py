@@ -1,7 +1,12 @@
-from mongoengine import Document, StringField, EmailField, DateTimeField, BooleanField, ListField
+from mongoengine import Document, StringField, EmailField, DateTimeField, BooleanField, ListField, ValidationError
 from datetime import datetime
+import hashlib
+import hmac
 from werkzeug.security import generate_password_hash, check_password_hash
 
+# Marks an unsalted SHA-256 hash carried over from the SQLite store
+LEGACY_HASH_PREFIX = 'legacy-sha256$'
+
 class User(Document):
     email = EmailField(required=True, unique=True)
     password_hash = StringField(required=True)
@@ -32,8 +37,14 @@ class User(Document):
         self.password_hash = generate_password_hash(password)
 
     def check_password(self, password):
+        if self.has_legacy_password():
+            legacy = hashlib.sha256(password.encode()).hexdigest()
+            return hmac.compare_digest(self.password_hash[len(LEGACY_HASH_PREFIX):], legacy)
         return check_password_hash(self.password_hash, password)
 
+    def has_legacy_password(self):
+        return self.password_hash.startswith(LEGACY_HASH_PREFIX)
+
     def clean(self):
         # Make section required for students
         if self.user_type == 'student' and not self.section:
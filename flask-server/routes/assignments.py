@@ -1,16 +1,36 @@
-from flask import Blueprint, request, jsonify, session, send_file, current_app
+from flask import Blueprint, request, jsonify, session, current_app, Response
 from werkzeug.utils import secure_filename
 from models.user import User
 from models.assignment import Assignment
 from models.submission import Submission
+from models.analysis_job import AnalysisJob
 from utils.document_processor import document_processor
+from utils.analysis_jobs import analysis_runner
+from utils.events import submission_events, format_sse, TERMINAL_STAGES
+from utils.identity import current_identity, current_user, referenced_id
+from utils.cache import (
+    response_cache, invalidate_submission,
+    STUDENT_ASSIGNMENTS, PROFESSOR_ASSIGNMENTS, SUBMISSION_STATUS
+)
+from utils.timeline import timeline_to_json, stage_percentiles
+from utils.pagination import request_limit, keyset_page, paginated_response
+from utils.file_streaming import send_gridfs_file
+from utils.upload_stream import hash_stream, max_upload_size, UploadRejected
+from utils.blob_store import store_blob, release_blob
+from utils.student_listing import student_assignments
+from werkzeug.datastructures import FileStorage
 import os
+import json
 import uuid
+import zipfile
 import datetime
 import logging
+import queue
+import threading
+import time
 from functools import wraps
-import io
-from mongoengine.errors import ValidationError
+from mongoengine.errors import ValidationError, DoesNotExist
+from bson import ObjectId
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -22,6 +42,17 @@ assignments_bp = Blueprint('assignments', __name__)
 ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx'}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 
+# Submission status stream settings. Streams are long polls: each holds a
+# request thread, so it ends after SSE_MAX_DURATION and the client reconnects
+SSE_HEARTBEAT_SECONDS = 10  # Keep-alive comment interval
+SSE_RECHECK_SECONDS = 10  # Database recheck when the job runs in another worker
+SSE_MAX_DURATION = 25  # Clients reconnect after this many seconds
+# Streams a worker holds open at once; past this a stream sends the current
+# stage and closes, so status watchers cannot take every request thread
+SSE_MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS', '4'))
+
+stream_slots = threading.BoundedSemaphore(SSE_MAX_STREAMS)
+
 def allowed_file(filename):
     """Check if the file extension is allowed."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -61,17 +92,7 @@ def validate_file(file):
     if not allowed_file(file.filename):
         return None, f'Invalid file type. Allowed types are: {", ".join(ALLOWED_EXTENSIONS)}'
 
-    # Check file size (10MB limit)
-    file.seek(0, 2)  # Seek to end of file
-    size = file.tell()  # Get current position (file size)
-    file.seek(0)  # Reset file position
-
-    if size > MAX_FILE_SIZE:
-        return None, 'File size exceeds 10MB limit'
-
-    # Check if file is empty
-    if size == 0:
-        return None, 'File is empty'
+    # Size, emptiness and magic bytes are checked while streaming into GridFS
 
     # Check content type
     content_type = file.content_type
@@ -80,33 +101,77 @@ def validate_file(file):
 
     return file, None
 
+def parse_iso_datetime(value):
+    """Parse an ISO 8601 query parameter into a naive UTC datetime."""
+    parsed = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return parsed
+
+SUBMISSION_SORT_FIELDS = {'submitted_at', 'plagiarism_score'}
+
+def filter_submissions(queryset, args):
+    """Apply the listing filters from the query string to a submission queryset."""
+    processing_status = args.get('processing_status')
+    if processing_status:
+        queryset = queryset.filter(processing_status__in=processing_status.split(','))
+
+    if args.get('min_score'):
+        queryset = queryset.filter(plagiarism_score__gte=float(args['min_score']))
+    if args.get('max_score'):
+        queryset = queryset.filter(plagiarism_score__lte=float(args['max_score']))
+
+    if args.get('submitted_after'):
+        queryset = queryset.filter(submitted_at__gte=parse_iso_datetime(args['submitted_after']))
+    if args.get('submitted_before'):
+        queryset = queryset.filter(submitted_at__lt=parse_iso_datetime(args['submitted_before']))
+
+    return queryset
+
+def load_professor_assignments(user_id, cursor, limit):
+    """Build one page of the professor dashboard listing."""
+    assignments, next_cursor = keyset_page(
+        Assignment.objects(professor=ObjectId(user_id), is_active=True),
+        'created_at',
+        cursor=cursor,
+        limit=limit
+    )
+    return [assignment.to_json() for assignment in assignments], next_cursor
+
+def load_submission_status(submission_id):
+    """Load a submission's status payload with the ids needed to authorize it."""
+    submission = Submission.objects(id=submission_id).first()
+    if not submission:
+        return None
+
+    return {
+        'student_id': referenced_id(submission, 'student'),
+        'professor_id': referenced_id(submission.assignment, 'professor'),
+        'queue_entry': dict(submission.processing_queue or {}),
+        'payload': {
+            'id': str(submission.id),
+            'processing_status': submission.processing_status,
+            'processing_error': submission.processing_error,
+            'plagiarism_score': submission.plagiarism_score,
+            'plagiarism_details': submission.plagiarism_details,
+            'processing_timeline': timeline_to_json(submission.processing_timeline)
+        }
+    }
+
 @assignments_bp.route('/api/student/assignments', methods=['GET'])
 @login_required
 @student_required
 def get_student_assignments():
     try:
-        user = User.objects(id=session['user_id']).first()
-        if not user:
+        identity = current_identity()
+        if not identity:
             return jsonify({'error': 'User not found'}), 404
 
-        # Get all active assignments
-        assignments = Assignment.objects(is_active=True)
-
-        # Get submissions for this student
-        submissions = Submission.objects(student=user)
-        submission_map = {str(sub.assignment.id): sub for sub in submissions}
-
-        assignment_list = []
-        for assignment in assignments:
-            assignment_data = assignment.to_json()
-            submission = submission_map.get(str(assignment.id))
-            assignment_data.update({
-                'status': submission.status if submission else 'Not Started',
-                'grade': submission.grade if submission else None,
-                'submitted_at': submission.submitted_at.isoformat() if submission and submission.submitted_at else None
-            })
-            assignment_list.append(assignment_data)
-
+        user_id = identity['id']
+        assignment_list = response_cache.get_or_load(
+            (STUDENT_ASSIGNMENTS, user_id),
+            lambda: student_assignments(user_id, identity['section'])
+        )
         return jsonify(assignment_list)
 
     except Exception as e:
@@ -118,13 +183,21 @@ def get_student_assignments():
 @professor_required
 def get_professor_assignments():
     try:
-        user = User.objects(id=session['user_id']).first()
-        if not user:
+        identity = current_identity()
+        if not identity:
             return jsonify({'error': 'User not found'}), 404
 
-        assignments = Assignment.objects(professor=user, is_active=True)
-        return jsonify([assignment.to_json() for assignment in assignments])
-
+        user_id = identity['id']
+        cursor = request.args.get('cursor')
+        limit = request_limit(request.args)
+        page = response_cache.get_or_load(
+            (PROFESSOR_ASSIGNMENTS, user_id, cursor, limit),
+            lambda: load_professor_assignments(user_id, cursor, limit)
+        )
+        return paginated_response(*page)
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error fetching professor assignments: {str(e)}")
         return jsonify({'error': 'Failed to fetch assignments'}), 500
@@ -134,12 +207,6 @@ def get_professor_assignments():
 @professor_required
 def create_assignment():
     try:
-        logger.info("Starting assignment creation...")
-
-        # Log all form data
-        logger.info(f"Form data: {request.form}")
-        logger.info(f"Files: {request.files}")
-
         # Get form data
         name = request.form.get('name')
         course = request.form.get('course')
@@ -147,9 +214,6 @@ def create_assignment():
         due_date = request.form.get('due_date')
         sections = request.form.getlist('sections[]')
 
-        # Log received data
-        logger.info(f"Received data: name={name}, course={course}, description={description}, due_date={due_date}, sections={sections}")
-
         # Validate required fields
         if not all([name, course, description, due_date]):
             missing_fields = [field for field, value in {
@@ -167,7 +231,6 @@ def create_assignment():
 
         # Validate and parse due date
         try:
-            logger.info(f"Parsing due date: {due_date}")
             due_date = datetime.datetime.fromisoformat(due_date.replace('Z', '+00:00'))
         except ValueError as e:
             logger.error(f"Date parsing error: {str(e)}")
@@ -179,7 +242,6 @@ def create_assignment():
             return jsonify({'error': 'No file uploaded'}), 400
 
         file = request.files['question_file']
-        logger.info(f"Received file: {file.filename}, type: {file.content_type}, size: {file.content_length if hasattr(file, 'content_length') else 'unknown'}")
 
         file_validation_result, error_message = validate_file(file)
         if error_message:
@@ -187,41 +249,49 @@ def create_assignment():
             return jsonify({'error': error_message}), 400
 
         # Get current user
-        try:
-            current_user = User.objects.get(id=session['user_id'])
-            logger.info(f"Found professor: {current_user.email}")
-        except Exception as e:
-            logger.error(f"Error getting current user: {str(e)}")
+        professor = current_user()
+        if not professor:
+            logger.error("Logged-in professor account not found")
             return jsonify({'error': 'Could not verify professor account'}), 401
 
         # Create new assignment
         try:
-            logger.info("Creating new assignment...")
             new_assignment = Assignment(
                 name=name,
                 course=course,
                 description=description,
                 due_date=due_date,
                 sections=sections,
-                professor=current_user
+                professor=professor
             )
 
-            # Save the file
-            logger.info("Saving file...")
-            new_assignment.question_file.put(
-                file_validation_result,
-                filename=secure_filename(file.filename),
-                content_type=file.content_type
-            )
+            # Stream the file into GridFS, or reuse an identical stored copy
+            try:
+                store_blob(file_validation_result, new_assignment.question_file, MAX_FILE_SIZE)
+                new_assignment.question_file_name = secure_filename(file.filename)
+            except UploadRejected as e:
+                logger.error(f"File validation error: {str(e)}")
+                return jsonify({'error': str(e)}), 400
 
             # Validate and save the assignment
-            logger.info("Validating assignment...")
-            new_assignment.validate()  # This will run the clean method
-
-            logger.info("Saving assignment...")
-            new_assignment.save()
-
-            logger.info(f"Assignment created successfully with ID: {new_assignment.id}")
+            try:
+                new_assignment.validate()  # This will run the clean method
+
+                new_assignment.save()
+            except Exception:
+                # Don't leave an orphaned file behind
+                release_blob(new_assignment.question_file, new_assignment.question_file.grid_id)
+                raise
+
+            # Every student listing may now include the new assignment
+            response_cache.invalidate_prefix((STUDENT_ASSIGNMENTS,))
+            response_cache.invalidate_prefix((PROFESSOR_ASSIGNMENTS, str(professor.id)))
+
+            logger.info("Assignment created", extra={'fields': {
+                'assignment_id': str(new_assignment.id),
+                'professor_id': str(professor.id),
+                'sections': len(sections)
+            }})
             return jsonify(new_assignment.to_json()), 201
 
         except ValidationError as e:
@@ -238,7 +308,7 @@ def create_assignment():
 def submit_assignment(assignment_id):
     try:
         # Get student and assignment
-        student = User.objects(id=session['user_id']).first()
+        student = current_user()
         assignment = Assignment.objects(id=assignment_id).first()
 
         if not assignment:
@@ -259,12 +329,10 @@ def submit_assignment(assignment_id):
         if submission:
             # Update existing submission
             try:
-                filename = secure_filename(file.filename)
-                submission.answer_file.replace(
-                    file,
-                    filename=filename,
-                    content_type=file.content_type
-                )
+                stored = store_blob(file, submission.answer_file, MAX_FILE_SIZE)
+                submission.content_hash = stored.sha256
+                submission.file_size = stored.size
+                submission.file_name = secure_filename(file.filename)
                 submission.submitted_at = datetime.datetime.utcnow()
                 submission.status = 'Submitted'
                 submission.processing_status = 'Pending'  # Reset processing status
@@ -272,7 +340,14 @@ def submit_assignment(assignment_id):
                 submission.plagiarism_score = None  # Clear previous plagiarism score
                 submission.plagiarism_details = None  # Clear previous details
                 submission.processing_error = None  # Clear any previous errors
-                submission.save()
+                try:
+                    submission.save()
+                except Exception:
+                    release_blob(submission.answer_file, submission.answer_file.grid_id)
+                    raise
+                release_blob(submission.answer_file, stored.replaced_grid_id)
+            except UploadRejected as e:
+                return jsonify({'error': str(e)}), 400
             except Exception as e:
                 logger.error(f"Error updating submission file: {str(e)}")
                 return jsonify({'error': 'Failed to update submission file'}), 500
@@ -285,20 +360,26 @@ def submit_assignment(assignment_id):
                     status='Submitted',
                     processing_status='Pending'
                 )
-                filename = secure_filename(file.filename)
-                submission.answer_file.put(
-                    file,
-                    filename=filename,
-                    content_type=file.content_type
-                )
-                submission.save()
+                stored = store_blob(file, submission.answer_file, MAX_FILE_SIZE)
+                submission.content_hash = stored.sha256
+                submission.file_size = stored.size
+                submission.file_name = secure_filename(file.filename)
+                try:
+                    submission.save()
+                except Exception:
+                    release_blob(submission.answer_file, submission.answer_file.grid_id)
+                    raise
+            except UploadRejected as e:
+                return jsonify({'error': str(e)}), 400
             except Exception as e:
                 logger.error(f"Error creating submission: {str(e)}")
                 return jsonify({'error': 'Failed to create submission'}), 500
 
+        invalidate_submission(submission.id, student.id)
+
         # Start asynchronous processing
         try:
-            document_processor.process_submission_async(submission.id)
+            document_processor.process_submission_async(submission.id, size=submission.file_size)
             logger.info(f"Started processing for submission {submission.id}")
         except Exception as e:
             logger.error(f"Error starting document processing: {str(e)}")
@@ -314,6 +395,223 @@ def submit_assignment(assignment_id):
         logger.error(f"Error submitting assignment: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def read_bulk_mapping(raw_mapping):
+    """Parse the filename -> student email mapping of a bulk import."""
+    mapping = json.loads(raw_mapping)
+    if not isinstance(mapping, dict) or not mapping:
+        raise ValueError('mapping must be a non-empty JSON object of filename to student email')
+    return {os.path.basename(name): str(email).strip().lower() for name, email in mapping.items()}
+
+@assignments_bp.route('/api/assignments/<assignment_id>/bulk-import', methods=['POST'])
+@login_required
+@professor_required
+@max_upload_size('BULK_IMPORT_MAX_SIZE')
+def bulk_import_submissions(assignment_id):
+    try:
+        assignment = Assignment.objects(id=assignment_id).first()
+        if not assignment:
+            return jsonify({'error': 'Assignment not found'}), 404
+        if referenced_id(assignment, 'professor') != session['user_id']:
+            return jsonify({'error': 'Not authorized'}), 403
+
+        archive = request.files.get('archive')
+        if not archive or not archive.filename.lower().endswith('.zip'):
+            return jsonify({'error': 'A ZIP archive is required'}), 400
+
+        try:
+            mapping = read_bulk_mapping(request.form.get('mapping', ''))
+        except json.JSONDecodeError:
+            return jsonify({'error': 'mapping must be valid JSON'}), 400
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Resolve students and their existing submissions in two queries
+        students = {
+            student.email.lower(): student
+            for student in User.objects(email__in=list(set(mapping.values())), user_type='student')
+        }
+        existing = {
+            str(sub.student.id): sub
+            for sub in Submission.objects(
+                assignment=assignment,
+                student__in=list(students.values())
+            ).no_dereference()
+        }
+
+        try:
+            zip_file = zipfile.ZipFile(archive.stream)
+        except zipfile.BadZipFile:
+            return jsonify({'error': 'Invalid ZIP archive'}), 400
+
+        imported, unchanged, skipped = [], [], []
+        imported_bytes = 0
+        with zip_file:
+            members = {
+                os.path.basename(info.filename): info
+                for info in zip_file.infolist()
+                if not info.is_dir() and not info.filename.startswith('__MACOSX/')
+            }
+
+            for name, email in mapping.items():
+                info = members.get(name)
+                student = students.get(email)
+                if info is None:
+                    skipped.append({'filename': name, 'reason': 'File not found in archive'})
+                    continue
+                if student is None:
+                    skipped.append({'filename': name, 'reason': f'Unknown student {email}'})
+                    continue
+                if student.section not in assignment.sections:
+                    skipped.append({'filename': name, 'reason': f'Student {email} is not in an assignment section'})
+                    continue
+                if info.file_size > MAX_FILE_SIZE:
+                    skipped.append({'filename': name, 'reason': 'File size exceeds 10MB limit'})
+                    continue
+
+                try:
+                    # Hash first so re-imports of an unchanged file cost no GridFS write
+                    with zip_file.open(info) as entry:
+                        content_hash, _ = hash_stream(entry, MAX_FILE_SIZE)
+
+                    submission = existing.get(str(student.id))
+                    if submission and submission.content_hash == content_hash:
+                        unchanged.append(str(submission.id))
+                        continue
+
+                    if submission is None:
+                        submission = Submission(student=student, assignment=assignment)
+
+                    # The hash is known, so an identical stored file is reused without reading the entry again
+                    with zip_file.open(info) as entry:
+                        stored = store_blob(
+                            FileStorage(stream=entry, filename=name, content_type='application/pdf'),
+                            submission.answer_file,
+                            MAX_FILE_SIZE,
+                            sha256=content_hash
+                        )
+
+                    submission.content_hash = stored.sha256
+                    submission.file_size = stored.size
+                    submission.file_name = secure_filename(name)
+                    submission.submitted_at = datetime.datetime.utcnow()
+                    submission.status = 'Submitted'
+                    submission.processing_status = 'Pending'
+                    submission.ocr_text = None
+                    submission.plagiarism_score = None
+                    submission.plagiarism_details = None
+                    submission.processing_error = None
+                    try:
+                        submission.save()
+                    except Exception:
+                        # Give back the reference store_blob took
+                        release_blob(submission.answer_file, submission.answer_file.grid_id)
+                        raise
+                    release_blob(submission.answer_file, stored.replaced_grid_id)
+                    invalidate_submission(submission.id, student.id)
+                    imported.append(str(submission.id))
+                    imported_bytes += stored.size
+
+                except UploadRejected as e:
+                    skipped.append({'filename': name, 'reason': str(e)})
+                except Exception as e:
+                    # A corrupt entry or failed write skips that file; the rest of the batch still runs
+                    logger.error(f"Error importing {name} for assignment {assignment_id}: {str(e)}")
+                    skipped.append({'filename': name, 'reason': 'Could not import file'})
+
+        # Queue extraction and plagiarism checks for the whole batch as one job
+        if imported:
+            document_processor.process_batch_async(assignment.id, imported, size=imported_bytes)
+            logger.info(f"Started batch processing of {len(imported)} submissions for assignment {assignment_id}")
+
+        return jsonify({
+            'imported': imported,
+            'unchanged': unchanged,
+            'skipped': skipped,
+            'message': f'Imported {len(imported)} submissions. Processing started.'
+        }), 202
+
+    except Exception as e:
+        logger.error(f"Error importing submissions: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Failed to import submissions'}), 500
+
+@assignments_bp.route('/api/assignments/<assignment_id>/analysis', methods=['POST'])
+@login_required
+@professor_required
+def start_assignment_analysis(assignment_id):
+    try:
+        assignment = Assignment.objects(id=assignment_id).first()
+        if not assignment:
+            return jsonify({'error': 'Assignment not found'}), 404
+        if referenced_id(assignment, 'professor') != session['user_id']:
+            return jsonify({'error': 'Not authorized'}), 403
+
+        job, created = analysis_runner.start(assignment.id)
+        if job.status == 'Completed':
+            # Nothing changed since the last run, so the cached result stands
+            return jsonify({**job.to_json(), 'cached': True}), 200
+
+        return jsonify({**job.to_json(), 'cached': False}), 202 if created else 200
+
+    except Exception as e:
+        logger.error(f"Error starting assignment analysis: {str(e)}")
+        return jsonify({'error': 'Failed to start analysis'}), 500
+
+@assignments_bp.route('/api/assignments/<assignment_id>/analysis/<job_id>', methods=['GET'])
+@login_required
+@professor_required
+def get_assignment_analysis(assignment_id, job_id):
+    try:
+        assignment = Assignment.objects(id=assignment_id).first()
+        if not assignment:
+            return jsonify({'error': 'Assignment not found'}), 404
+        if referenced_id(assignment, 'professor') != session['user_id']:
+            return jsonify({'error': 'Not authorized'}), 403
+
+        job = AnalysisJob.objects(id=job_id, assignment=assignment).first()
+        if not job:
+            return jsonify({'error': 'Analysis job not found'}), 404
+
+        return jsonify(job.to_json())
+
+    except Exception as e:
+        logger.error(f"Error fetching assignment analysis: {str(e)}")
+        return jsonify({'error': 'Failed to fetch analysis'}), 500
+
+@assignments_bp.route('/api/assignments/<assignment_id>/processing-stats', methods=['GET'])
+@login_required
+@professor_required
+def get_processing_stats(assignment_id):
+    try:
+        assignment = Assignment.objects(id=assignment_id).first()
+        if not assignment:
+            return jsonify({'error': 'Assignment not found'}), 404
+        if referenced_id(assignment, 'professor') != session['user_id']:
+            return jsonify({'error': 'Not authorized'}), 403
+
+        submissions = Submission.objects(assignment=assignment.id, processing_timeline__exists=True)
+        if request.args.get('processing_status'):
+            submissions = submissions.filter(processing_status__in=request.args['processing_status'].split(','))
+        if request.args.get('submitted_after'):
+            submissions = submissions.filter(submitted_at__gte=parse_iso_datetime(request.args['submitted_after']))
+
+        # Only the timelines are read, as raw dicts
+        timelines = [
+            doc['processing_timeline']
+            for doc in submissions.only('processing_timeline').as_pymongo()
+        ]
+
+        return jsonify({
+            'assignment_id': str(assignment.id),
+            'submissions': len(timelines),
+            'stages': stage_percentiles(timelines)
+        })
+
+    except ValueError:
+        return jsonify({'error': 'Invalid filter value'}), 400
+    except Exception as e:
+        logger.error(f"Error computing processing stats: {str(e)}")
+        return jsonify({'error': 'Failed to compute processing stats'}), 500
+
 @assignments_bp.route('/api/assignments/<assignment_id>/download', methods=['GET'])
 @login_required
 def download_assignment(assignment_id):
@@ -337,28 +635,16 @@ def download_assignment(assignment_id):
             return jsonify({'error': 'Assignment file not found'}), 404
 
         try:
-            # Get the file from GridFS
-            file_data = assignment.question_file.read()
-            if not file_data:
+            # Stream the file from GridFS chunk by chunk
+            # The GridFS name is the content hash, shared with any identical upload
+            filename = assignment.question_file_name or f"{assignment.name}.pdf"
+            response = send_gridfs_file(assignment.question_file, filename)
+            if response is None:
                 logger.error(f"Empty file data for assignment {assignment_id}")
                 return jsonify({'error': 'Assignment file is empty'}), 404
 
-            # Get file metadata
-            content_type = assignment.question_file.content_type or 'application/pdf'
-            filename = assignment.question_file.filename or f"{assignment.name}.pdf"
-
-            logger.info(f"Successfully retrieved file for assignment {assignment_id}")
-            logger.info(f"File details - Name: {filename}, Type: {content_type}, Size: {len(file_data)} bytes")
-
-            # Create file stream
-            file_stream = io.BytesIO(file_data)
-
-            return send_file(
-                file_stream,
-                mimetype=content_type,
-                as_attachment=True,
-                download_name=filename
-            )
+            logger.info(f"Serving file for assignment {assignment_id} with status {response.status_code}")
+            return response
 
         except Exception as e:
             logger.error(f"Error reading file from GridFS: {str(e)}")
@@ -368,32 +654,162 @@ def download_assignment(assignment_id):
         logger.error(f"Error downloading assignment: {str(e)}")
         return jsonify({'error': 'Failed to download assignment'}), 500
 
-@assignments_bp.route('/api/submissions/<submission_id>/status', methods=['GET'])
+@assignments_bp.route('/api/submissions/<submission_id>/download', methods=['GET'])
 @login_required
-def check_submission_status(submission_id):
+def download_submission(submission_id):
+    try:
+        submission = Submission.objects(id=submission_id).first()
+        if not submission:
+            return jsonify({'error': 'Submission not found'}), 404
+
+        # Students may fetch their own answer, professors the answers to their assignments
+        user_id = session['user_id']
+        user_type = session.get('user_type')
+
+        if user_type == 'student' and referenced_id(submission, 'student') != user_id:
+            return jsonify({'error': 'Not authorized to view this submission'}), 403
+        elif user_type == 'professor' and referenced_id(submission.assignment, 'professor') != user_id:
+            return jsonify({'error': 'Not authorized to view this submission'}), 403
+
+        if not submission.answer_file:
+            return jsonify({'error': 'Submission file not found'}), 404
+
+        # The GridFS name is the content hash, shared with any identical upload
+        filename = submission.file_name or f"submission_{submission_id}.pdf"
+        response = send_gridfs_file(submission.answer_file, filename)
+        if response is None:
+            return jsonify({'error': 'Submission file not found'}), 404
+        return response
+
+    except Exception as e:
+        logger.error(f"Error downloading submission: {str(e)}")
+        return jsonify({'error': 'Failed to download submission'}), 500
+
+def submission_status_event(submission):
+    """Describe a stored submission's processing state as a status stream event."""
+    stage = {
+        'Pending': 'queued',
+        'Processing': 'extracting',
+        'Completed': 'completed',
+        'Failed': 'failed'
+    }.get(submission.processing_status, 'queued')
+    event = {
+        'submission_id': str(submission.id),
+        'stage': stage,
+        'processing_status': submission.processing_status
+    }
+    if stage == 'completed':
+        event['plagiarism_score'] = submission.plagiarism_score
+    elif stage == 'failed':
+        event['error'] = submission.processing_error
+    return event
+
+@assignments_bp.route('/api/submissions/<submission_id>/events', methods=['GET'])
+@login_required
+def stream_submission_status(submission_id):
     try:
-        # Get the submission
+        # Authorize once per connection rather than once per poll
         submission = Submission.objects(id=submission_id).first()
         if not submission:
             return jsonify({'error': 'Submission not found'}), 404
 
+        user_id = session['user_id']
+        user_type = session.get('user_type')
+
+        if user_type == 'student' and referenced_id(submission, 'student') != user_id:
+            return jsonify({'error': 'Not authorized to view this submission'}), 403
+        elif user_type == 'professor' and referenced_id(submission.assignment, 'professor') != user_id:
+            return jsonify({'error': 'Not authorized to view this submission'}), 403
+
+    except Exception as e:
+        logger.error(f"Error opening submission status stream: {str(e)}")
+        return jsonify({'error': 'Failed to check submission status'}), 500
+
+    initial_event = None if submission_events.last_event(submission_id) else submission_status_event(submission)
+
+    def generate():
+        if not stream_slots.acquire(blocking=False):
+            # Every stream slot is taken: answer like a short poll
+            yield 'retry: 3000\n\n'
+            yield format_sse(submission_events.last_event(submission_id) or submission_status_event(submission), 1)
+            return
+
+        subscriber = submission_events.subscribe(submission_id)
+        event_id = 0
+        seen_local_event = initial_event is None
+        last_stage = None
+        started = last_check = time.monotonic()
+        try:
+            yield 'retry: 3000\n\n'
+            if initial_event:
+                event_id += 1
+                last_stage = initial_event['stage']
+                yield format_sse(initial_event, event_id)
+                if last_stage in TERMINAL_STAGES:
+                    return
+
+            while time.monotonic() - started < SSE_MAX_DURATION:
+                try:
+                    event = subscriber.get(timeout=SSE_HEARTBEAT_SECONDS)
+                    seen_local_event = True
+                except queue.Empty:
+                    event = None
+                    # Only another worker is processing this job; look it up sparingly
+                    if not seen_local_event and time.monotonic() - last_check >= SSE_RECHECK_SECONDS:
+                        last_check = time.monotonic()
+                        current = Submission.objects(id=submission_id).only(
+                            'processing_status', 'plagiarism_score', 'processing_error'
+                        ).first()
+                        if current and submission_status_event(current)['stage'] != last_stage:
+                            event = submission_status_event(current)
+
+                if event is None:
+                    yield ': keep-alive\n\n'
+                    continue
+
+                event_id += 1
+                last_stage = event['stage']
+                yield format_sse(event, event_id)
+                if last_stage in TERMINAL_STAGES:
+                    return
+        finally:
+            submission_events.unsubscribe(submission_id, subscriber)
+            stream_slots.release()
+
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@assignments_bp.route('/api/submissions/<submission_id>/status', methods=['GET'])
+@login_required
+def check_submission_status(submission_id):
+    try:
+        # Get the submission, shared by concurrent pollers of the same id
+        status = response_cache.get_or_load(
+            (SUBMISSION_STATUS, submission_id),
+            lambda: load_submission_status(submission_id)
+        )
+        if not status:
+            return jsonify({'error': 'Submission not found'}), 404
+
         # Check if user has permission to view this submission
         user_id = session['user_id']
         user_type = session.get('user_type')
 
-        if user_type == 'student' and str(submission.student.id) != user_id:
+        if user_type == 'student' and status['student_id'] != user_id:
             return jsonify({'error': 'Not authorized to view this submission'}), 403
-        elif user_type == 'professor' and str(submission.assignment.professor.id) != user_id:
+        elif user_type == 'professor' and status['professor_id'] != user_id:
             return jsonify({'error': 'Not authorized to view this submission'}), 403
 
+        # Waiting submissions also get the queue depth, their position and expected wait
+        payload = status['payload']
+        if payload['processing_status'] == 'Pending':
+            payload = {**payload, 'queue': document_processor.scheduler.queue_status(status['queue_entry'])}
+
         # Return submission status and results
-        return jsonify({
-            'id': str(submission.id),
-            'processing_status': submission.processing_status,
-            'processing_error': submission.processing_error,
-            'plagiarism_score': submission.plagiarism_score,
-            'plagiarism_details': submission.plagiarism_details
-        })
+        return jsonify(payload)
 
     except Exception as e:
         logger.error(f"Error checking submission status: {str(e)}")
@@ -406,28 +822,51 @@ def get_assignment_submissions(assignment_id):
         if not session.get('user_id'):
             return jsonify({'error': 'Not authenticated'}), 401
 
-        current_user = User.objects.get(id=session['user_id'])
+        identity = current_identity()
+        if not identity:
+            return jsonify({'error': 'Not authenticated'}), 401
         assignment = Assignment.objects.get(id=assignment_id)
 
         # For professors: return all submissions for their assignment
-        if current_user.user_type == 'professor':
-            if str(assignment.professor.id) != str(current_user.id):
+        if identity['user_type'] == 'professor':
+            if referenced_id(assignment, 'professor') != identity['id']:
                 return jsonify({'error': 'Not authorized'}), 403
 
             submissions = Submission.objects(assignment=assignment)
-            return jsonify([sub.to_json() for sub in submissions]), 200
 
         # For students: return only their own submissions
-        elif current_user.user_type == 'student':
-            if current_user.section not in assignment.sections:
+        elif identity['user_type'] == 'student':
+            if identity['section'] not in assignment.sections:
                 return jsonify({'error': 'Not authorized'}), 403
 
             submissions = Submission.objects(
                 assignment=assignment,
-                student=current_user
+                student=ObjectId(identity['id'])
             )
-            return jsonify([sub.to_json() for sub in submissions]), 200
 
+        else:
+            return jsonify({'error': 'Not authorized'}), 403
+
+        sort_field = request.args.get('sort', 'submitted_at')
+        if sort_field not in SUBMISSION_SORT_FIELDS:
+            return jsonify({'error': f'Invalid sort field. Allowed: {", ".join(sorted(SUBMISSION_SORT_FIELDS))}'}), 400
+
+        submissions = filter_submissions(submissions, request.args)
+        if sort_field == 'plagiarism_score':
+            # Unscored submissions have no position in a score ranking
+            submissions = submissions.filter(plagiarism_score__ne=None)
+
+        page, next_cursor = keyset_page(
+            submissions,
+            sort_field,
+            descending=request.args.get('order', 'desc') != 'asc',
+            cursor=request.args.get('cursor'),
+            limit=request_limit(request.args)
+        )
+        return paginated_response([sub.to_json() for sub in page], next_cursor), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except DoesNotExist:
         return jsonify({'error': 'Assignment not found'}), 404
     except Exception as e:
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, session
 from werkzeug.security import generate_password_hash, check_password_hash
 from models.user import User
+from utils.identity import current_user
 import logging
 from datetime import datetime
 from mongoengine.errors import NotUniqueError, ValidationError
@@ -81,6 +82,11 @@ def login():
         if not user or not user.check_password(password):
             return jsonify({'error': 'Invalid email or password'}), 401
 
+        # Users migrated from SQLite move to a salted hash on their first login
+        if user.has_legacy_password():
+            user.set_password(password)
+            User.objects(id=user.id).update(set__password_hash=user.password_hash)
+
         # Verify user type
         if is_student != (user.user_type == 'student'):
             portal_type = 'student' if is_student else 'professor'
@@ -115,7 +121,7 @@ def check_session():
             logger.info("No user_id in session")
             return jsonify({'logged_in': False})
 
-        user = User.objects(id=user_id).first()
+        user = current_user()
         if not user:
             logger.info(f"No user found for id: {user_id}")
             session.clear()
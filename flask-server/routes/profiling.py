@@ -0,0 +1,138 @@
+from flask import Blueprint, request, jsonify, current_app
+from models.profile import Profile
+from models.profiler_settings import ProfilerSettings
+from utils.profiling import PROFILE_MODES, invalidate_settings
+from utils.file_streaming import send_gridfs_file
+from utils.pagination import parse_limit
+import datetime
+import hmac
+import logging
+from functools import wraps
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+profiling_bp = Blueprint('profiling', __name__)
+
+# Profiling switches itself off after this long unless told otherwise
+DEFAULT_PROFILING_MINUTES = 30
+MAX_PROFILING_MINUTES = 24 * 60
+
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        token = current_app.config.get('PROFILER_TOKEN')
+        if not token:
+            return jsonify({'error': 'Profiling is not configured'}), 404
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied, f'Bearer {token}'):
+            return jsonify({'error': 'Admin token required'}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+def parse_rate(value):
+    """Parse a sampling fraction between 0 and 1."""
+    rate = float(value)
+    if not 0 <= rate <= 1:
+        raise ValueError('Sampling rates must be between 0 and 1')
+    return rate
+
+@profiling_bp.route('/api/admin/profiler', methods=['GET'])
+@admin_required
+def get_profiler_settings():
+    settings = ProfilerSettings.objects(key='default').first() or ProfilerSettings()
+    return jsonify(settings.to_json())
+
+@profiling_bp.route('/api/admin/profiler', methods=['PUT'])
+@admin_required
+def update_profiler_settings():
+    try:
+        data = request.get_json() or {}
+        settings = ProfilerSettings.objects(key='default').first() or ProfilerSettings()
+
+        if 'enabled' in data:
+            settings.enabled = bool(data['enabled'])
+        if 'mode' in data:
+            if data['mode'] not in PROFILE_MODES:
+                return jsonify({'error': f'Mode must be one of: {", ".join(PROFILE_MODES)}'}), 400
+            settings.mode = data['mode']
+        if 'request_rate' in data:
+            settings.request_rate = parse_rate(data['request_rate'])
+        if 'job_rate' in data:
+            settings.job_rate = parse_rate(data['job_rate'])
+        if 'endpoints' in data:
+            settings.endpoints = [str(endpoint) for endpoint in data['endpoints'] or []]
+
+        if settings.enabled:
+            minutes = int(data.get('duration_minutes', DEFAULT_PROFILING_MINUTES))
+            if not 0 < minutes <= MAX_PROFILING_MINUTES:
+                return jsonify({'error': f'duration_minutes must be between 1 and {MAX_PROFILING_MINUTES}'}), 400
+            settings.expires_at = datetime.datetime.utcnow() + datetime.timedelta(minutes=minutes)
+
+        settings.updated_at = datetime.datetime.utcnow()
+        settings.save()
+        # Other workers pick the change up when their cached copy expires
+        invalidate_settings()
+
+        logger.info(f"Profiler settings updated: {settings.to_json()}")
+        return jsonify(settings.to_json())
+
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error updating profiler settings: {str(e)}")
+        return jsonify({'error': 'Failed to update profiler settings'}), 500
+
+@profiling_bp.route('/api/admin/profiles', methods=['GET'])
+@admin_required
+def list_profiles():
+    try:
+        profiles = Profile.objects.order_by('-created_at')
+        if request.args.get('target'):
+            profiles = profiles.filter(target=request.args['target'])
+        if request.args.get('kind'):
+            profiles = profiles.filter(kind=request.args['kind'])
+
+        return jsonify([profile.to_json() for profile in profiles.limit(parse_limit(request.args.get('limit')))])
+
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+    except Exception as e:
+        logger.error(f"Error listing profiles: {str(e)}")
+        return jsonify({'error': 'Failed to list profiles'}), 500
+
+@profiling_bp.route('/api/admin/profiles/<profile_id>/download', methods=['GET'])
+@admin_required
+def download_profile(profile_id):
+    try:
+        profile = Profile.objects(id=profile_id).first()
+        if not profile:
+            return jsonify({'error': 'Profile not found'}), 404
+
+        extension = 'pstats' if profile.mode == 'cprofile' else 'collapsed'
+        mimetype = 'application/octet-stream' if profile.mode == 'cprofile' else 'text/plain'
+        response = send_gridfs_file(profile.output, f"{profile.target}-{profile.id}.{extension}", mimetype=mimetype)
+        if response is None:
+            return jsonify({'error': 'Profile output not found'}), 404
+        return response
+
+    except Exception as e:
+        logger.error(f"Error downloading profile: {str(e)}")
+        return jsonify({'error': 'Failed to download profile'}), 500
+
+@profiling_bp.route('/api/admin/profiles/<profile_id>', methods=['DELETE'])
+@admin_required
+def delete_profile(profile_id):
+    try:
+        profile = Profile.objects(id=profile_id).first()
+        if not profile:
+            return jsonify({'error': 'Profile not found'}), 404
+
+        profile.output.delete()
+        profile.delete()
+        return jsonify({'message': 'Profile deleted'})
+
+    except Exception as e:
+        logger.error(f"Error deleting profile: {str(e)}")
+        return jsonify({'error': 'Failed to delete profile'}), 500
@@ -1,5 +1,5 @@
 from flask import Blueprint, request, jsonify, current_app
-from models.user import User
+from utils.identity import current_user as load_current_user, invalidate_identity
 import logging
 
 # Import decorators with error handling
@@ -19,7 +19,9 @@ def get_professor_profile():
     """Get the profile of the currently logged-in professor."""
     try:
         # Get the current user from the session
-        current_user = User.objects.get(id=request.user_id)
+        current_user = load_current_user()
+        if not current_user:
+            return jsonify({'success': False, 'message': 'User not found'}), 404
 
         # Return the professor's profile data
         return jsonify({
@@ -47,7 +49,9 @@ def update_professor_profile():
     """Update the profile of the currently logged-in professor."""
     try:
         data = request.get_json()
-        current_user = User.objects.get(id=request.user_id)
+        current_user = load_current_user()
+        if not current_user:
+            return jsonify({'success': False, 'message': 'User not found'}), 404
 
         # Update the user fields if they are provided in the request
         if 'firstName' in data:
@@ -65,6 +69,7 @@ def update_professor_profile():
 
         # Save the updated user
         current_user.save()
+        invalidate_identity(current_user.id)
 
         return jsonify({
             'success': True,
@@ -1,4 +1,6 @@
 -- Drop existing tables if they exist
+DROP TABLE IF EXISTS submissions_fts;
+DROP TABLE IF EXISTS analysis_results;
 DROP TABLE IF EXISTS cheating_detection;
 DROP TABLE IF EXISTS submissions;
 DROP TABLE IF EXISTS assignments;
@@ -75,6 +77,7 @@ CREATE TABLE submissions (
     word_count INTEGER,
     similarity_score FLOAT,
     correctness TEXT CHECK (correctness IN ('pending', 'correct', 'partially_correct', 'incorrect')),
+    cheating_detected TEXT CHECK (cheating_detected IN ('exact_copy', 'paraphrase')),
     submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (student_id) REFERENCES users (id),
     FOREIGN KEY (assignment_id) REFERENCES assignments (id)
@@ -92,9 +95,47 @@ CREATE TABLE cheating_detection (
     FOREIGN KEY (matched_submission_id) REFERENCES submissions (id)
 );
 
+-- Full-text index over extracted submission text, for candidate source retrieval.
+-- It reads its content from submissions; the triggers below keep it in step.
+CREATE VIRTUAL TABLE submissions_fts USING fts5(
+    extracted_text,
+    content='submissions',
+    content_rowid='id',
+    tokenize='porter unicode61'
+);
+
+CREATE TRIGGER submissions_fts_insert AFTER INSERT ON submissions BEGIN
+    INSERT INTO submissions_fts (rowid, extracted_text) VALUES (new.id, new.extracted_text);
+END;
+
+CREATE TRIGGER submissions_fts_delete AFTER DELETE ON submissions BEGIN
+    INSERT INTO submissions_fts (submissions_fts, rowid, extracted_text) VALUES ('delete', old.id, old.extracted_text);
+END;
+
+CREATE TRIGGER submissions_fts_update AFTER UPDATE OF extracted_text ON submissions BEGIN
+    INSERT INTO submissions_fts (submissions_fts, rowid, extracted_text) VALUES ('delete', old.id, old.extracted_text);
+    INSERT INTO submissions_fts (rowid, extracted_text) VALUES (new.id, new.extracted_text);
+END;
+
+-- Create analysis results table
+CREATE TABLE analysis_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    assignment_id INTEGER NOT NULL,
+    total_submissions INTEGER NOT NULL,
+    suspicious_submissions INTEGER NOT NULL,
+    exact_copy_cases INTEGER NOT NULL,
+    paraphrase_cases INTEGER NOT NULL,
+    analyzed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (assignment_id) REFERENCES assignments (id)
+);
+
 -- Create indexes for better query performance
-CREATE INDEX idx_sessions_token ON sessions(token);
-CREATE INDEX idx_sessions_user_id ON sessions(user_id);
+-- Covers verify_session, so the token lookup never reads the table row
+CREATE INDEX idx_sessions_token ON sessions(token, is_valid, expires_at, user_id);
+CREATE INDEX idx_sessions_user_id ON sessions(user_id, is_valid);
+-- Used by the session sweeper
+CREATE INDEX idx_sessions_expires ON sessions(expires_at);
+CREATE INDEX idx_sessions_invalid ON sessions(is_valid) WHERE is_valid = 0;
 CREATE INDEX idx_courses_professor ON courses(professor_id);
 CREATE INDEX idx_enrollments_student ON course_enrollments(student_id);
 CREATE INDEX idx_enrollments_course ON course_enrollments(course_id);
@@ -102,4 +143,5 @@ CREATE INDEX idx_assignments_professor ON assignments(professor_id);
 CREATE INDEX idx_assignments_course ON assignments(course_id);
 CREATE INDEX idx_submissions_student ON submissions(student_id);
 CREATE INDEX idx_submissions_assignment ON submissions(assignment_id);
-CREATE INDEX idx_cheating_submission ON cheating_detection(submission_id); 
\ No newline at end of file
+CREATE INDEX idx_cheating_submission ON cheating_detection(submission_id); 
+CREATE INDEX idx_analysis_assignment ON analysis_results(assignment_id, analyzed_at);
@@ -0,0 +1,20 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mongomock
+import mongomock.gridfs
+import pytest
+from mongoengine import connect, disconnect
+
+# FileFields go through pymongo's gridfs module, which must be pointed at mongomock
+mongomock.gridfs.enable_gridfs_integration()
+
+
+@pytest.fixture
+def mongo():
+    """A fresh in-memory database for mongoengine documents, dropped after the test."""
+    connection = connect('assignment_checker_test', mongo_client_class=mongomock.MongoClient)
+    yield connection['assignment_checker_test']
+    disconnect()
@@ -0,0 +1,88 @@
+import hashlib
+import io
+from datetime import timedelta
+import pytest
+from bson import ObjectId
+from werkzeug.datastructures import FileStorage
+from models.blob import Blob
+from models.submission import Submission
+from utils import blob_store
+from utils.blob_store import BlobCollector, store_blob, release_blob
+
+PDF = b'%PDF-1.4\nan answer\n%%EOF'
+MAX_SIZE = 1024 * 1024
+
+
+@pytest.fixture(autouse=True)
+def no_collector_thread(monkeypatch):
+    monkeypatch.setattr(blob_store.blob_collector, 'start', lambda: None)
+
+
+def upload(content, filename):
+    return FileStorage(stream=io.BytesIO(content), filename=filename, content_type='application/pdf')
+
+
+def stored_submission(content=PDF):
+    submission = Submission(student=ObjectId(), assignment=ObjectId())
+    store_blob(upload(content, 'answer.pdf'), submission.answer_file, MAX_SIZE)
+    return submission
+
+
+def test_identical_uploads_share_a_file_named_by_hash(mongo):
+    first, second = (Submission(student=ObjectId(), assignment=ObjectId()) for _ in range(2))
+
+    stored = [store_blob(upload(PDF, name), submission.answer_file, MAX_SIZE)
+              for submission, name in ((first, 'alice.pdf'), (second, 'bob.pdf'))]
+
+    assert [blob.deduplicated for blob in stored] == [False, True]
+    assert first.answer_file.grid_id == second.answer_file.grid_id
+    assert second.answer_file.get().filename == hashlib.sha256(PDF).hexdigest()
+    assert Blob.objects.get(grid_id=first.answer_file.grid_id).refcount == 2
+
+
+def test_release_keeps_the_file_until_the_last_reference_goes(mongo):
+    first, second = stored_submission(), stored_submission()
+    grid_id = first.answer_file.grid_id
+
+    release_blob(first.answer_file, grid_id)
+    blob = Blob.objects.get(grid_id=grid_id)
+    assert blob.refcount == 1
+    assert BlobCollector(grace=timedelta(0)).collect() == 0
+
+    release_blob(second.answer_file, grid_id)
+    assert Blob.objects.get(grid_id=grid_id).refcount == 0
+    assert second.answer_file.fs.exists(grid_id)
+
+
+def test_collector_waits_for_the_grace_period(mongo):
+    submission = stored_submission()
+    grid_id = submission.answer_file.grid_id
+    release_blob(submission.answer_file, grid_id)
+
+    assert BlobCollector().collect() == 0
+    assert BlobCollector(grace=timedelta(0)).collect() == 1
+    assert not Blob.objects(grid_id=grid_id)
+    assert not submission.answer_file.fs.exists(grid_id)
+
+
+def test_upload_takes_back_a_released_blob(mongo):
+    first = stored_submission()
+    grid_id = first.answer_file.grid_id
+    release_blob(first.answer_file, grid_id)
+
+    second = stored_submission()
+
+    assert second.answer_file.grid_id == grid_id
+    blob = Blob.objects.get(grid_id=grid_id)
+    assert (blob.refcount, blob.released_at) == (1, None)
+    assert BlobCollector(grace=timedelta(0)).collect() == 0
+
+
+def test_release_deletes_a_file_stored_before_blobs(mongo):
+    submission = Submission(student=ObjectId(), assignment=ObjectId())
+    submission.answer_file.put(PDF, content_type='application/pdf')
+    grid_id = submission.answer_file.grid_id
+
+    release_blob(submission.answer_file, grid_id)
+
+    assert not submission.answer_file.fs.exists(grid_id)
@@ -0,0 +1,86 @@
+import os
+import shutil
+import sqlite3
+import pytest
+import utils.db_utils as db_utils
+
+# The database shipped with the repo predates the full-text index and the session indexes
+SHIPPED_DATABASE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assignment_checker.db')
+
+
+@pytest.fixture
+def existing_db(tmp_path, monkeypatch):
+    """A copy of the shipped database with one submission, served by a fresh pool."""
+    path = str(tmp_path / 'assignment_checker.db')
+    shutil.copy(SHIPPED_DATABASE, path)
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "INSERT INTO submissions (id, assignment_id, student_id, file_path, extracted_text) "
+        "VALUES (7, 1, 1, 'answer.pdf', 'Photosynthesis converts sunlight into chemical energy in chloroplasts')"
+    )
+    conn.commit()
+    conn.close()
+    pool = db_utils.ConnectionPool(path, migrations=db_utils.MIGRATIONS)
+    monkeypatch.setattr(db_utils, 'pool', pool)
+    yield path
+    pool.close()
+
+
+def test_existing_database_is_migrated_on_first_connection(existing_db):
+    candidates = db_utils.find_candidate_sources('sunlight becomes chemical energy inside chloroplasts')
+
+    assert [candidate['id'] for candidate in candidates] == [7]
+    version = db_utils.get_db_connection().execute('PRAGMA user_version').fetchone()[0]
+    assert version == len(db_utils.MIGRATIONS)
+
+
+def test_migrations_run_once(tmp_path):
+    path = str(tmp_path / 'assignment_checker.db')
+    shutil.copy(SHIPPED_DATABASE, path)
+    migrations = [['CREATE TABLE IF NOT EXISTS migration_runs (n INTEGER)', 'INSERT INTO migration_runs VALUES (1)']]
+
+    for _ in range(2):
+        pool = db_utils.ConnectionPool(path, migrations=migrations)
+        runs = pool.connection().execute('SELECT COUNT(*) FROM migration_runs').fetchone()[0]
+        pool.close()
+
+    assert runs == 1
+
+
+def test_empty_database_is_left_for_init_db(tmp_path):
+    pool = db_utils.ConnectionPool(str(tmp_path / 'new.db'), migrations=db_utils.MIGRATIONS)
+
+    conn = pool.connection()
+
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == 0
+    assert conn.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()[0] == 0
+    pool.close()
+
+
+def test_session_lookup_uses_the_covering_index(existing_db):
+    conn = db_utils.get_db_connection()
+
+    # The lookup _load_session runs for verify_session
+    plan = ' '.join(row['detail'] for row in conn.execute('''
+        EXPLAIN QUERY PLAN
+        SELECT u.id, u.email, u.full_name, u.user_type, s.expires_at
+        FROM sessions s
+        JOIN users u ON s.user_id = u.id
+        WHERE s.token = ? AND s.expires_at > ? AND s.is_valid = 1
+    ''', ('token', '2026-01-01')))
+
+    assert 'COVERING INDEX idx_sessions_token' in plan
+
+
+def test_analysis_results_are_saved_on_a_migrated_database(existing_db):
+    analysis = {
+        'exact_copies': [{'type': 'exact_copy', 'submission_ids': [7, 8], 'similarity_score': 1.0}],
+        'paraphrases': [],
+        'statistics': {'total_submissions': 2}
+    }
+
+    db_utils.save_analysis_results(1, analysis)
+
+    conn = db_utils.get_db_connection()
+    assert conn.execute('SELECT cheating_detected FROM submissions WHERE id = 7').fetchone()[0] == 'exact_copy'
+    assert conn.execute('SELECT total_submissions FROM analysis_results').fetchone()[0] == 2
@@ -0,0 +1,66 @@
+from bson import ObjectId
+from models.submission import Submission
+from utils.document_processor import document_processor
+
+
+def make_submission(assignment_id, **fields):
+    submission = Submission(student=ObjectId(), assignment=assignment_id, **fields)
+    submission.answer_file.put(b'%PDF-1.4', content_type='application/pdf')
+    submission.save()
+    return submission
+
+
+def test_batch_with_a_scan_without_text(mongo, monkeypatch):
+    assignment_id = ObjectId()
+    texts = [
+        'Rivers carve valleys through erosion over thousands of years',
+        '',
+        'Over thousands of years rivers carve valleys through erosion',
+        'Photosynthesis turns sunlight into chemical energy in plants'
+    ]
+    submissions = [make_submission(assignment_id) for _ in texts]
+    text_of = {submission.id: text for submission, text in zip(submissions, texts)}
+    monkeypatch.setattr(document_processor, '_extract_submission_text',
+                        lambda submission, stage=None: text_of[submission.id])
+
+    document_processor._process_batch(assignment_id, [submission.id for submission in submissions])
+
+    stored = {submission.id: submission for submission in Submission.objects(assignment=assignment_id)}
+    assert {submission.processing_status for submission in stored.values()} == {'Completed'}
+    empty = stored[submissions[1].id]
+    assert empty.plagiarism_score == 0.0
+    assert empty.plagiarism_details['message'] == 'No text could be extracted from this submission'
+    assert stored[submissions[0].id].plagiarism_score > 50
+    assert len(stored[submissions[0].id].plagiarism_details['comparisons']) == 2
+
+
+def test_score_assignment_of_stop_words_only(mongo):
+    assignment_id = ObjectId()
+    targets = [make_submission(assignment_id, ocr_text=text) for text in ('the and of', 'it is the', 'a an')]
+
+    results = document_processor._score_assignment(assignment_id, targets)
+
+    assert {score for score, _ in results.values()} == {0.0}
+    assert all(details['message'] == 'No comparable text in this assignment' for _, details in results.values())
+
+
+def test_empty_text_of_an_identical_file_is_reused(mongo):
+    assignment_id = ObjectId()
+    make_submission(assignment_id, content_hash='a' * 64, ocr_text='', processing_status='Completed')
+    submission = make_submission(assignment_id, content_hash='a' * 64)
+
+    assert document_processor._extracted_copy_text(submission) == ''
+
+
+def test_submission_without_text(mongo, monkeypatch):
+    assignment_id = ObjectId()
+    make_submission(assignment_id, ocr_text='Rivers carve valleys through erosion', processing_status='Completed')
+    submission = make_submission(assignment_id)
+    monkeypatch.setattr(document_processor, '_extract_submission_text', lambda submission, stage=None: '')
+
+    document_processor._process_submission(submission.id)
+
+    submission = Submission.objects.get(id=submission.id)
+    assert submission.processing_status == 'Completed'
+    assert submission.plagiarism_score == 0.0
+    assert submission.ocr_text is None
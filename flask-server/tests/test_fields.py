@@ -0,0 +1,47 @@
+from bson import Binary, ObjectId
+from models.submission import Submission
+
+
+def saved_submission(**fields):
+    submission = Submission(student=ObjectId(), assignment=ObjectId(), **fields)
+    submission.answer_file.put(b'%PDF-1.4', content_type='application/pdf')
+    return submission.save()
+
+
+def raw(submission):
+    return Submission._get_collection().find_one({'_id': submission.id})
+
+
+def test_non_empty_values_are_stored_compressed(mongo):
+    text = 'photosynthesis converts light into chemical energy ' * 50
+    details = {'score': 0.42, 'matches': [{'submission': 'a', 'similarity': 0.9}]}
+    submission = saved_submission(ocr_text=text, plagiarism_details=details)
+
+    document = raw(submission)
+    assert isinstance(document['ocr_text'], Binary)
+    assert len(document['ocr_text']) < len(text)
+    loaded = Submission.objects.get(id=submission.id)
+    assert (loaded.ocr_text, loaded.plagiarism_details) == (text, details)
+    assert Submission.objects(id=submission.id, ocr_text__exists=True).count() == 1
+
+
+def test_empty_values_are_not_stored(mongo):
+    submission = saved_submission(ocr_text='', plagiarism_details={})
+
+    document = raw(submission)
+    assert 'ocr_text' not in document and 'plagiarism_details' not in document
+    loaded = Submission.objects.get(id=submission.id)
+    assert (loaded.ocr_text, loaded.plagiarism_details) == (None, None)
+    assert Submission.objects(id=submission.id, ocr_text__exists=True).count() == 0
+
+
+def test_saving_an_unread_value_writes_the_same_bytes(mongo):
+    submission = saved_submission(ocr_text='an answer')
+    stored = raw(submission)['ocr_text']
+
+    loaded = Submission.objects.get(id=submission.id)
+    loaded.feedback = 'Good'
+    loaded.save()
+
+    assert raw(submission)['ocr_text'] == stored
+    assert Submission.objects.get(id=submission.id).ocr_text == 'an answer'
@@ -0,0 +1,80 @@
+import pytest
+from bson import ObjectId
+from flask import Flask
+from models.submission import Submission
+from utils.file_streaming import send_gridfs_file
+
+CONTENT = b'%PDF-1.4\n' + bytes(range(256)) * 4 + b'\n%%EOF'
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+def stored_file(content=CONTENT):
+    submission = Submission(student=ObjectId(), assignment=ObjectId())
+    submission.answer_file.put(content, content_type='application/pdf')
+    return submission.answer_file
+
+
+def download(app, file_proxy, **headers):
+    with app.test_request_context(headers=headers):
+        response = send_gridfs_file(file_proxy, 'answer.pdf')
+        if response is None:
+            return None
+        response.direct_passthrough = False
+        return response
+
+
+def test_full_download(mongo, app):
+    response = download(app, stored_file())
+
+    assert response.status_code == 200
+    assert response.get_data() == CONTENT
+    assert response.content_length == len(CONTENT)
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert 'filename=answer.pdf' in response.headers['Content-Disposition']
+
+
+def test_single_range(mongo, app):
+    response = download(app, stored_file(), Range='bytes=9-18')
+
+    assert response.status_code == 206
+    assert response.get_data() == CONTENT[9:19]
+    assert response.headers['Content-Range'] == f'bytes 9-18/{len(CONTENT)}'
+
+
+def test_suffix_range(mongo, app):
+    response = download(app, stored_file(), Range='bytes=-6')
+
+    assert response.status_code == 206
+    assert response.get_data() == b'\n%%EOF'
+
+
+def test_unsatisfiable_range(mongo, app):
+    response = download(app, stored_file(), Range=f'bytes={len(CONTENT)}-')
+
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f'bytes */{len(CONTENT)}'
+
+
+def test_range_with_a_stale_if_range_gets_the_whole_file(mongo, app):
+    response = download(app, stored_file(), Range='bytes=0-3', **{'If-Range': '"stale"'})
+
+    assert response.status_code == 200
+    assert response.get_data() == CONTENT
+
+
+def test_matching_etag_is_not_modified(mongo, app):
+    file_proxy = stored_file()
+    etag = download(app, file_proxy).headers['ETag']
+
+    response = download(app, file_proxy, **{'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.get_data() == b''
+
+
+def test_empty_file_is_not_found(mongo, app):
+    assert download(app, stored_file(b'')) is None
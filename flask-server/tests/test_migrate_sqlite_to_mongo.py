@@ -0,0 +1,63 @@
+import sqlite3
+
+import pytest
+
+from migrate_sqlite_to_mongo import SqliteMigration, legacy_id
+from models.assignment import Assignment
+from models.blob import Blob
+from models.user import User
+
+SCHEMA_PATH = 'schema.sql'
+PDF = b'%PDF-1.4\nthe same answer\n%%EOF'
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    path = str(tmp_path / 'legacy.db')
+    conn = sqlite3.connect(path)
+    with open(SCHEMA_PATH) as f:
+        conn.executescript(f.read())
+    conn.execute(
+        "INSERT INTO users (id, email, password_hash, full_name, user_type) "
+        "VALUES (1, 'prof@example.edu', 'x', 'Ada Lovelace', 'professor'), "
+        "(2, 'nameless@example.edu', 'x', '', 'student')"
+    )
+    conn.execute("INSERT INTO courses (id, name, code, professor_id) VALUES (1, 'Biology', 'BIO1', 1)")
+    conn.execute(
+        "INSERT INTO assignments (id, professor_id, course_id, name, due_date) "
+        "VALUES (1, 1, 1, 'Essay', 'next friday')"
+    )
+    for number in (1, 2):
+        (tmp_path / f'answer{number}.pdf').write_bytes(PDF)
+        conn.execute(
+            "INSERT INTO submissions (id, student_id, assignment_id, file_path) VALUES (?, 2, 1, ?)",
+            (number, f'answer{number}.pdf')
+        )
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_rows_the_models_reject_get_placeholders(mongo, legacy_db):
+    SqliteMigration(legacy_db).run()
+
+    user = User.objects.get(id=legacy_id('users', 2))
+    assert (user.first_name, user.last_name, user.section) == ('nameless', '-', 'Unassigned')
+    user.validate()
+    assignment = Assignment.objects.get(id=legacy_id('assignments', 1))
+    assert assignment.due_date == assignment.created_at
+
+
+def test_identical_files_share_one_blob(mongo, legacy_db):
+    SqliteMigration(legacy_db).run()
+    # A second run resumes from the checkpoints without counting again
+    SqliteMigration(legacy_db).run()
+
+    submissions = list(mongo.submissions.find({}, {'answer_file': 1, 'file_name': 1}))
+    assert len({submission['answer_file'] for submission in submissions}) == 1
+    assert sorted(submission['file_name'] for submission in submissions) == ['answer1.pdf', 'answer2.pdf']
+    blob = Blob.objects.get()
+    assert blob.grid_id == submissions[0]['answer_file']
+    assert blob.refcount == 2
+    assert mongo.fs.files.count_documents({}) == 1
+    assert mongo.fs.files.find_one()['filename'] == blob.sha256
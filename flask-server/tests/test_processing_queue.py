@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+from bson import ObjectId
+from models.submission import Submission
+from utils.processing_queue import ProcessingScheduler
+
+
+def make_scheduler(tmp_path, **options):
+    return ProcessingScheduler(lambda job: None, concurrency=2, slot_dir=str(tmp_path), **options)
+
+
+def queued_submissions(count, assignment_id=None):
+    assignment_id = assignment_id or ObjectId()
+    submissions = [Submission(student=ObjectId(), assignment=assignment_id) for _ in range(count)]
+    for submission in submissions:
+        submission.answer_file.put(b'%PDF-1.4', content_type='application/pdf')
+        submission.save()
+    return [submission.id for submission in submissions]
+
+
+def queue_entry(submission_id):
+    return Submission._get_collection().find_one({'_id': submission_id}).get('processing_queue') or {}
+
+
+def test_claim_keeps_the_entry_until_the_job_completes(mongo, tmp_path, monkeypatch):
+    scheduler = make_scheduler(tmp_path)
+    monkeypatch.setattr(scheduler, 'start', lambda: None)
+    [submission_id] = queued_submissions(1)
+    scheduler.enqueue([submission_id], 1024)
+
+    job = scheduler._claim()
+
+    assert job.ids == [submission_id]
+    assert queue_entry(submission_id)['claimed_by'] == scheduler._owner()
+    assert scheduler._claim() is None
+    scheduler._complete(job)
+    assert queue_entry(submission_id) == {}
+
+
+def test_claim_takes_smaller_jobs_first(mongo, tmp_path, monkeypatch):
+    scheduler = make_scheduler(tmp_path, priority_rate=1024 * 1024)
+    monkeypatch.setattr(scheduler, 'start', lambda: None)
+    large, small, older = queued_submissions(3)
+    scheduler.enqueue([older], 1024)
+    scheduler.enqueue([large], 100 * 1024 * 1024)
+    scheduler.enqueue([small], 1024)
+
+    assert [scheduler._claim().ids for _ in range(3)] == [[older], [small], [large]]
+    assert scheduler._claim() is None
+
+
+def test_claim_takes_a_whole_batch(mongo, tmp_path, monkeypatch):
+    scheduler = make_scheduler(tmp_path)
+    monkeypatch.setattr(scheduler, 'start', lambda: None)
+    ids = queued_submissions(3)
+    scheduler.enqueue(ids, 3 * 1024, batch=True)
+
+    job = scheduler._claim()
+
+    assert job.batch and sorted(job.ids) == sorted(ids)
+    assert all('claimed_by' in queue_entry(submission_id) for submission_id in ids)
+    scheduler._complete(job)
+    assert all(queue_entry(submission_id) == {} for submission_id in ids)
+
+
+def test_requeue_of_claims_lost_with_their_worker(mongo, tmp_path, monkeypatch):
+    scheduler = make_scheduler(tmp_path, claim_timeout=timedelta(hours=1))
+    monkeypatch.setattr(scheduler, 'start', lambda: None)
+    dead, live, remote, recent = queued_submissions(4)
+    for submission_id in (dead, live, remote, recent):
+        scheduler.enqueue([submission_id], 1024)
+    collection = Submission._get_collection()
+    claims = {
+        dead: (f'{scheduler.host}:{2 ** 22 + 1}', datetime.utcnow()),
+        live: (scheduler._owner(), datetime.utcnow()),
+        remote: ('elsewhere:1', datetime.utcnow() - timedelta(hours=2)),
+        recent: ('elsewhere:2', datetime.utcnow())
+    }
+    for submission_id, (owner, claimed_at) in claims.items():
+        collection.update_one({'_id': submission_id}, {'$set': {
+            'processing_status': 'Processing',
+            'processing_queue.claimed_by': owner,
+            'processing_queue.claimed_at': claimed_at
+        }})
+
+    scheduler._requeue_stale()
+
+    assert {'claimed_by' in queue_entry(submission_id) for submission_id in (dead, remote)} == {False}
+    assert {'claimed_by' in queue_entry(submission_id) for submission_id in (live, recent)} == {True}
+    assert Submission.objects.get(id=dead).processing_status == 'Pending'
+    assert scheduler._claim().ids in ([dead], [remote])
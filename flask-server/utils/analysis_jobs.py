@@ -0,0 +1,219 @@
+import hashlib
+import logging
+import threading
+import time
+from bson import ObjectId
+from datetime import datetime, timedelta
+from pymongo import UpdateOne, UpdateMany
+from models.analysis_job import AnalysisJob
+from models.submission import Submission
+from ml_models.cheating_detector import CheatingDetector
+from utils.detections import flatten_analysis
+from utils.metrics import QUEUE_WAIT_SECONDS, track_in_flight
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Jobs still Queued/Running after this long are assumed lost with their worker
+STALE_JOB_AFTER = timedelta(minutes=30)
+
+# Share of the progress bar spent loading texts; the detector reports the rest
+LOAD_PROGRESS = 0.2
+
+# Paraphrase pairs grow with the square of the class size; only the
+# strongest are kept in the job so its document stays far below 16MB
+MAX_STORED_PARAPHRASES = 500
+
+
+def save_analysis_results(assignment_id, analysis):
+    """
+    Write the cheating flags of a whole-assignment analysis in one bulk_write.
+
+    The Mongo counterpart of db_utils.save_analysis_results: flags from an
+    earlier run that no longer apply are cleared and every flagged
+    submission is set, in a single round trip instead of one save each.
+    The detections themselves are kept in the job's result.
+    """
+    _, flags = flatten_analysis(analysis)
+    flagged = [ObjectId(submission_id) for submission_id in flags]
+    operations = [
+        UpdateMany(
+            {'assignment': assignment_id, 'cheating_flag': {'$ne': None}, '_id': {'$nin': flagged}},
+            {'$unset': {'cheating_flag': ''}}
+        )
+    ]
+    operations.extend(
+        UpdateOne({'_id': ObjectId(submission_id)}, {'$set': {'cheating_flag': flag}})
+        for submission_id, flag in flags.items()
+    )
+    # Every operation touches a different document, so they may run in any order
+    return Submission._get_collection().bulk_write(operations, ordered=False)
+
+
+def stored_result(analysis, max_paraphrases=MAX_STORED_PARAPHRASES):
+    """
+    The part of an analysis kept in AnalysisJob.result.
+
+    Statistics, suspicious ids and exact-copy groups are bounded by the
+    number of submissions and kept whole; paraphrase pairs are kept
+    strongest first up to ``max_paraphrases``. statistics.paraphrase_cases
+    still counts every pair, and every flag is on the submissions.
+    """
+    paraphrases = sorted(analysis['paraphrases'], key=lambda case: case['similarity_score'], reverse=True)
+    return {
+        'exact_copies': analysis['exact_copies'],
+        'paraphrases': paraphrases[:max_paraphrases],
+        'paraphrases_truncated': len(paraphrases) > max_paraphrases,
+        'statistics': analysis['statistics'],
+        'suspicious_ids': analysis['suspicious_ids']
+    }
+
+
+class AnalysisRunner:
+    def __init__(self, exact_threshold=0.9, paraphrase_threshold=0.7):
+        self.exact_threshold = exact_threshold
+        self.paraphrase_threshold = paraphrase_threshold
+
+    def cache_key(self, assignment_id):
+        """
+        Digest the set of analyzable submissions of an assignment.
+
+        Only ids and content hashes are read, so a cache hit never loads any
+        extracted text. Thresholds are part of the key because they change
+        the result. Submissions whose files had no text are stored without
+        ocr_text and are left out, as there is nothing in them to detect.
+        """
+        submissions = Submission.objects(
+            assignment=assignment_id,
+            processing_status='Completed',
+            ocr_text__exists=True
+        ).only('id', 'content_hash', 'submitted_at')
+        return self._digest(submissions)
+
+    def _digest(self, submissions):
+        entries = sorted(
+            f"{sub.id}:{sub.content_hash or sub.submitted_at.isoformat()}"
+            for sub in submissions
+        )
+        digest = hashlib.sha256()
+        digest.update(f"{self.exact_threshold}:{self.paraphrase_threshold}".encode('utf-8'))
+        for entry in entries:
+            digest.update(entry.encode('utf-8'))
+        return digest.hexdigest(), len(entries)
+
+    def start(self, assignment_id):
+        """
+        Return the job that answers an analysis request for an assignment.
+
+        A completed job with the same cache key is returned as is; a job
+        already in flight for the key is shared; otherwise a new job is
+        queued and run in a background thread.
+
+        Returns:
+            tuple: (AnalysisJob, bool) where the flag is True for a new job
+        """
+        cache_key, total = self.cache_key(assignment_id)
+
+        cached = AnalysisJob.objects(
+            assignment=assignment_id,
+            cache_key=cache_key,
+            status='Completed'
+        ).order_by('-created_at').first()
+        if cached:
+            return cached, False
+
+        in_flight = AnalysisJob.objects(
+            assignment=assignment_id,
+            cache_key=cache_key,
+            status__in=['Queued', 'Running'],
+            created_at__gte=datetime.utcnow() - STALE_JOB_AFTER
+        ).first()
+        if in_flight:
+            return in_flight, False
+
+        job = AnalysisJob(
+            assignment=assignment_id,
+            cache_key=cache_key,
+            total_submissions=total
+        )
+        job.save()
+
+        thread = threading.Thread(target=self._run, args=(job.id, assignment_id, time.monotonic()))
+        thread.start()
+        return job, True
+
+    def _report(self, job_id, stage, progress):
+        AnalysisJob.objects(id=job_id).update(set__stage=stage, set__progress=round(progress, 3))
+
+    def _run(self, job_id, assignment_id, queued_at):
+        """Record queue wait and in-flight count around the analysis itself"""
+        QUEUE_WAIT_SECONDS.labels(kind='analysis').observe(time.monotonic() - queued_at)
+        with track_in_flight('analysis'):
+            self._analyze(job_id, assignment_id)
+
+    def _analyze(self, job_id, assignment_id):
+        """Load the assignment's texts and run CheatingDetector over them"""
+        try:
+            AnalysisJob.objects(id=job_id).update(set__status='Running', set__stage='loading', set__progress=0.0)
+
+            loaded = list(Submission.objects(
+                assignment=assignment_id,
+                processing_status='Completed',
+                ocr_text__exists=True
+            ).only('id', 'ocr_text', 'content_hash', 'submitted_at'))
+            # Submissions may have completed since start() keyed the job, so
+            # the result is cached under the corpus actually analyzed
+            cache_key, _ = self._digest(loaded)
+            submissions = [{'id': str(sub.id), 'text': sub.ocr_text} for sub in loaded]
+
+            if not submissions:
+                result = {
+                    'exact_copies': [],
+                    'paraphrases': [],
+                    'statistics': {'total_submissions': 0},
+                    'suspicious_ids': []
+                }
+            else:
+                self._report(job_id, 'exact_copies', LOAD_PROGRESS)
+                # Detectors keep fitted state, so every job gets its own instance
+                detector = CheatingDetector(
+                    exact_threshold=self.exact_threshold,
+                    paraphrase_threshold=self.paraphrase_threshold
+                )
+                result = detector.analyze_submissions(
+                    submissions,
+                    progress_callback=lambda stage, fraction: self._report(
+                        job_id, stage, LOAD_PROGRESS + fraction * (1 - LOAD_PROGRESS)
+                    )
+                )
+
+            if result.get('error'):
+                raise RuntimeError(result['error'])
+
+            save_analysis_results(assignment_id, result)
+
+            AnalysisJob.objects(id=job_id).update(
+                set__status='Completed',
+                set__stage='completed',
+                set__progress=1.0,
+                set__cache_key=cache_key,
+                set__total_submissions=len(submissions),
+                set__result=stored_result(result),
+                set__completed_at=datetime.utcnow()
+            )
+            logger.info(f"Completed analysis job {job_id} for assignment {assignment_id}")
+
+        except Exception as e:
+            logger.error(f"Error in analysis job {job_id}: {str(e)}")
+            try:
+                AnalysisJob.objects(id=job_id).update(
+                    set__status='Failed',
+                    set__error=str(e),
+                    set__completed_at=datetime.utcnow()
+                )
+            except Exception as save_error:
+                logger.error(f"Error updating analysis job status: {str(save_error)}")
+
+# Create a global instance
+analysis_runner = AnalysisRunner()
@@ -0,0 +1,167 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+import gridfs
+from mongoengine.connection import get_db
+from mongoengine.errors import NotUniqueError
+from models.blob import Blob
+from utils.upload_stream import stream_to_gridfs, UploadRejected, PDF_MAGIC, UPLOAD_CHUNK_SIZE
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Unreferenced blobs are kept this long, so a request that dropped its
+# reference and then failed can still take it back
+BLOB_GC_GRACE = timedelta(hours=1)
+BLOB_GC_INTERVAL = 600
+BLOB_GC_BATCH_SIZE = 500
+
+StoredBlob = namedtuple('StoredBlob', ['sha256', 'size', 'replaced_grid_id', 'deduplicated'])
+
+
+def _hash_upload(stream, max_size, magic):
+    """SHA-256 and size of an upload, checking its signature and size limit on the way."""
+    digest = hashlib.sha256()
+    size = 0
+    first = True
+    for chunk in iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b''):
+        if first and magic and not chunk.startswith(magic):
+            raise UploadRejected('File content is not a valid PDF')
+        first = False
+        size += len(chunk)
+        if size > max_size:
+            raise UploadRejected(f'File size exceeds {max_size // (1024 * 1024)}MB limit')
+        digest.update(chunk)
+    if first:
+        raise UploadRejected('File is empty')
+    return digest.hexdigest(), size
+
+
+def _point_at(file_proxy, grid_id):
+    """Make a FileField refer to an already stored GridFS file."""
+    file_proxy.grid_id = grid_id
+    file_proxy.newfile = None
+    file_proxy.gridout = None
+    file_proxy._mark_as_changed()
+
+
+def _acquire(sha256):
+    """Take a reference on the blob with this hash, or return None if there is none."""
+    return Blob.objects(sha256=sha256).modify(inc__refcount=1, unset__released_at=True, new=True)
+
+
+def store_blob(file_storage, file_proxy, max_size, magic=PDF_MAGIC, sha256=None):
+    """
+    Store an upload in a FileField, keeping one GridFS copy per distinct content.
+
+    The upload is hashed first (skipped when the caller already knows
+    ``sha256``). If a blob with that hash exists, the field is pointed at it
+    and its reference count goes up, so nothing is written. Otherwise the
+    file is streamed into GridFS and registered as a new blob. The stream
+    must be seekable; Werkzeug spools uploads to disk, so it is.
+
+    A GridFS file may be shared by uploads from different users, so it is
+    named after its hash; keep the uploader's filename on the document.
+
+    Returns:
+        StoredBlob: Content hash, size, the GridFS id the field held before
+        (pass it to ``release_blob`` once the document is saved) and whether
+        an existing copy was reused
+    """
+    stream = file_storage.stream
+    replaced_grid_id = file_proxy.grid_id
+    if sha256 is None:
+        stream.seek(0)
+        sha256, _ = _hash_upload(stream, max_size, magic)
+
+    blob = _acquire(sha256)
+    if blob:
+        _point_at(file_proxy, blob.grid_id)
+        return StoredBlob(sha256, blob.size, replaced_grid_id, True)
+
+    stored = stream_to_gridfs(file_storage, file_proxy, sha256, max_size, magic)
+    try:
+        Blob(sha256=stored.sha256, grid_id=file_proxy.grid_id, size=stored.size, refcount=1).save(force_insert=True)
+    except NotUniqueError:
+        # A concurrent upload of the same content registered first; use its copy
+        file_proxy.fs.delete(file_proxy.grid_id)
+        blob = _acquire(stored.sha256)
+        if blob is None:
+            raise
+        _point_at(file_proxy, blob.grid_id)
+        return StoredBlob(stored.sha256, stored.size, replaced_grid_id, True)
+    return StoredBlob(stored.sha256, stored.size, replaced_grid_id, False)
+
+
+def release_blob(file_proxy, grid_id):
+    """
+    Drop one reference to the GridFS file ``grid_id``.
+
+    Files stored before the blob store existed have no blob record and
+    only ever had one reference, so they are deleted right away. Blobs
+    are left for the collector.
+    """
+    if grid_id is None:
+        return
+    try:
+        blob = Blob.objects(grid_id=grid_id).modify(
+            dec__refcount=1, set__released_at=datetime.utcnow(), new=True
+        )
+        if blob is None:
+            file_proxy.fs.delete(grid_id)
+        blob_collector.start()
+    except Exception as e:
+        logger.error(f"Error releasing GridFS file {grid_id}: {str(e)}")
+
+
+class BlobCollector:
+    """Background thread that deletes blobs nothing has referred to for a while."""
+
+    def __init__(self, interval=BLOB_GC_INTERVAL, grace=BLOB_GC_GRACE, batch_size=BLOB_GC_BATCH_SIZE):
+        self.interval = interval
+        self.grace = grace
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def start(self):
+        """Start the collector thread in this process unless it is already running."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            # Threads do not survive fork, so each worker process starts its own
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='blob-collector', daemon=True).start()
+
+    def collect(self):
+        """Delete unreferenced blobs past the grace period and return how many went."""
+        fs = gridfs.GridFS(get_db())
+        cutoff = datetime.utcnow() - self.grace
+        removed = 0
+        candidates = Blob.objects(refcount__lte=0, released_at__lte=cutoff).only('sha256', 'grid_id')
+        for blob in candidates.limit(self.batch_size):
+            # Conditional delete: an upload may have taken a reference since the query
+            if Blob.objects(sha256=blob.sha256, refcount__lte=0).delete():
+                fs.delete(blob.grid_id)
+                removed += 1
+        return removed
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                removed = self.collect()
+                if removed:
+                    logger.info(f"Removed {removed} unreferenced blobs")
+            except Exception as e:
+                logger.error(f"Error collecting blobs: {str(e)}")
+
+# Create a global instance
+blob_collector = BlobCollector()
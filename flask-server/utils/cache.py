@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """A load in progress that concurrent callers wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.stale = False  # Set when the key is invalidated mid-load
+
+
+class SingleFlightCache:
+    """
+    Small in-process TTL cache with per-key single-flight loading.
+
+    Concurrent misses on the same key share one loader call; the others
+    block until it finishes and receive the same value (or exception).
+    Keys are tuples so related entries can be dropped by prefix. The cache
+    is per worker process, so TTLs are kept short to bound staleness
+    across gunicorn workers; writers in this process invalidate explicitly.
+    """
+
+    def __init__(self, default_ttl=5.0, max_entries=10000):
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._flights = {}
+
+    def get_or_load(self, key, loader, ttl=None):
+        """Return the cached value for ``key``, calling ``loader()`` once on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                return entry[1]
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+                # Skip storing a value that an invalidation raced with
+                if flight.error is None and not flight.stale:
+                    self._store_locked(key, flight.value, ttl)
+            flight.done.set()
+
+        return flight.value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            if key in self._flights:
+                self._flights[key].stale = True
+
+    def invalidate_prefix(self, prefix):
+        """Drop every entry whose tuple key starts with ``prefix``."""
+        size = len(prefix)
+        with self._lock:
+            for key in [k for k in self._entries if k[:size] == prefix]:
+                del self._entries[key]
+            for key, flight in self._flights.items():
+                if key[:size] == prefix:
+                    flight.stale = True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for flight in self._flights.values():
+                flight.stale = True
+
+    def _store_locked(self, key, value, ttl):
+        now = time.monotonic()
+        if len(self._entries) >= self.max_entries:
+            for stale in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+                del self._entries[stale]
+            # Still full: evict the oldest insertions
+            while len(self._entries) >= self.max_entries:
+                del self._entries[next(iter(self._entries))]
+        self._entries[key] = (now + (self.default_ttl if ttl is None else ttl), value)
+
+
+# Create a global instance
+response_cache = SingleFlightCache()
+
+# Cache keys shared by the routes that read and the code paths that write
+STUDENT_ASSIGNMENTS = 'student_assignments'
+PROFESSOR_ASSIGNMENTS = 'professor_assignments'
+SUBMISSION_STATUS = 'submission_status'
+
+
+def invalidate_submission(submission_id, student_id=None):
+    """Drop cached views of a submission after it was written."""
+    response_cache.invalidate((SUBMISSION_STATUS, str(submission_id)))
+    if student_id is not None:
+        response_cache.invalidate((STUDENT_ASSIGNMENTS, str(student_id)))
@@ -0,0 +1,72 @@
+import logging
+import os
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# First byte of every stored payload says how the rest is encoded
+RAW, ZLIB, ZSTD = b'\x00', b'\x01', b'\x02'
+
+# Values shorter than this are stored raw; compressing them saves next to nothing
+MIN_COMPRESS_SIZE = 256
+
+# Levels picked with benchmarks/bench_compression.py on essay-length text: zlib 6
+# stores as small as 9 at a fifth more throughput; zstd 3 is its library default
+DEFAULT_LEVELS = {'zlib': 6, 'zstd': 3}
+
+FIELD_COMPRESSION = os.getenv('FIELD_COMPRESSION', 'zstd' if zstandard else 'zlib')
+if FIELD_COMPRESSION == 'zstd' and zstandard is None:
+    logger.warning("zstandard is not installed; compressing fields with zlib")
+    FIELD_COMPRESSION = 'zlib'
+
+_codecs = threading.local()
+
+
+def _zstd_compressor(level):
+    # zstandard compressors and decompressors are not thread-safe, so each thread keeps its own
+    compressors = getattr(_codecs, 'compressors', None)
+    if compressors is None:
+        compressors = _codecs.compressors = {}
+    if level not in compressors:
+        compressors[level] = zstandard.ZstdCompressor(level=level)
+    return compressors[level]
+
+
+def _zstd_decompressor():
+    if not hasattr(_codecs, 'decompressor'):
+        _codecs.decompressor = zstandard.ZstdDecompressor()
+    return _codecs.decompressor
+
+
+def compress(data, codec=None, level=None):
+    """Compress bytes into a self-describing payload."""
+    codec = codec or FIELD_COMPRESSION
+    if len(data) < MIN_COMPRESS_SIZE:
+        return RAW + data
+    level = DEFAULT_LEVELS[codec] if level is None else level
+    if codec == 'zstd':
+        return ZSTD + _zstd_compressor(level).compress(data)
+    return ZLIB + zlib.compress(data, level)
+
+
+def decompress(payload):
+    """Reverse ``compress``, whatever codec wrote the payload."""
+    payload = bytes(payload)
+    header, body = payload[:1], payload[1:]
+    if header == RAW:
+        return body
+    if header == ZLIB:
+        return zlib.decompress(body)
+    if header == ZSTD:
+        if zstandard is None:
+            raise RuntimeError('zstandard is required to read zstd-compressed fields')
+        return _zstd_decompressor().decompress(body)
+    raise ValueError(f'Unknown compression header {header!r}')
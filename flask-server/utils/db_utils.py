@@ -1,10 +1,16 @@
 import sqlite3
 import os
 import hashlib
+import re
 import secrets
+import threading
+import time
+from contextlib import contextmanager
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import logging
+from utils.detections import flatten_analysis
+from utils.cache import SingleFlightCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -14,23 +20,206 @@ logger = logging.getLogger(__name__)
 DATABASE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'assignment_checker.db')
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
 
-def get_db_connection():
-    """Create a database connection."""
-    try:
-        conn = sqlite3.connect(DATABASE_PATH)
+# Prepared statements kept per connection by the sqlite3 module
+STATEMENT_CACHE_SIZE = 256
+# Seconds a writer waits for the write lock before failing with "database is locked"
+BUSY_TIMEOUT = 5.0
+# Distinct words of a passage used in a full-text candidate query
+MAX_QUERY_TERMS = 32
+
+# Seconds a verified token is trusted without asking the database. A session
+# invalidated by another worker process stays usable there for at most this long.
+SESSION_CACHE_TTL = 30.0
+# Background removal of expired and invalidated sessions
+SESSION_SWEEP_INTERVAL = 300
+SESSION_SWEEP_BATCH_SIZE = 500
+# Pause between sweep batches so request writers get the write lock in between
+SESSION_SWEEP_PAUSE = 0.05
+
+def _add_column(table, column, definition):
+    """Migration step that adds a column unless the table already has it."""
+    def step(conn):
+        if column not in {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    return step
+
+# Schema changes for databases created from an older schema.sql, in order.
+# PRAGMA user_version counts the ones a database has had; init_db creates
+# the current schema and marks them all applied. Each step is a statement
+# or a function of the connection, and is also safe to run again.
+MIGRATIONS = [
+    # Full-text index over extracted submission text, filled from the existing rows
+    [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS submissions_fts USING fts5(
+            extracted_text,
+            content='submissions',
+            content_rowid='id',
+            tokenize='porter unicode61'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS submissions_fts_insert AFTER INSERT ON submissions BEGIN
+            INSERT INTO submissions_fts (rowid, extracted_text) VALUES (new.id, new.extracted_text);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS submissions_fts_delete AFTER DELETE ON submissions BEGIN
+            INSERT INTO submissions_fts (submissions_fts, rowid, extracted_text)
+            VALUES ('delete', old.id, old.extracted_text);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS submissions_fts_update AFTER UPDATE OF extracted_text ON submissions BEGIN
+            INSERT INTO submissions_fts (submissions_fts, rowid, extracted_text)
+            VALUES ('delete', old.id, old.extracted_text);
+            INSERT INTO submissions_fts (rowid, extracted_text) VALUES (new.id, new.extracted_text);
+        END""",
+        "INSERT INTO submissions_fts (submissions_fts) VALUES ('rebuild')"
+    ],
+    # Session indexes for verify_session, create_session and the sweeper. The
+    # token and user indexes change columns, so they are recreated.
+    [
+        _add_column('sessions', 'is_valid', 'BOOLEAN DEFAULT 1'),
+        "DROP INDEX IF EXISTS idx_sessions_token",
+        "CREATE INDEX idx_sessions_token ON sessions(token, is_valid, expires_at, user_id)",
+        "DROP INDEX IF EXISTS idx_sessions_user_id",
+        "CREATE INDEX idx_sessions_user_id ON sessions(user_id, is_valid)",
+        "CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at)",
+        "CREATE INDEX IF NOT EXISTS idx_sessions_invalid ON sessions(is_valid) WHERE is_valid = 0"
+    ],
+    # Whole-assignment cheating results written by save_analysis_results
+    [
+        _add_column('submissions', 'cheating_detected', "TEXT CHECK (cheating_detected IN ('exact_copy', 'paraphrase'))"),
+        """CREATE TABLE IF NOT EXISTS analysis_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            assignment_id INTEGER NOT NULL,
+            total_submissions INTEGER NOT NULL,
+            suspicious_submissions INTEGER NOT NULL,
+            exact_copy_cases INTEGER NOT NULL,
+            paraphrase_cases INTEGER NOT NULL,
+            analyzed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (assignment_id) REFERENCES assignments (id)
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_analysis_assignment ON analysis_results(assignment_id, analyzed_at)"
+    ],
+]
+
+
+class ConnectionPool:
+    """
+    One long-lived SQLite connection per thread.
+
+    Connections are opened in WAL mode with ``synchronous=NORMAL``, so
+    readers never block the writer and commits skip the per-transaction
+    fsync of the rollback journal. They run in autocommit mode; writes go
+    through ``transaction()``, which commits or rolls back as one unit.
+    Connections are never shared across threads or a fork.
+    """
+
+    def __init__(self, path, cached_statements=STATEMENT_CACHE_SIZE, busy_timeout=BUSY_TIMEOUT, migrations=()):
+        self.path = path
+        self.cached_statements = cached_statements
+        self.busy_timeout = busy_timeout
+        self.migrations = migrations
+        self._local = threading.local()
+        self._migrate_lock = threading.Lock()
+        self._migrated_pid = None
+
+    def connection(self):
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        # A connection inherited through fork (gunicorn preload) must not be used
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            if self._migrated_pid != os.getpid():
+                with self._migrate_lock:
+                    if self._migrated_pid != os.getpid():
+                        self.migrate(conn)
+                        self._migrated_pid = os.getpid()
+        return conn
+
+    def migrate(self, conn):
+        """
+        Apply the migrations the database has not had yet, in one transaction.
+
+        A database without tables is left alone for init_db to create.
+        """
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            has_schema = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'submissions'")
+            pending = self.migrations[version:] if has_schema.fetchone() else []
+            for number, steps in enumerate(pending, start=version + 1):
+                for step in steps:
+                    step(conn) if callable(step) else conn.execute(step)
+                conn.execute(f'PRAGMA user_version = {number}')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        if pending:
+            logger.info(f"Migrated {self.path} to schema version {len(self.migrations)}")
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            isolation_level=None,
+            cached_statements=self.cached_statements
+        )
         conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
         return conn
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run the block in one write transaction on this thread's connection.
+
+        ``BEGIN IMMEDIATE`` takes the write lock up front, so a busy writer is
+        waited for instead of failing when a read transaction upgrades.
+        Nested use joins the outer transaction.
+        """
+        conn = self.connection()
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+
+    def close(self):
+        """Close this thread's connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+
+pool = ConnectionPool(DATABASE_PATH, migrations=MIGRATIONS)
+
+def get_db_connection():
+    """Return the calling thread's pooled connection; callers must not close it."""
+    try:
+        return pool.connection()
     except sqlite3.Error as e:
         logger.error(f"Database connection error: {e}")
         raise
 
+def transaction():
+    """Context manager for a write transaction on the pooled connection."""
+    return pool.transaction()
+
 def init_db():
     """Initialize the database with schema."""
     try:
         conn = get_db_connection()
         with open(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'schema.sql'), 'r') as f:
             conn.executescript(f.read())
-        conn.commit()
+        # schema.sql is the current schema, so no migration applies to it
+        conn.execute(f'PRAGMA user_version = {len(MIGRATIONS)}')
         
         # Create upload directory if it doesn't exist
         os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -39,8 +228,6 @@ def init_db():
     except Exception as e:
         logger.error(f"Database initialization error: {e}")
         raise
-    finally:
-        conn.close()
 
 # Authentication functions
 def hash_password(password: str) -> str:
@@ -50,39 +237,29 @@ def hash_password(password: str) -> str:
 def create_user(email: str, password: str, full_name: str, user_type: str) -> Optional[int]:
     """Create a new user and return user ID if successful."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check if user already exists
-        cursor.execute('SELECT id FROM users WHERE email = ?', (email,))
-        if cursor.fetchone() is not None:
-            return None
-            
-        password_hash = hash_password(password)
-        cursor.execute(
-            'INSERT INTO users (email, password_hash, full_name, user_type) VALUES (?, ?, ?, ?)',
-            (email, password_hash, full_name, user_type)
-        )
-        conn.commit()
-        return cursor.lastrowid
+        with transaction() as conn:
+            # Check if user already exists
+            if conn.execute('SELECT id FROM users WHERE email = ?', (email,)).fetchone() is not None:
+                return None
+                
+            password_hash = hash_password(password)
+            cursor = conn.execute(
+                'INSERT INTO users (email, password_hash, full_name, user_type) VALUES (?, ?, ?, ?)',
+                (email, password_hash, full_name, user_type)
+            )
+            return cursor.lastrowid
     except sqlite3.Error as e:
         logger.error(f"Error creating user: {e}")
         return None
-    finally:
-        conn.close()
 
 def verify_user(email: str, password: str) -> Optional[Dict]:
     """Verify user credentials and return user data if valid."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
         password_hash = hash_password(password)
-        cursor.execute(
+        user = get_db_connection().execute(
             'SELECT id, email, full_name, user_type FROM users WHERE email = ? AND password_hash = ?',
             (email, password_hash)
-        )
-        user = cursor.fetchone()
+        ).fetchone()
         
         if user:
             return dict(user)
@@ -90,88 +267,81 @@ def verify_user(email: str, password: str) -> Optional[Dict]:
     except sqlite3.Error as e:
         logger.error(f"Error verifying user: {e}")
         return None
-    finally:
-        conn.close()
 
 def create_session(user_id: int) -> Optional[str]:
     """Create a new session for a user and return the session token."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # First, invalidate any existing sessions for this user
-        cursor.execute(
-            'UPDATE sessions SET is_valid = 0 WHERE user_id = ?',
-            (user_id,)
-        )
-        
-        token = secrets.token_hex(32)
-        expires_at = datetime.now() + timedelta(days=7)
-        
-        cursor.execute(
-            'INSERT INTO sessions (user_id, token, expires_at, is_valid) VALUES (?, ?, ?, 1)',
-            (user_id, token, expires_at)
-        )
-        conn.commit()
+        with transaction() as conn:
+            # First, invalidate any existing sessions for this user
+            previous = conn.execute(
+                'SELECT token FROM sessions WHERE user_id = ? AND is_valid = 1',
+                (user_id,)
+            ).fetchall()
+            conn.execute(
+                'UPDATE sessions SET is_valid = 0 WHERE user_id = ? AND is_valid = 1',
+                (user_id,)
+            )
+            
+            token = secrets.token_hex(32)
+            expires_at = datetime.now() + timedelta(days=7)
+            
+            conn.execute(
+                'INSERT INTO sessions (user_id, token, expires_at, is_valid) VALUES (?, ?, ?, 1)',
+                (user_id, token, expires_at)
+            )
+        for row in previous:
+            session_cache.invalidate(row['token'])
         return token
     except sqlite3.Error as e:
         logger.error(f"Error creating session: {e}")
         return None
-    finally:
-        conn.close()
+
+def _load_session(token: str) -> Optional[Tuple[Dict, datetime]]:
+    row = get_db_connection().execute('''
+        SELECT u.id, u.email, u.full_name, u.user_type, s.expires_at
+        FROM sessions s
+        JOIN users u ON s.user_id = u.id
+        WHERE s.token = ? AND s.expires_at > ? AND s.is_valid = 1
+    ''', (token, datetime.now())).fetchone()
+    if row is None:
+        return None
+    user = dict(row)
+    return user, datetime.fromisoformat(str(user.pop('expires_at')))
 
 def verify_session(token: str) -> Optional[Dict]:
     """Verify a session token and return user data if valid."""
+    session_sweeper.start()
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT u.id, u.email, u.full_name, u.user_type 
-            FROM sessions s
-            JOIN users u ON s.user_id = u.id
-            WHERE s.token = ? AND s.expires_at > ? AND s.is_valid = 1
-        ''', (token, datetime.now()))
-        
-        user = cursor.fetchone()
-        if user:
-            return dict(user)
+        cached = session_cache.get_or_load(token, lambda: _load_session(token))
+        # A cached session still ends on time, however fresh the entry
+        if cached and cached[1] > datetime.now():
+            return dict(cached[0])
         return None
     except sqlite3.Error as e:
         logger.error(f"Error verifying session: {e}")
         return None
-    finally:
-        conn.close()
 
 def invalidate_session(token: str) -> bool:
     """Invalidate a session token."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            'UPDATE sessions SET is_valid = 0 WHERE token = ?',
-            (token,)
-        )
-        conn.commit()
+        with transaction() as conn:
+            conn.execute(
+                'UPDATE sessions SET is_valid = 0 WHERE token = ?',
+                (token,)
+            )
+        session_cache.invalidate(token)
         return True
     except sqlite3.Error as e:
         logger.error(f"Error invalidating session: {e}")
         return False
-    finally:
-        conn.close()
 
 def get_user_by_id(user_id: int) -> Optional[Dict]:
     """Get user data by ID."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute(
+        user = get_db_connection().execute(
             'SELECT id, email, full_name, user_type FROM users WHERE id = ?',
             (user_id,)
-        )
-        user = cursor.fetchone()
+        ).fetchone()
         
         if user:
             return dict(user)
@@ -179,57 +349,97 @@ def get_user_by_id(user_id: int) -> Optional[Dict]:
     except sqlite3.Error as e:
         logger.error(f"Error getting user: {e}")
         return None
-    finally:
-        conn.close()
 
 def cleanup_expired_sessions():
-    """Clean up expired sessions from the database."""
+    """Clean up expired and invalidated sessions from the database."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            'DELETE FROM sessions WHERE expires_at < ?',
-            (datetime.now(),)
-        )
-        conn.commit()
+        session_sweeper.sweep()
         return True
     except sqlite3.Error as e:
         logger.error(f"Error cleaning up sessions: {e}")
         return False
-    finally:
-        conn.close()
+
+class SessionSweeper:
+    """
+    Background thread that deletes expired and invalidated sessions.
+
+    Rows go in batches of ``batch_size``, each its own short transaction,
+    so a large backlog never holds the write lock for long.
+    """
+
+    def __init__(self, interval=SESSION_SWEEP_INTERVAL, batch_size=SESSION_SWEEP_BATCH_SIZE):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def start(self):
+        """Start the sweeper thread in this process unless it is already running."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            # Threads do not survive fork, so each worker process starts its own
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='session-sweeper', daemon=True).start()
+
+    def sweep(self) -> int:
+        """Delete every expired or invalidated session now and return how many went."""
+        deleted = 0
+        while True:
+            with transaction() as conn:
+                cursor = conn.execute('''
+                    DELETE FROM sessions
+                    WHERE id IN (
+                        SELECT id FROM sessions WHERE expires_at < ?
+                        UNION
+                        SELECT id FROM sessions WHERE is_valid = 0
+                        LIMIT ?
+                    )
+                ''', (datetime.now(), self.batch_size))
+            deleted += cursor.rowcount
+            if cursor.rowcount < self.batch_size:
+                return deleted
+            time.sleep(SESSION_SWEEP_PAUSE)
+
+    def _run(self):
+        while True:
+            try:
+                deleted = self.sweep()
+                if deleted:
+                    logger.info(f"Removed {deleted} expired or invalidated sessions")
+            except sqlite3.Error as e:
+                logger.error(f"Error sweeping sessions: {e}")
+            time.sleep(self.interval)
+
+# Create global instances
+session_cache = SingleFlightCache(default_ttl=SESSION_CACHE_TTL)
+session_sweeper = SessionSweeper()
 
 # Assignment functions
 def create_assignment(professor_id: int, name: str, description: str, course_id: int,
                      due_date: str, correct_answer: str) -> Optional[int]:
     """Create a new assignment and return its ID if successful."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO assignments (professor_id, name, description, course_id, 
-                                   due_date, correct_answer)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (professor_id, name, description, course_id, due_date, correct_answer))
-        
-        conn.commit()
+        with transaction() as conn:
+            cursor = conn.execute('''
+                INSERT INTO assignments (professor_id, name, description, course_id, 
+                                       due_date, correct_answer)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (professor_id, name, description, course_id, due_date, correct_answer))
         return cursor.lastrowid
     except sqlite3.Error as e:
         logger.error(f"Error creating assignment: {e}")
         return None
-    finally:
-        conn.close()
 
 def get_assignments(user_id: int, user_type: str) -> List[Dict]:
     """Get assignments for a user based on their role."""
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
         
         if user_type == 'professor':
-            cursor.execute('''
+            cursor = conn.execute('''
                 SELECT a.*, c.name as course_name,
                        (SELECT COUNT(*) FROM submissions s WHERE s.assignment_id = a.id) as submission_count
                 FROM assignments a
@@ -238,7 +448,7 @@ def get_assignments(user_id: int, user_type: str) -> List[Dict]:
                 ORDER BY a.due_date DESC
             ''', (user_id,))
         else:
-            cursor.execute('''
+            cursor = conn.execute('''
                 SELECT a.*, c.name as course_name,
                        CASE WHEN s.id IS NOT NULL THEN 1 ELSE 0 END as is_submitted
                 FROM assignments a
@@ -253,127 +463,79 @@ def get_assignments(user_id: int, user_type: str) -> List[Dict]:
     except sqlite3.Error as e:
         logger.error(f"Error fetching assignments: {e}")
         return []
-    finally:
-        conn.close()
 
 # Submission functions
 def save_submission(student_id: int, assignment_id: int, file_path: str,
                    extracted_text: str, word_count: int) -> Optional[int]:
     """Save a new submission and return its ID if successful."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO submissions (student_id, assignment_id, file_path, 
-                                   extracted_text, word_count, correctness)
-            VALUES (?, ?, ?, ?, ?, 'pending')
-        ''', (student_id, assignment_id, file_path, extracted_text, word_count))
-        
-        conn.commit()
+        with transaction() as conn:
+            cursor = conn.execute('''
+                INSERT INTO submissions (student_id, assignment_id, file_path, 
+                                       extracted_text, word_count, correctness)
+                VALUES (?, ?, ?, ?, ?, 'pending')
+            ''', (student_id, assignment_id, file_path, extracted_text, word_count))
         return cursor.lastrowid
     except sqlite3.Error as e:
         logger.error(f"Error saving submission: {e}")
         return None
-    finally:
-        conn.close()
-
-def update_submission_analysis(submission_id: int, similarity_score: float,
-                             correctness: str) -> bool:
-    """Update submission with analysis results."""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            UPDATE submissions
-            SET similarity_score = ?, correctness = ?
-            WHERE id = ?
-        ''', (similarity_score, correctness, submission_id))
-        
-        conn.commit()
-        return True
-    except sqlite3.Error as e:
-        logger.error(f"Error updating submission analysis: {e}")
-        return False
-    finally:
-        conn.close()
 
 def save_cheating_detection(submission_id: int, detection_type: str,
                           similarity_score: float, matched_submission_id: Optional[int]) -> bool:
     """Save cheating detection results."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO cheating_detection (submission_id, detection_type, 
-                                          similarity_score, matched_submission_id)
-            VALUES (?, ?, ?, ?)
-        ''', (submission_id, detection_type, similarity_score, matched_submission_id))
-        
-        conn.commit()
+        with transaction() as conn:
+            conn.execute('''
+                INSERT INTO cheating_detection (submission_id, detection_type, 
+                                              similarity_score, matched_submission_id)
+                VALUES (?, ?, ?, ?)
+            ''', (submission_id, detection_type, similarity_score, matched_submission_id))
         return True
     except sqlite3.Error as e:
         logger.error(f"Error saving cheating detection: {e}")
         return False
-    finally:
-        conn.close()
 
 # Course functions
 def create_course(name: str, code: str, professor_id: int) -> Optional[int]:
     """Create a new course and return its ID if successful."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO courses (name, code, professor_id)
-            VALUES (?, ?, ?)
-        ''', (name, code, professor_id))
-        
-        conn.commit()
+        with transaction() as conn:
+            cursor = conn.execute('''
+                INSERT INTO courses (name, code, professor_id)
+                VALUES (?, ?, ?)
+            ''', (name, code, professor_id))
         return cursor.lastrowid
     except sqlite3.Error as e:
         logger.error(f"Error creating course: {e}")
         return None
-    finally:
-        conn.close()
 
 def enroll_student(student_id: int, course_id: int) -> bool:
     """Enroll a student in a course."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO course_enrollments (student_id, course_id)
-            VALUES (?, ?)
-        ''', (student_id, course_id))
-        
-        conn.commit()
+        with transaction() as conn:
+            conn.execute('''
+                INSERT INTO course_enrollments (student_id, course_id)
+                VALUES (?, ?)
+            ''', (student_id, course_id))
         return True
     except sqlite3.Error as e:
         logger.error(f"Error enrolling student: {e}")
         return False
-    finally:
-        conn.close()
 
 def get_courses(user_id: int, user_type: str) -> List[Dict]:
     """Get courses for a user based on their role."""
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
         
         if user_type == 'professor':
-            cursor.execute('''
+            cursor = conn.execute('''
                 SELECT c.*, 
                        (SELECT COUNT(*) FROM course_enrollments ce WHERE ce.course_id = c.id) as student_count
                 FROM courses c
                 WHERE c.professor_id = ?
             ''', (user_id,))
         else:
-            cursor.execute('''
+            cursor = conn.execute('''
                 SELECT c.*
                 FROM courses c
                 JOIN course_enrollments ce ON ce.course_id = c.id
@@ -384,22 +546,16 @@ def get_courses(user_id: int, user_type: str) -> List[Dict]:
     except sqlite3.Error as e:
         logger.error(f"Error fetching courses: {e}")
         return []
-    finally:
-        conn.close()
 
 def store_submission(student_id: int, assignment_id: int, content: str, word_count: int) -> int:
     """Store a new submission in the database."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO submissions (student_id, assignment_id, content, word_count)
-            VALUES (?, ?, ?, ?)
-        ''', (student_id, assignment_id, content, word_count))
-        submission_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return submission_id
+        with transaction() as conn:
+            cursor = conn.execute('''
+                INSERT INTO submissions (student_id, assignment_id, content, word_count)
+                VALUES (?, ?, ?, ?)
+            ''', (student_id, assignment_id, content, word_count))
+        return cursor.lastrowid
     except sqlite3.Error as e:
         logger.error(f"Error storing submission: {e}")
         raise
@@ -407,15 +563,12 @@ def store_submission(student_id: int, assignment_id: int, content: str, word_cou
 def update_submission_analysis(submission_id: int, similarity_score: float, correctness: str) -> None:
     """Update submission with analysis results."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            UPDATE submissions
-            SET similarity_score = ?, correctness = ?
-            WHERE id = ?
-        ''', (similarity_score, correctness, submission_id))
-        conn.commit()
-        conn.close()
+        with transaction() as conn:
+            conn.execute('''
+                UPDATE submissions
+                SET similarity_score = ?, correctness = ?
+                WHERE id = ?
+            ''', (similarity_score, correctness, submission_id))
     except sqlite3.Error as e:
         logger.error(f"Error updating submission analysis: {e}")
         raise
@@ -423,22 +576,19 @@ def update_submission_analysis(submission_id: int, similarity_score: float, corr
 def store_cheating_analysis(assignment_id: int, analysis_data: Dict) -> None:
     """Store cheating analysis results."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO analysis_results 
-            (assignment_id, total_submissions, suspicious_submissions, 
-             exact_copy_cases, paraphrase_cases)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (
-            assignment_id,
-            analysis_data['total_submissions'],
-            analysis_data['suspicious_submissions'],
-            analysis_data['exact_copy_cases'],
-            analysis_data['paraphrase_cases']
-        ))
-        conn.commit()
-        conn.close()
+        with transaction() as conn:
+            conn.execute('''
+                INSERT INTO analysis_results 
+                (assignment_id, total_submissions, suspicious_submissions, 
+                 exact_copy_cases, paraphrase_cases)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (
+                assignment_id,
+                analysis_data['total_submissions'],
+                analysis_data['suspicious_submissions'],
+                analysis_data['exact_copy_cases'],
+                analysis_data['paraphrase_cases']
+            ))
     except sqlite3.Error as e:
         logger.error(f"Error storing cheating analysis: {e}")
         raise
@@ -446,18 +596,14 @@ def store_cheating_analysis(assignment_id: int, analysis_data: Dict) -> None:
 def get_assignment_submissions(assignment_id: int) -> List[Dict]:
     """Get all submissions for an assignment."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
+        cursor = get_db_connection().execute('''
             SELECT s.*, u.username, u.full_name
             FROM submissions s
             JOIN users u ON s.student_id = u.id
             WHERE s.assignment_id = ?
             ORDER BY s.submitted_at DESC
         ''', (assignment_id,))
-        submissions = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return submissions
+        return [dict(row) for row in cursor.fetchall()]
     except sqlite3.Error as e:
         logger.error(f"Error fetching assignment submissions: {e}")
         raise
@@ -465,18 +611,14 @@ def get_assignment_submissions(assignment_id: int) -> List[Dict]:
 def get_student_submissions(student_id: int) -> List[Dict]:
     """Get all submissions for a student."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
+        cursor = get_db_connection().execute('''
             SELECT s.*, a.name as assignment_name, a.course
             FROM submissions s
             JOIN assignments a ON s.assignment_id = a.id
             WHERE s.student_id = ?
             ORDER BY s.submitted_at DESC
         ''', (student_id,))
-        submissions = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return submissions
+        return [dict(row) for row in cursor.fetchall()]
     except sqlite3.Error as e:
         logger.error(f"Error fetching student submissions: {e}")
         raise
@@ -484,17 +626,13 @@ def get_student_submissions(student_id: int) -> List[Dict]:
 def get_assignment_analysis(assignment_id: int) -> Optional[Dict]:
     """Get the latest analysis results for an assignment."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
+        result = get_db_connection().execute('''
             SELECT *
             FROM analysis_results
             WHERE assignment_id = ?
             ORDER BY analyzed_at DESC
             LIMIT 1
-        ''', (assignment_id,))
-        result = cursor.fetchone()
-        conn.close()
+        ''', (assignment_id,)).fetchone()
         return dict(result) if result else None
     except sqlite3.Error as e:
         logger.error(f"Error fetching assignment analysis: {e}")
@@ -503,15 +641,120 @@ def get_assignment_analysis(assignment_id: int) -> Optional[Dict]:
 def mark_submission_as_cheating(submission_id: int, cheating_type: str) -> None:
     """Mark a submission as potential cheating case."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            UPDATE submissions
-            SET cheating_detected = ?
-            WHERE id = ?
-        ''', (cheating_type, submission_id))
-        conn.commit()
-        conn.close()
+        with transaction() as conn:
+            conn.execute('''
+                UPDATE submissions
+                SET cheating_detected = ?
+                WHERE id = ?
+            ''', (cheating_type, submission_id))
     except sqlite3.Error as e:
         logger.error(f"Error marking submission as cheating: {e}")
-        raise 
\ No newline at end of file
+        raise
+
+def save_cheating_detections(detections: List[Tuple]) -> bool:
+    """Save many (submission_id, detection_type, similarity_score, matched_submission_id) rows in one transaction."""
+    try:
+        with transaction() as conn:
+            conn.executemany('''
+                INSERT INTO cheating_detection (submission_id, detection_type, 
+                                              similarity_score, matched_submission_id)
+                VALUES (?, ?, ?, ?)
+            ''', detections)
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error saving cheating detections: {e}")
+        return False
+
+def save_analysis_results(assignment_id: int, analysis: Dict) -> None:
+    """
+    Store a whole-assignment analysis in one transaction.
+
+    Replaces the assignment's previous detections and cheating flags with
+    those in ``analysis`` (CheatingDetector.analyze_submissions output) and
+    adds its analysis_results row, so the assignment is never seen half
+    written and the batch costs one commit.
+    """
+    detections, flags = flatten_analysis(analysis)
+    stats = analysis.get('statistics', {})
+    try:
+        with transaction() as conn:
+            conn.execute('''
+                DELETE FROM cheating_detection
+                WHERE submission_id IN (SELECT id FROM submissions WHERE assignment_id = ?)
+            ''', (assignment_id,))
+            conn.execute('''
+                UPDATE submissions
+                SET cheating_detected = NULL
+                WHERE assignment_id = ? AND cheating_detected IS NOT NULL
+            ''', (assignment_id,))
+            conn.executemany('''
+                INSERT INTO cheating_detection (submission_id, detection_type, 
+                                              similarity_score, matched_submission_id)
+                VALUES (?, ?, ?, ?)
+            ''', detections)
+            conn.executemany('''
+                UPDATE submissions
+                SET cheating_detected = ?
+                WHERE id = ?
+            ''', [(flag, submission_id) for submission_id, flag in flags.items()])
+            conn.execute('''
+                INSERT INTO analysis_results 
+                (assignment_id, total_submissions, suspicious_submissions, 
+                 exact_copy_cases, paraphrase_cases)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (
+                assignment_id,
+                stats.get('total_submissions', 0),
+                stats.get('suspicious_submissions', len(flags)),
+                stats.get('exact_copy_cases', len(analysis.get('exact_copies', []))),
+                stats.get('paraphrase_cases', len(analysis.get('paraphrases', [])))
+            ))
+    except sqlite3.Error as e:
+        logger.error(f"Error saving analysis results: {e}")
+        raise
+
+def _passage_query(passage: str, max_terms: int = MAX_QUERY_TERMS) -> Optional[str]:
+    """Build an FTS5 OR query from a passage's distinct words, longest (and usually rarest) first."""
+    words = {word for word in re.findall(r'\w+', passage.lower()) if len(word) > 2}
+    terms = sorted(words, key=lambda word: (-len(word), word))[:max_terms]
+    if not terms:
+        return None
+    # Quoting makes every term a literal, whatever FTS5 syntax the text contains
+    return ' OR '.join(f'"{term}"' for term in terms)
+
+def find_candidate_sources(passage: str, assignment_id: Optional[int] = None,
+                           exclude_submission_id: Optional[int] = None, limit: int = 10) -> List[Dict]:
+    """
+    Return the submissions most likely to be the source of ``passage``, best first.
+
+    Ranks by BM25 over the submissions_fts index, so it costs an index
+    lookup rather than a scan, and is meant as a prefilter before
+    TF-IDF or MinHash scoring. Lower scores are better matches.
+    """
+    query = _passage_query(passage)
+    if query is None:
+        return []
+    try:
+        cursor = get_db_connection().execute('''
+            SELECT s.id, s.student_id, s.assignment_id, bm25(submissions_fts) AS score
+            FROM submissions_fts
+            JOIN submissions s ON s.id = submissions_fts.rowid
+            WHERE submissions_fts MATCH ?
+              AND (? IS NULL OR s.assignment_id = ?)
+              AND (? IS NULL OR s.id != ?)
+            ORDER BY score
+            LIMIT ?
+        ''', (query, assignment_id, assignment_id, exclude_submission_id, exclude_submission_id, limit))
+        return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Error finding candidate sources: {e}")
+        return []
+
+def rebuild_text_index() -> None:
+    """Rebuild submissions_fts from the submissions table, e.g. after a bulk import."""
+    try:
+        with transaction() as conn:
+            conn.execute("INSERT INTO submissions_fts (submissions_fts) VALUES ('rebuild')")
+    except sqlite3.Error as e:
+        logger.error(f"Error rebuilding text index: {e}")
+        raise
@@ -0,0 +1,27 @@
+from typing import Dict, List, Tuple
+
+# When a submission is in both kinds of case, the stronger flag wins
+FLAG_PRIORITY = {'paraphrase': 1, 'exact_copy': 2}
+
+
+def flatten_analysis(analysis: Dict) -> Tuple[List[Tuple], Dict]:
+    """
+    Turn CheatingDetector.analyze_submissions output into rows for storage.
+
+    Exact-copy groups become one detection per copy, matched to the group's
+    first member; paraphrase pairs become one detection each.
+
+    Returns:
+        tuple: (list of (submission_id, detection_type, similarity_score,
+        matched_submission_id), dict of submission id -> strongest flag)
+    """
+    detections = []
+    flags = {}
+    for case in analysis.get('exact_copies', []) + analysis.get('paraphrases', []):
+        ids = case['submission_ids']
+        for submission_id in ids[1:]:
+            detections.append((submission_id, case['type'], case['similarity_score'], ids[0]))
+        for submission_id in ids:
+            if FLAG_PRIORITY[case['type']] > FLAG_PRIORITY.get(flags.get(submission_id), 0):
+                flags[submission_id] = case['type']
+    return detections, flags
@@ -4,24 +4,89 @@ import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import logging
-import threading
+import os
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from models.submission import Submission
+from utils.events import submission_events
+from utils.cache import invalidate_submission
+from utils.timeline import ProcessingTimeline
+from utils.processing_queue import ProcessingScheduler
+from utils.profiling import profile_job
+from utils.metrics import (
+    PDF_PAGE_SECONDS, TFIDF_FIT_SECONDS, SIMILARITY_SECONDS, QUEUE_WAIT_SECONDS, track_in_flight
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Processing status reported alongside each pipeline stage
+STAGE_STATUS = {
+    'queued': 'Pending',
+    'extracting': 'Processing',
+    'comparing': 'Processing',
+    'completed': 'Completed',
+    'failed': 'Failed'
+}
+
+def exact_duplicates(submission, others):
+    """Ids of the submissions among ``others`` whose file is byte-identical to this one's"""
+    if not submission.content_hash:
+        return []
+    return [
+        str(other.id) for other in others
+        if other.id != submission.id and other.content_hash == submission.content_hash
+    ]
+
 class DocumentProcessor:
     def __init__(self):
-        self.vectorizer = TfidfVectorizer(stop_words='english')
+        self.batch_workers = int(os.getenv('BATCH_EXTRACTION_WORKERS', '4'))
+        self.scheduler = ProcessingScheduler(self._run_claimed)
     
-    def process_submission_async(self, submission_id):
-        """Start asynchronous processing of a submission"""
-        thread = threading.Thread(target=self._process_submission, args=(submission_id,))
-        thread.start()
+    def process_submission_async(self, submission_id, size=None):
+        """Queue a submission for processing"""
+        self._publish(submission_id, 'queued')
+        self.scheduler.enqueue([submission_id], size)
+
+    def process_batch_async(self, assignment_id, submission_ids, size=None):
+        """Queue a batch of submissions to one assignment, to be processed as one job"""
+        for submission_id in submission_ids:
+            self._publish(submission_id, 'queued')
+        self.scheduler.enqueue(submission_ids, size, batch=True)
+
+    def _run_claimed(self, job):
+        """Run a job the scheduler took off the queue"""
+        if job.batch:
+            self._run_job('batch', job.queued_at, self._process_batch, job.assignment_id, job.ids, job.queued_at)
+        else:
+            self._run_job('submission', job.queued_at, self._process_submission, job.ids[0], job.queued_at)
+
+    def _run_job(self, kind, queued_at, target, *args):
+        """Run a queued job, recording its queue wait, counting it as in flight and maybe profiling it"""
+        QUEUE_WAIT_SECONDS.labels(kind=kind).observe((datetime.utcnow() - queued_at).total_seconds())
+        with track_in_flight(kind), profile_job(kind, label=str(args[0])):
+            target(*args)
+
+    def _publish(self, submission_id, stage, **fields):
+        """Announce a pipeline stage transition to status stream subscribers"""
+        # Stages are published right after the matching write, so cached status is stale
+        invalidate_submission(submission_id)
+        submission_events.publish(submission_id, {
+            'submission_id': str(submission_id),
+            'stage': stage,
+            'processing_status': STAGE_STATUS[stage],
+            **fields
+        })
+
+    def _store_timeline(self, submission_id, timeline):
+        """Persist a finished processing timeline without rewriting the submission"""
+        Submission.objects(id=submission_id).update(set__processing_timeline=timeline.to_dict())
     
-    def _process_submission(self, submission_id):
+    def _process_submission(self, submission_id, queued_at=None):
         """Process a submission with text extraction and plagiarism checking"""
+        timeline = ProcessingTimeline(queued_at)
+        timeline.started()
         try:
             # Get the submission
             submission = Submission.objects(id=submission_id).first()
@@ -33,19 +98,31 @@ class DocumentProcessor:
             submission.processing_status = 'Processing'
             submission.save()
             
-            # Extract text from PDF
-            pdf_data = submission.answer_file.read()
-            extracted_text = self._extract_text_from_pdf(pdf_data)
+            # Extract text from PDF, reading it from GridFS as a stream,
+            # unless an identical file has already been extracted
+            self._publish(submission_id, 'extracting', page=0, pages=None)
+            with timeline.stage('extraction') as extraction:
+                extracted_text = self._extracted_copy_text(submission)
+                if extracted_text is not None:
+                    extraction['deduplicated'] = True
+                else:
+                    extracted_text = self._extract_submission_text(submission, extraction)
             submission.ocr_text = extracted_text
             
             # Check for plagiarism
-            plagiarism_score, plagiarism_details = self._check_plagiarism(submission)
+            self._publish(submission_id, 'comparing')
+            with timeline.stage('comparison') as comparison:
+                plagiarism_score, plagiarism_details = self._check_plagiarism(submission)
+                comparison['documents'] = len(plagiarism_details.get('comparisons', []))
             submission.plagiarism_score = plagiarism_score
             submission.plagiarism_details = plagiarism_details
             
             # Update status to Completed
-            submission.processing_status = 'Completed'
-            submission.save()
+            with timeline.stage('save'):
+                submission.processing_status = 'Completed'
+                submission.save()
+            self._store_timeline(submission_id, timeline)
+            self._publish(submission_id, 'completed', plagiarism_score=plagiarism_score)
             
             logger.info(f"Successfully processed submission {submission_id}")
             
@@ -54,23 +131,213 @@ class DocumentProcessor:
             try:
                 submission.processing_status = 'Failed'
                 submission.processing_error = str(e)
+                submission.processing_timeline = timeline.to_dict()
                 submission.save()
             except Exception as save_error:
                 logger.error(f"Error updating submission status: {str(save_error)}")
+            self._publish(submission_id, 'failed', error=str(e))
     
-    def _extract_text_from_pdf(self, pdf_data):
+    def _process_batch(self, assignment_id, submission_ids, queued_at=None):
+        """Extract text for a batch in parallel, then score the whole assignment once"""
+        try:
+            submissions = list(Submission.objects(id__in=submission_ids))
+            Submission.objects(id__in=submission_ids).update(set__processing_status='Processing')
+
+            timelines = {}
+            for submission in submissions:
+                timelines[submission.id] = ProcessingTimeline(queued_at)
+                timelines[submission.id].started()
+
+            # Identical files only need their text extracted once
+            groups = {}
+            for submission in submissions:
+                groups.setdefault(submission.content_hash or str(submission.id), []).append(submission)
+
+            extracted = []
+            # The job holds one node slot; extract on more threads only with slots that are idle
+            with self.scheduler.borrow_slots(min(self.batch_workers, len(groups)) - 1) as borrowed, \
+                    ThreadPoolExecutor(max_workers=1 + borrowed) as pool:
+                futures = {
+                    pool.submit(self._extract_group_text, group, timelines): group
+                    for group in groups.values()
+                }
+                for future in as_completed(futures):
+                    group = futures[future]
+                    try:
+                        text = future.result()
+                    except Exception as e:
+                        logger.error(f"Error extracting text for submission {group[0].id}: {str(e)}")
+                        for submission in group:
+                            submission.processing_status = 'Failed'
+                            submission.processing_error = str(e)
+                            submission.processing_timeline = timelines[submission.id].to_dict()
+                            submission.save()
+                            self._publish(submission.id, 'failed', error=str(e))
+                        continue
+                    for submission in group:
+                        submission.ocr_text = text
+                        submission.save()
+                    extracted.extend(group)
+
+            # One TF-IDF fit covers every submission in the batch
+            for submission in extracted:
+                self._publish(submission.id, 'comparing')
+            comparison_start = datetime.utcnow()
+            results = self._score_assignment(assignment_id, extracted)
+            comparison_end = datetime.utcnow()
+            for submission in extracted:
+                timeline = timelines[submission.id]
+                submission.plagiarism_score, submission.plagiarism_details = results[submission.id]
+                timeline.record(
+                    'comparison', comparison_start, comparison_end,
+                    documents=len(submission.plagiarism_details.get('comparisons', []))
+                )
+                with timeline.stage('save'):
+                    submission.processing_status = 'Completed'
+                    submission.save()
+                self._store_timeline(submission.id, timeline)
+                self._publish(submission.id, 'completed', plagiarism_score=submission.plagiarism_score)
+
+            logger.info(f"Processed batch of {len(submissions)} submissions for assignment {assignment_id}")
+
+        except Exception as e:
+            logger.error(f"Error processing batch for assignment {assignment_id}: {str(e)}")
+            Submission.objects(id__in=submission_ids, processing_status='Processing').update(
+                set__processing_status='Failed',
+                set__processing_error=str(e)
+            )
+            for submission_id in submission_ids:
+                self._publish(submission_id, 'failed', error=str(e))
+
+    def _extracted_copy_text(self, submission):
+        """Text already extracted from a byte-identical file, or None"""
+        if not submission.content_hash:
+            return None
+        # Completed means extracted: a copy whose file had no text layer is
+        # stored without ocr_text and its empty text is reused as is
+        copy = Submission.objects(
+            content_hash=submission.content_hash,
+            id__ne=submission.id,
+            processing_status='Completed'
+        ).only('ocr_text').first()
+        return (copy.ocr_text or '') if copy else None
+
+    def _extract_group_text(self, group, timelines):
+        """Extract the text shared by a group of identical files, timing it for each of them"""
+        timeline = timelines[group[0].id]
+        try:
+            with timeline.stage('extraction') as extraction:
+                return self._extract_submission_text(group[0], extraction)
+        finally:
+            for submission in group[1:]:
+                timelines[submission.id].copy_stage(timeline, 'extraction')
+                timelines[submission.id].stages['extraction']['deduplicated'] = True
+
+    def _extract_submission_text(self, submission, stage=None):
+        """
+        Extract the text of a submission's answer file, reporting page progress.
+
+        Page and byte counts are added to ``stage`` when a timeline stage is given.
+        """
+        pdf_stream = submission.answer_file.get()
+        if stage is not None:
+            stage['bytes'] = pdf_stream.length
+
+        def report(page, pages):
+            if stage is not None:
+                stage['pages'] = pages
+            self._publish(submission.id, 'extracting', page=page, pages=pages)
+
+        try:
+            return self._extract_text_from_pdf(pdf_stream, progress_callback=report)
+        finally:
+            pdf_stream.close()
+
+    def _score_assignment(self, assignment_id, targets):
+        """
+        Score ``targets`` against every extracted submission of the assignment.
+
+        Returns:
+            dict: submission id -> (plagiarism score, details)
+        """
+        if not targets:
+            return {}
+
+        corpus = list(Submission.objects(
+            assignment=assignment_id,
+            ocr_text__exists=True
+        ).only('id', 'ocr_text', 'content_hash'))
+        row_of = {doc.id: i for i, doc in enumerate(corpus)}
+
+        # A scan without a text layer extracts to no text, which leaves
+        # ocr_text unset and the submission out of the corpus
+        results = {
+            target.id: (0.0, {"message": "No text could be extracted from this submission"})
+            for target in targets if target.id not in row_of
+        }
+        targets = [target for target in targets if target.id in row_of]
+        if not targets:
+            return results
+
+        if len(corpus) < 2:
+            results.update({
+                target.id: (0.0, {"message": "No other submissions to compare against"})
+                for target in targets
+            })
+            return results
+
+        # A local vectorizer keeps concurrent batches from sharing fitted state
+        vectorizer = TfidfVectorizer(stop_words='english')
+        try:
+            with TFIDF_FIT_SECONDS.labels(caller='batch').time():
+                tfidf_matrix = vectorizer.fit_transform([doc.ocr_text for doc in corpus])
+        except ValueError as e:
+            # Empty vocabulary: the texts hold nothing but stop words
+            logger.warning(f"Nothing to compare for assignment {assignment_id}: {str(e)}")
+            results.update({
+                target.id: (0.0, {"message": "No comparable text in this assignment"})
+                for target in targets
+            })
+            return results
+
+        target_rows = [row_of[target.id] for target in targets]
+        with SIMILARITY_SECONDS.labels(caller='batch').time():
+            similarity_matrix = cosine_similarity(tfidf_matrix[target_rows], tfidf_matrix)
+
+        for target, row, similarities in zip(targets, target_rows, similarity_matrix):
+            comparisons = [
+                {
+                    "submission_id": str(corpus[j].id),
+                    "similarity_score": float(score * 100)
+                }
+                for j, score in enumerate(similarities) if j != row
+            ]
+            plagiarism_score = max(c["similarity_score"] for c in comparisons)
+            results[target.id] = (plagiarism_score, {
+                "overall_score": plagiarism_score,
+                "comparisons": comparisons,
+                "exact_duplicates": exact_duplicates(target, corpus)
+            })
+        return results
+
+    def _extract_text_from_pdf(self, pdf_stream, progress_callback=None):
         """Extract text directly from PDF using PyPDF2"""
         try:
-            # Create a PDF reader object
-            pdf_file = io.BytesIO(pdf_data)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
+            # Accept raw bytes as well as a seekable file-like object
+            if isinstance(pdf_stream, (bytes, bytearray)):
+                pdf_stream = io.BytesIO(pdf_stream)
+            pdf_reader = PyPDF2.PdfReader(pdf_stream)
             
             # Extract text from each page
             extracted_text = []
-            for page in pdf_reader.pages:
-                text = page.extract_text()
+            pages = len(pdf_reader.pages)
+            for page_number, page in enumerate(pdf_reader.pages, start=1):
+                with PDF_PAGE_SECONDS.time():
+                    text = page.extract_text()
                 if text:
                     extracted_text.append(text)
+                if progress_callback:
+                    progress_callback(page_number, pages)
             
             return '\n'.join(extracted_text)
             
@@ -81,7 +348,11 @@ class DocumentProcessor:
     def _check_plagiarism(self, submission):
         """Check for plagiarism against other submissions"""
         try:
-            # Get all other submissions for the same assignment
+            if not submission.ocr_text:
+                return 0.0, {"message": "No text could be extracted from this submission"}
+
+            # Get all other submissions for the same assignment; those
+            # extracted to no text are stored without ocr_text and skipped
             other_submissions = Submission.objects(
                 assignment=submission.assignment,
                 id__ne=submission.id,
@@ -94,11 +365,19 @@ class DocumentProcessor:
             # Prepare texts for comparison
             texts = [submission.ocr_text] + [s.ocr_text for s in other_submissions]
             
-            # Calculate TF-IDF matrix
-            tfidf_matrix = self.vectorizer.fit_transform(texts)
+            # Calculate TF-IDF matrix; jobs run concurrently, so each fits its own vectorizer
+            vectorizer = TfidfVectorizer(stop_words='english')
+            try:
+                with TFIDF_FIT_SECONDS.labels(caller='submission').time():
+                    tfidf_matrix = vectorizer.fit_transform(texts)
+            except ValueError as e:
+                # Empty vocabulary: the texts hold nothing but stop words
+                logger.warning(f"Nothing to compare for submission {submission.id}: {str(e)}")
+                return 0.0, {"message": "No comparable text in this assignment"}
             
             # Calculate similarity scores
-            similarity_scores = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:])[0]
+            with SIMILARITY_SECONDS.labels(caller='submission').time():
+                similarity_scores = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:])[0]
             
             # Calculate overall plagiarism score
             max_similarity = max(similarity_scores) if len(similarity_scores) > 0 else 0
@@ -113,7 +392,8 @@ class DocumentProcessor:
                         "similarity_score": float(score * 100)
                     }
                     for i, score in enumerate(similarity_scores)
-                ]
+                ],
+                "exact_duplicates": exact_duplicates(submission, other_submissions)
             }
             
             return plagiarism_score, details
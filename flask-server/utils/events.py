@@ -0,0 +1,88 @@
+import json
+import logging
+import queue
+import threading
+import time
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TERMINAL_STAGES = {'completed', 'failed'}
+
+
+class EventBus:
+    """
+    In-process publish/subscribe keyed by topic (a submission id).
+
+    The last event of each topic is retained, so a subscriber that connects
+    mid-job immediately learns the current stage without a database query.
+    Retained events expire after ``retain_seconds``.
+    """
+
+    def __init__(self, retain_seconds=600, max_queue_size=100):
+        self.retain_seconds = retain_seconds
+        self.max_queue_size = max_queue_size
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._last_events = {}
+
+    def publish(self, topic, event):
+        """Deliver ``event`` to every subscriber of ``topic`` and retain it."""
+        topic = str(topic)
+        with self._lock:
+            self._last_events[topic] = (time.monotonic(), event)
+            subscribers = list(self._subscribers.get(topic, ()))
+            self._expire_locked()
+
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                # A stalled client only needs the latest state
+                logger.warning(f"Dropping event for slow subscriber on {topic}")
+
+    def subscribe(self, topic):
+        """Register a subscriber queue, seeded with the retained event if any."""
+        topic = str(topic)
+        subscriber = queue.Queue(maxsize=self.max_queue_size)
+        with self._lock:
+            self._subscribers.setdefault(topic, set()).add(subscriber)
+            retained = self._last_events.get(topic)
+        if retained:
+            subscriber.put_nowait(retained[1])
+        return subscriber
+
+    def unsubscribe(self, topic, subscriber):
+        topic = str(topic)
+        with self._lock:
+            subscribers = self._subscribers.get(topic)
+            if subscribers:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[topic]
+
+    def last_event(self, topic):
+        with self._lock:
+            retained = self._last_events.get(str(topic))
+        return retained[1] if retained else None
+
+    def _expire_locked(self):
+        cutoff = time.monotonic() - self.retain_seconds
+        expired = [topic for topic, (stamp, _) in self._last_events.items() if stamp < cutoff]
+        for topic in expired:
+            del self._last_events[topic]
+
+
+def format_sse(event, event_id=None):
+    """Serialize an event dict as a server-sent events frame."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event.get('stage', 'message')}")
+    lines.append(f"data: {json.dumps(event)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+# Create a global instance
+submission_events = EventBus()
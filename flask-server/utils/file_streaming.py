@@ -0,0 +1,132 @@
+import datetime
+import logging
+from flask import Response, request
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# GridFS default chunk size; reading in chunk-sized pieces maps each read to one chunk fetch
+STREAM_CHUNK_SIZE = 255 * 1024
+
+
+def _file_etag(grid_out):
+    """Derive a strong ETag from the GridFS md5, falling back to id + upload date."""
+    md5 = getattr(grid_out, 'md5', None)
+    if md5:
+        return md5
+    upload_date = grid_out.upload_date
+    stamp = int(upload_date.timestamp()) if upload_date else 0
+    return f"{grid_out._id}-{grid_out.length}-{stamp}"
+
+
+def _as_utc(value):
+    """Normalize a datetime to an aware UTC value with HTTP (second) precision."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc).replace(microsecond=0)
+
+
+def _not_modified(etag, last_modified):
+    """Evaluate If-None-Match / If-Modified-Since for a conditional GET."""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if_modified_since = _as_utc(request.if_modified_since)
+    return bool(if_modified_since and last_modified and last_modified <= if_modified_since)
+
+
+def _range_applies(etag, last_modified):
+    """A Range is honoured unless an If-Range validator no longer matches."""
+    if_range = request.if_range
+    if if_range.etag:
+        return if_range.etag == etag
+    if if_range.date:
+        return bool(last_modified) and last_modified <= _as_utc(if_range.date)
+    return True
+
+
+def _iter_grid_out(grid_out, start, length):
+    """Yield ``length`` bytes of a GridOut starting at ``start``, one chunk at a time."""
+    try:
+        grid_out.seek(start)
+        remaining = length
+        while remaining > 0:
+            data = grid_out.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        grid_out.close()
+
+
+def send_gridfs_file(file_proxy, download_name, mimetype='application/pdf'):
+    """
+    Stream a mongoengine FileField straight from GridFS.
+
+    Supports conditional GETs (ETag / Last-Modified -> 304) and single
+    byte-range requests (206 / 416). The file is never read into memory
+    as a whole; chunks are pulled from GridFS as the client consumes them.
+
+    Args:
+        file_proxy: GridFSProxy of a FileField
+        download_name (str): Filename offered to the client
+        mimetype (str): Fallback content type when GridFS has none
+
+    Returns:
+        Response: Streaming Flask response, or None if the file is missing
+        or empty
+    """
+    grid_out = file_proxy.get()
+    if grid_out is None:
+        return None
+    if not grid_out.length:
+        # An empty upload is reported as not found, as it was before streaming
+        grid_out.close()
+        return None
+
+    etag = _file_etag(grid_out)
+    last_modified = _as_utc(grid_out.upload_date)
+    total = grid_out.length
+
+    def finish(response):
+        response.set_etag(etag)
+        if last_modified:
+            response.last_modified = last_modified
+        response.accept_ranges = 'bytes'
+        # Files can be replaced in place, so clients must revalidate
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
+    if _not_modified(etag, last_modified):
+        grid_out.close()
+        return finish(Response(status=304))
+
+    start, length, status = 0, total, 200
+    # Multi-range requests are answered with the full body, which RFC 7233 allows
+    if request.range and len(request.range.ranges) == 1 and _range_applies(etag, last_modified):
+        bounds = request.range.range_for_length(total)
+        if bounds is None:
+            grid_out.close()
+            response = Response(status=416)
+            response.headers['Content-Range'] = f'bytes */{total}'
+            return finish(response)
+        start, stop = bounds
+        length, status = stop - start, 206
+
+    response = Response(
+        _iter_grid_out(grid_out, start, length),
+        status=status,
+        mimetype=grid_out.content_type or mimetype,
+        direct_passthrough=True
+    )
+    response.content_length = length
+    if status == 206:
+        response.headers['Content-Range'] = f'bytes {start}-{start + length - 1}/{total}'
+    response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+
+    logger.debug(f"Streaming {download_name}: status={status}, bytes={length}/{total}")
+    return finish(response)
@@ -0,0 +1,80 @@
+import logging
+from flask import g, session, current_app, has_app_context
+from bson import DBRef
+from models.user import User
+from utils.cache import SingleFlightCache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Fields kept in the compact identity record
+IDENTITY_FIELDS = ('id', 'email', 'first_name', 'last_name', 'user_type', 'section', 'is_active')
+
+identity_cache = SingleFlightCache(default_ttl=30)
+
+
+def _compact(user):
+    return {
+        'id': str(user.id),
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'user_type': user.user_type,
+        'section': user.section,
+        'is_active': user.is_active
+    }
+
+
+def _load_identity(user_id):
+    user = User.objects(id=user_id).only(*IDENTITY_FIELDS).first()
+    return _compact(user) if user else None
+
+
+def current_identity():
+    """
+    Return a compact record of the logged-in user, or None.
+
+    Resolved at most once per request. Across requests the record is
+    cached for ``IDENTITY_CACHE_TTL`` seconds (0 disables the cache), which
+    is enough for authorization checks that only need id, type and section.
+    """
+    if '_identity' not in g:
+        user_id = session.get('user_id')
+        if not user_id:
+            identity = None
+        elif '_current_user' in g and g._current_user is not None:
+            identity = _compact(g._current_user)
+        else:
+            ttl = current_app.config.get('IDENTITY_CACHE_TTL', 30)
+            if ttl:
+                identity = identity_cache.get_or_load(('identity', user_id), lambda: _load_identity(user_id), ttl=ttl)
+            else:
+                identity = _load_identity(user_id)
+        g._identity = identity
+    return g._identity
+
+
+def current_user():
+    """Return the logged-in User document, loading it at most once per request."""
+    if '_current_user' not in g:
+        user_id = session.get('user_id')
+        g._current_user = User.objects(id=user_id).first() if user_id else None
+    return g._current_user
+
+
+def invalidate_identity(user_id):
+    """Forget the cached identity of a user after their record changed."""
+    identity_cache.invalidate(('identity', str(user_id)))
+    if has_app_context():
+        g.pop('_identity', None)
+
+
+def referenced_id(document, field_name):
+    """Return the id behind a ReferenceField as a string without dereferencing it."""
+    value = document._data.get(field_name)
+    if value is None:
+        return None
+    if isinstance(value, DBRef):
+        return str(value.id)
+    return str(getattr(value, 'id', value))
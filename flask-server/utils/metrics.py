@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+import logging
+from flask import Response, request, has_request_context
+from pymongo import monitoring
+from prometheus_client import (
+    Histogram, Gauge, CollectorRegistry, REGISTRY, generate_latest, CONTENT_TYPE_LATEST, multiprocess
+)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Sub-second buckets for per-page and per-query timings, minutes for whole stages
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SLOW_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+PDF_PAGE_SECONDS = Histogram(
+    'pdf_extraction_page_seconds', 'PyPDF2 text extraction time per page', buckets=FAST_BUCKETS
+)
+OCR_PAGE_SECONDS = Histogram(
+    'ocr_page_seconds', 'OCR time per page image', buckets=SLOW_BUCKETS
+)
+TFIDF_FIT_SECONDS = Histogram(
+    'tfidf_fit_seconds', 'TF-IDF vectorizer fit time', ['caller'], buckets=SLOW_BUCKETS
+)
+SIMILARITY_SECONDS = Histogram(
+    'similarity_seconds', 'Cosine similarity computation time', ['caller'], buckets=SLOW_BUCKETS
+)
+MONGO_COMMAND_SECONDS = Histogram(
+    'mongo_command_seconds', 'Mongo command round trip time', ['route', 'command'], buckets=FAST_BUCKETS
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    'processing_queue_wait_seconds', 'Time a processing job waits before it starts', ['kind'],
+    buckets=SLOW_BUCKETS
+)
+JOBS_IN_FLIGHT = Gauge(
+    'processing_jobs_in_flight', 'Processing jobs currently running', ['kind'], multiprocess_mode='livesum'
+)
+PROCESS_THREADS = Gauge(
+    'process_threads', 'Live threads in the worker process', multiprocess_mode='livesum'
+)
+
+
+class track_in_flight:
+    """Context manager counting a running job in JOBS_IN_FLIGHT."""
+
+    def __init__(self, kind):
+        self.gauge = JOBS_IN_FLIGHT.labels(kind=kind)
+
+    def __enter__(self):
+        self.gauge.inc()
+        return self
+
+    def __exit__(self, *exc):
+        self.gauge.dec()
+        return False
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """Time every Mongo command and label it with the Flask endpoint that issued it."""
+
+    def __init__(self):
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        route = (request.endpoint or 'unknown') if has_request_context() else 'background'
+        with self._lock:
+            self._started[(event.connection_id, event.request_id)] = (time.perf_counter(), route)
+
+    def _finish(self, event):
+        with self._lock:
+            started = self._started.pop((event.connection_id, event.request_id), None)
+        if started:
+            MONGO_COMMAND_SECONDS.labels(route=started[1], command=event.command_name).observe(
+                time.perf_counter() - started[0]
+            )
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+
+def init_metrics(app):
+    """Install the Mongo command listener, thread gauge and /metrics route."""
+    # Must run before the MongoClient is created for the listener to apply
+    monitoring.register(MongoCommandTimer())
+
+    @app.before_request
+    def sample_thread_count():
+        PROCESS_THREADS.set(threading.active_count())
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        token = os.getenv('METRICS_TOKEN')
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+
+        if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+            # Aggregate the per-worker files gunicorn workers write
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
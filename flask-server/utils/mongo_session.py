@@ -0,0 +1,105 @@
+import logging
+import secrets
+from datetime import datetime
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+from mongoengine.connection import get_db
+from utils.cache import SingleFlightCache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class MongoSession(CallbackDict, SessionMixin):
+    """Server-side session whose data lives in a Mongo document."""
+
+    def __init__(self, initial=None, sid=None, expires_at=None, new=False):
+        def on_update(self):
+            self.modified = True
+
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.new = new
+        self.modified = False
+
+
+class MongoSessionInterface(SessionInterface):
+    """
+    Store sessions in a Mongo collection with a TTL index on ``expires_at``.
+
+    Mongo removes expired documents itself, so nothing grows without bound.
+    Reads go through a short-lived per-process cache, and a request that
+    neither changed the session nor needs its expiry extended writes nothing.
+    The expiry slides forward once less than half of the lifetime remains.
+    """
+
+    def __init__(self, collection_name='sessions', cache_ttl=5):
+        self.collection_name = collection_name
+        self.cache_ttl = cache_ttl
+        self.cache = SingleFlightCache(default_ttl=cache_ttl)
+        self._collection = None
+
+    @property
+    def collection(self):
+        # Resolved lazily because the app connects to Mongo after installing the interface
+        if self._collection is None:
+            collection = get_db()[self.collection_name]
+            collection.create_index('expires_at', expireAfterSeconds=0)
+            self._collection = collection
+        return self._collection
+
+    def _load(self, sid):
+        return self.collection.find_one({'_id': sid}, {'data': 1, 'expires_at': 1})
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            if self.cache_ttl:
+                record = self.cache.get_or_load(('session', sid), lambda: self._load(sid))
+            else:
+                record = self._load(sid)
+            # The TTL monitor runs about once a minute, so check expiry here too
+            if record and record['expires_at'] > datetime.utcnow():
+                return MongoSession(dict(record.get('data') or {}), sid=sid, expires_at=record['expires_at'])
+        return MongoSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified:
+                # The session was cleared, e.g. on logout
+                if not session.new:
+                    self.collection.delete_one({'_id': session.sid})
+                    self.cache.invalidate(('session', session.sid))
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        now = datetime.utcnow()
+        lifetime = app.permanent_session_lifetime
+        needs_refresh = session.expires_at is None or session.expires_at - now < lifetime / 2
+        if not session.modified and not needs_refresh:
+            return
+
+        expires_at = now + lifetime
+        self.collection.replace_one(
+            {'_id': session.sid},
+            {'data': dict(session), 'expires_at': expires_at},
+            upsert=True
+        )
+        self.cache.invalidate(('session', session.sid))
+
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=expires_at if session.permanent else None,
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
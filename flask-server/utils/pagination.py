@@ -0,0 +1,99 @@
+import base64
+import json
+import datetime
+from flask import jsonify
+from bson import ObjectId
+from mongoengine.queryset.visitor import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Parse the ``limit`` query parameter, clamped to ``maximum``."""
+    if value in (None, ''):
+        return default
+    limit = int(value)
+    if limit < 1:
+        raise ValueError('limit must be a positive integer')
+    return min(limit, maximum)
+
+
+def request_limit(args):
+    """
+    Page size requested by ``args``, or None for the whole listing.
+
+    Clients that send neither ``limit`` nor ``cursor`` predate pagination and
+    do not follow ``X-Next-Cursor``, so they get every item.
+    """
+    if args.get('limit') in (None, '') and not args.get('cursor'):
+        return None
+    return parse_limit(args.get('limit'))
+
+
+def encode_cursor(value, doc_id):
+    """Encode the sort key of the last returned document as an opaque cursor."""
+    if isinstance(value, datetime.datetime):
+        payload = {'t': 'dt', 'v': value.isoformat()}
+    else:
+        payload = {'t': 'raw', 'v': value}
+    payload['id'] = str(doc_id)
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by ``encode_cursor`` into ``(value, ObjectId)``."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        value = payload['v']
+        if payload.get('t') == 'dt':
+            value = datetime.datetime.fromisoformat(value)
+        return value, ObjectId(payload['id'])
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def keyset_page(queryset, sort_field, descending=True, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Return one page of ``queryset`` ordered by ``(sort_field, id)``.
+
+    The cursor carries the sort key of the last document of the previous page,
+    so each page is a bounded index range scan instead of a growing skip().
+    A ``limit`` of None returns every remaining document as one page.
+
+    Returns:
+        tuple: (list of documents, next cursor or None)
+    """
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        op = 'lt' if descending else 'gt'
+        queryset = queryset.filter(
+            Q(**{f'{sort_field}__{op}': value}) |
+            Q(**{sort_field: value, f'id__{op}': last_id})
+        )
+
+    prefix = '-' if descending else '+'
+    queryset = queryset.order_by(f'{prefix}{sort_field}', f'{prefix}id')
+    if limit is None:
+        return list(queryset), None
+
+    # Fetch one extra document to learn whether another page exists
+    docs = list(queryset.limit(limit + 1))
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(getattr(last, sort_field), last.id)
+
+    return docs, next_cursor
+
+
+def paginated_response(items, next_cursor):
+    """Build a JSON array response with the next cursor exposed as a header."""
+    response = jsonify(items)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
@@ -0,0 +1,315 @@
+import fcntl
+import logging
+import multiprocessing
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from bson import ObjectId
+from models.submission import Submission
+from utils.cache import SingleFlightCache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Extractions running at once on this node, across every worker process
+PROCESSING_CONCURRENCY = int(os.getenv('PROCESSING_CONCURRENCY', str(max((os.cpu_count() or 2) // 2, 1))))
+# Lock files backing the node's extraction slots; must be local to the node
+PROCESSING_SLOT_DIR = os.getenv(
+    'PROCESSING_SLOT_DIR', os.path.join(tempfile.gettempdir(), 'assignment_checker_slots')
+)
+# A job is ordered as if it was queued one second later per this many bytes, so
+# small typed PDFs overtake long scans, and a scan still runs once it has waited long enough
+PRIORITY_BYTES_PER_SECOND = int(os.getenv('PROCESSING_PRIORITY_BYTES_PER_SECOND', str(256 * 1024)))
+# How often an idle worker looks for work queued by other processes
+PROCESSING_POLL_INTERVAL = 2
+# Queue position and wait are shared by every poller of the same job for this long
+QUEUE_STATUS_TTL = 2
+# A claim held this long by a worker on another node is taken to be lost with it
+PROCESSING_CLAIM_TIMEOUT = timedelta(seconds=int(os.getenv('PROCESSING_CLAIM_TIMEOUT', '3600')))
+
+# Assumed until jobs have been timed, and for jobs of unknown size
+DEFAULT_BYTES_PER_SECOND = 512 * 1024
+DEFAULT_JOB_BYTES = 256 * 1024
+RATE_SMOOTHING = 0.2
+SLOT_RETRY_SECONDS = 0.05
+
+ClaimedJob = namedtuple('ClaimedJob', ['ids', 'assignment_id', 'batch', 'size', 'queued_at'])
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class NodeSlots:
+    """
+    Counting semaphore shared by every process on the node.
+
+    Each slot is an flock()ed file. The kernel drops a process's locks when
+    it exits, so a worker that crashes or is restarted mid-job cannot leak
+    a slot.
+    """
+
+    def __init__(self, count, directory=PROCESSING_SLOT_DIR):
+        self.count = max(count, 1)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def try_acquire(self):
+        """Take a free slot and return its handle, or None if every slot is taken."""
+        for index in range(self.count):
+            fd = os.open(os.path.join(self.directory, f'slot-{index}.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                os.close(fd)
+        return None
+
+    def acquire(self, timeout):
+        """Wait up to ``timeout`` seconds for a slot; None if none came free."""
+        deadline = time.monotonic() + timeout
+        while True:
+            fd = self.try_acquire()
+            if fd is not None or time.monotonic() >= deadline:
+                return fd
+            time.sleep(SLOT_RETRY_SECONDS)
+
+    def release(self, fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+class ProcessingScheduler:
+    """
+    Durable priority queue with node-wide admission control for processing jobs.
+
+    Queued work lives on the submissions themselves (``processing_queue``),
+    so every worker sees the same queue; uploads never wait or fail, work
+    just stays queued. Each worker process runs a dispatcher that takes a
+    node slot, then claims the job with the lowest priority key, which is
+    its queue time plus its size divided by ``priority_rate``. A batch is
+    one queue entry carried by its first submission; it extracts with more
+    threads only when it can borrow idle slots.
+
+    A claim marks the entry with its owner (host and pid) and time, and
+    the entry is removed only once the job has run. When a dispatcher
+    starts, it puts back claims whose owner on this node has exited and
+    claims older than ``claim_timeout`` from other nodes, so a worker that
+    dies mid-job delays its work instead of losing it.
+    """
+
+    def __init__(self, runner, concurrency=PROCESSING_CONCURRENCY, priority_rate=PRIORITY_BYTES_PER_SECOND,
+                 poll_interval=PROCESSING_POLL_INTERVAL, slot_dir=PROCESSING_SLOT_DIR,
+                 claim_timeout=PROCESSING_CLAIM_TIMEOUT):
+        self.runner = runner
+        self.slots = NodeSlots(concurrency, slot_dir)
+        self.concurrency = self.slots.count
+        self.priority_rate = priority_rate
+        self.poll_interval = poll_interval
+        self.claim_timeout = claim_timeout
+        self.host = socket.gethostname()
+        # Seconds per byte, smoothed over recent jobs; created before gunicorn
+        # forks the preloaded app, so the workers share it
+        self._seconds_per_byte = multiprocessing.Value('d', 1.0 / DEFAULT_BYTES_PER_SECOND)
+        self._status_cache = SingleFlightCache(default_ttl=QUEUE_STATUS_TTL)
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def start(self):
+        """Start the dispatcher thread in this process unless it is already running."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            # Threads do not survive fork, so each worker process starts its own
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._dispatch, name='processing-dispatcher', daemon=True).start()
+
+    def enqueue(self, submission_ids, size, batch=False):
+        """
+        Queue submissions for processing.
+
+        Args:
+            submission_ids: Submissions the job processes
+            size: Bytes the job extracts, or None if unknown
+            batch: Process the submissions together as one job
+        """
+        now = datetime.utcnow()
+        size = size or DEFAULT_JOB_BYTES
+        entry = {'priority': time.time() + size / self.priority_rate, 'bytes': size, 'queued_at': now}
+        collection = Submission._get_collection()
+        ids = [ObjectId(str(submission_id)) for submission_id in submission_ids]
+        head, members = ids[0], (ids[1:] if batch else [])
+        if members:
+            # Members first, so a claimed head always finds its whole batch
+            entry['batch'] = uuid.uuid4().hex
+            collection.update_many(
+                {'_id': {'$in': members}},
+                {'$set': {'processing_queue': {'batch': entry['batch'], 'queued_at': now}}}
+            )
+        collection.update_one({'_id': head}, {'$set': {'processing_queue': entry}})
+        self.start()
+        self._wake.set()
+
+    def queue_status(self, entry):
+        """
+        Queue depth, and the position and expected wait of the job with queue ``entry``.
+
+        The wait is the bytes queued ahead of the job at the measured
+        extraction rate, spread over the node's slots. A job no longer in
+        the queue gets no position and the wait of the whole queue.
+        """
+        priority = self._priority_of(entry or {})
+        depth, queued_bytes = self._status_cache.get_or_load(('ahead', None), lambda: self._ahead(None))
+        if priority is None:
+            position, ahead_bytes = None, queued_bytes
+        else:
+            ahead_jobs, ahead_bytes = self._status_cache.get_or_load(
+                ('ahead', priority), lambda: self._ahead(priority)
+            )
+            position = ahead_jobs + 1
+        return {
+            'depth': depth,
+            'position': position,
+            'concurrency': self.concurrency,
+            'expected_wait_seconds': round(ahead_bytes * self._seconds_per_byte.value / self.concurrency, 1)
+        }
+
+    @contextmanager
+    def borrow_slots(self, count):
+        """Take up to ``count`` idle slots without waiting, yielding how many were taken."""
+        borrowed = []
+        try:
+            for _ in range(count):
+                fd = self.slots.try_acquire()
+                if fd is None:
+                    break
+                borrowed.append(fd)
+            yield len(borrowed)
+        finally:
+            for fd in borrowed:
+                self.slots.release(fd)
+
+    def _priority_of(self, entry):
+        if 'priority' in entry:
+            return entry['priority']
+        if 'batch' in entry:
+            head = Submission._get_collection().find_one(
+                {'processing_queue.batch': entry['batch'], 'processing_queue.priority': {'$exists': True}},
+                {'processing_queue.priority': 1}
+            )
+            return head['processing_queue']['priority'] if head else None
+        return None
+
+    def _ahead(self, priority):
+        """Jobs and bytes queued ahead of ``priority``, or in the whole queue for None."""
+        condition = {'$exists': True} if priority is None else {'$lt': priority}
+        result = list(Submission._get_collection().aggregate([
+            {'$match': {'processing_queue.priority': condition, 'processing_queue.claimed_by': {'$exists': False}}},
+            {'$group': {'_id': None, 'jobs': {'$sum': 1}, 'bytes': {'$sum': '$processing_queue.bytes'}}}
+        ]))
+        return (result[0]['jobs'], result[0]['bytes']) if result else (0, 0)
+
+    def _owner(self):
+        # Threads do not survive fork, so the pid identifies the dispatcher
+        return f"{self.host}:{os.getpid()}"
+
+    def _claim(self):
+        """Claim the highest-priority unclaimed job, or return None if there is none."""
+        collection = Submission._get_collection()
+        claim = {'processing_queue.claimed_by': self._owner(), 'processing_queue.claimed_at': datetime.utcnow()}
+        # Claimed entries are at most a few per node, so they are filtered after the priority index
+        head = collection.find_one_and_update(
+            {'processing_queue.priority': {'$exists': True}, 'processing_queue.claimed_by': {'$exists': False}},
+            {'$set': claim},
+            sort=[('processing_queue.priority', 1)],
+            projection={'assignment': 1, 'processing_queue': 1}
+        )
+        if head is None:
+            return None
+        entry = head['processing_queue']
+        ids = [head['_id']]
+        if 'batch' in entry:
+            members = {'processing_queue.batch': entry['batch'], '_id': {'$ne': head['_id']}}
+            ids += [doc['_id'] for doc in collection.find(members, {'_id': 1})]
+            collection.update_many(members, {'$set': claim})
+        return ClaimedJob(ids, head['assignment'], 'batch' in entry, entry['bytes'], entry['queued_at'])
+
+    def _complete(self, job):
+        """Take a job that has run off the queue."""
+        # Only this claim: a submission uploaded again meanwhile has a new, unclaimed entry
+        Submission._get_collection().update_many(
+            {'_id': {'$in': job.ids}, 'processing_queue.claimed_by': self._owner()},
+            {'$unset': {'processing_queue': ''}}
+        )
+
+    def _requeue_stale(self):
+        """Put back claims of exited workers on this node and of timed-out workers elsewhere."""
+        collection = Submission._get_collection()
+        claimed = {'processing_queue.claimed_at': {'$exists': True}}
+        dead = [
+            owner for owner in collection.distinct('processing_queue.claimed_by', claimed)
+            if owner.rpartition(':')[0] == self.host and not _pid_alive(int(owner.rpartition(':')[2]))
+        ]
+        stale = {'$or': [
+            {**claimed, 'processing_queue.claimed_by': {'$in': dead}},
+            {'processing_queue.claimed_at': {'$lt': datetime.utcnow() - self.claim_timeout}}
+        ]}
+        collection.update_many({**stale, 'processing_status': 'Processing'}, {'$set': {'processing_status': 'Pending'}})
+        result = collection.update_many(
+            stale, {'$unset': {'processing_queue.claimed_by': '', 'processing_queue.claimed_at': ''}}
+        )
+        if result.modified_count:
+            logger.warning(f"Requeued {result.modified_count} submissions claimed by lost workers")
+
+    def _dispatch(self):
+        try:
+            self._requeue_stale()
+        except Exception as e:
+            logger.error(f"Error requeuing stale processing claims: {str(e)}")
+        while True:
+            slot = self.slots.acquire(self.poll_interval)
+            if slot is None:
+                continue
+            try:
+                job = self._claim()
+            except Exception as e:
+                logger.error(f"Error claiming processing job: {str(e)}")
+                job = None
+            if job is None:
+                self.slots.release(slot)
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            threading.Thread(target=self._run, args=(job, slot)).start()
+
+    def _run(self, job, slot):
+        started = time.monotonic()
+        try:
+            self.runner(job)
+        except Exception as e:
+            logger.error(f"Processing job failed: {str(e)}")
+        finally:
+            try:
+                self._complete(job)
+            except Exception as e:
+                logger.error(f"Error completing processing job: {str(e)}")
+            self.slots.release(slot)
+            observed = (time.monotonic() - started) / job.size
+            with self._seconds_per_byte.get_lock():
+                self._seconds_per_byte.value += RATE_SMOOTHING * (observed - self._seconds_per_byte.value)
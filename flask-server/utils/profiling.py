@@ -0,0 +1,241 @@
+import cProfile
+import hmac
+import logging
+import marshal
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from bson import ObjectId
+from flask import g, request, current_app
+from models.profile import Profile
+from models.profiler_settings import ProfilerSettings
+from utils.cache import SingleFlightCache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ('sample', 'cprofile')
+SAMPLE_INTERVAL = 0.005  # Seconds between stack samples
+MAX_STACK_DEPTH = 128
+PROFILE_RETENTION = 200  # Most recent profiles kept; older ones are deleted with their output
+SETTINGS_TTL = 5  # Seconds a worker reuses the shared settings
+
+settings_cache = SingleFlightCache(default_ttl=SETTINGS_TTL)
+
+
+def _load_settings():
+    settings = ProfilerSettings.objects(key='default').first()
+    if not settings or not settings.is_active():
+        return None
+    return {
+        'mode': settings.mode,
+        'request_rate': settings.request_rate,
+        'job_rate': settings.job_rate,
+        'endpoints': frozenset(settings.endpoints),
+        'expires_at': settings.expires_at
+    }
+
+
+def active_settings():
+    """Return the profiler settings if profiling is on, else None."""
+    try:
+        settings = settings_cache.get_or_load(('profiler',), _load_settings)
+    except Exception as e:
+        logger.error(f"Error loading profiler settings: {str(e)}")
+        return None
+    # Expiry is rechecked because the cached copy can outlive it
+    if settings and settings['expires_at'] and settings['expires_at'] <= datetime.utcnow():
+        return None
+    return settings
+
+
+def invalidate_settings():
+    settings_cache.invalidate(('profiler',))
+
+
+class StackSampler:
+    """Sample one thread's stack on a timer and count collapsed stacks."""
+
+    content_type = 'text/plain'
+    extension = 'collapsed'
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.counts[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def output(self):
+        """Collapsed stacks, one ``frame;frame;frame count`` line each, for flame graph tools."""
+        return '\n'.join(f"{stack} {count}" for stack, count in self.counts.most_common()).encode('utf-8')
+
+
+class DeterministicProfiler:
+    """cProfile the current thread and export pstats data."""
+
+    content_type = 'application/octet-stream'
+    extension = 'pstats'
+    samples = None
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def output(self):
+        # pstats files are the marshalled stats dict, loadable with pstats.Stats(path)
+        self.profile.create_stats()
+        return marshal.dumps(self.profile.stats)
+
+
+class ProfileRun:
+    """A profiler attached to one request or job."""
+
+    def __init__(self, kind, target, label, mode):
+        self.id = ObjectId()
+        self.kind = kind
+        self.target = target
+        self.label = label
+        self.mode = mode
+        if mode == 'cprofile':
+            self.recorder = DeterministicProfiler()
+        else:
+            self.recorder = StackSampler(threading.get_ident())
+        self.started = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.recorder.start()
+
+    def finish(self):
+        """Stop recording and store the output from a background thread."""
+        self.recorder.stop()
+        duration = time.perf_counter() - self.started
+        threading.Thread(target=self._store, args=(duration,), daemon=True).start()
+
+    def _store(self, duration):
+        try:
+            profile = Profile(
+                id=self.id,
+                kind=self.kind,
+                target=self.target,
+                label=self.label,
+                mode=self.mode,
+                duration=round(duration, 4),
+                samples=self.recorder.samples
+            )
+            profile.output.put(
+                self.recorder.output(),
+                content_type=self.recorder.content_type,
+                filename=f"{self.id}.{self.recorder.extension}"
+            )
+            profile.save(force_insert=True)
+            prune_profiles()
+        except Exception as e:
+            logger.error(f"Error storing profile {self.id}: {str(e)}")
+
+
+def start_profile(kind, target, label=None, mode='sample'):
+    """Start profiling the current thread; returns None if it cannot be profiled."""
+    run = ProfileRun(kind, target, label, mode if mode in PROFILE_MODES else 'sample')
+    try:
+        run.start()
+    except ValueError as e:
+        # Only one cProfile can be active per interpreter on newer Pythons
+        logger.warning(f"Skipping profile of {kind} {target}: {str(e)}")
+        return None
+    return run
+
+
+def prune_profiles(keep=PROFILE_RETENTION):
+    """Delete profiles beyond the newest ``keep``, with their GridFS output."""
+    for profile in Profile.objects.order_by('-created_at').skip(keep).only('id', 'output'):
+        profile.output.delete()
+        profile.delete()
+
+
+@contextmanager
+def profile_job(kind, label=None):
+    """Profile a processing job when job sampling is on; a no-op otherwise."""
+    settings = active_settings()
+    if not settings or random.random() >= settings['job_rate']:
+        yield None
+        return
+
+    run = start_profile('job', kind, label, settings['mode'])
+    try:
+        yield run
+    finally:
+        if run:
+            run.finish()
+
+
+def init_profiling(app):
+    """
+    Profile sampled requests.
+
+    A request is profiled when the shared settings sample it, or when it
+    carries ``X-Profile-Token`` matching ``PROFILER_TOKEN`` (mode chosen with
+    ``X-Profile-Mode``). The profile id is returned in ``X-Profile-Id``.
+    """
+
+    @app.before_request
+    def start_request_profile():
+        token = current_app.config.get('PROFILER_TOKEN')
+        forced = request.headers.get('X-Profile-Token')
+        if token and forced and hmac.compare_digest(forced, token):
+            mode = request.headers.get('X-Profile-Mode', 'sample')
+        else:
+            settings = active_settings()
+            if not settings or random.random() >= settings['request_rate']:
+                return
+            if settings['endpoints'] and request.endpoint not in settings['endpoints']:
+                return
+            mode = settings['mode']
+
+        g._profile = start_profile('request', request.endpoint or 'unknown', f"{request.method} {request.path}", mode)
+
+    @app.after_request
+    def add_profile_header(response):
+        run = g.get('_profile')
+        if run:
+            response.headers['X-Profile-Id'] = str(run.id)
+        return response
+
+    @app.teardown_request
+    def finish_request_profile(exc):
+        run = g.pop('_profile', None)
+        if run:
+            run.finish()
@@ -0,0 +1,160 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+from datetime import datetime
+from flask import g, request, session
+
+# Records waiting for the writer thread; beyond this they are dropped, not blocked on
+LOG_QUEUE_SIZE = 10000
+
+_listener = None
+_settings = None
+
+
+class lazy:
+    """
+    A log field computed only when the record is written.
+
+    The callable runs on the writer thread, so it must not touch the
+    request context; capture plain values instead.
+    """
+
+    __slots__ = ('fn',)
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def __str__(self):
+        return str(self.fn())
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as one JSON object with any ``fields`` passed via ``extra``."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.utcfromtimestamp(record.created).isoformat(timespec='milliseconds') + 'Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        for key, value in getattr(record, 'fields', {}).items():
+            entry[key] = value.fn() if isinstance(value, lazy) else value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Hand records to the writer thread without formatting them or ever blocking."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # The stock handler formats here, on the caller's thread; the writer does it instead
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(level=logging.INFO, stream=None, queue_size=LOG_QUEUE_SIZE):
+    """
+    Route every logger through a bounded queue to one JSON writer thread.
+
+    Replaces the handlers installed by the modules' ``basicConfig`` calls.
+    Returns the queue handler so callers can read its drop count.
+    """
+    global _listener, _settings
+    _settings = (level, stream, queue_size)
+
+    writer = logging.StreamHandler(stream or sys.stderr)
+    writer.setFormatter(JsonFormatter())
+
+    handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    stop_logging()
+    _listener = logging.handlers.QueueListener(handler.queue, writer, respect_handler_level=True)
+    _listener.start()
+    return handler
+
+
+def stop_logging():
+    """Write out queued records and stop the writer thread."""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_after_fork():
+    # The writer thread does not survive fork (gunicorn preloads the app), and
+    # the inherited queue may hold a lock taken mid-fork, so build a fresh pair
+    global _listener
+    if _listener:
+        _listener = None
+        configure_logging(*_settings)
+
+
+atexit.register(stop_logging)
+os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def init_request_logging(app, logger_name='requests'):
+    """
+    Write one structured access log line per sampled request.
+
+    ``REQUEST_LOG_SAMPLE_RATE`` is the default fraction of requests logged
+    and ``REQUEST_LOG_ROUTE_RATES`` overrides it per endpoint. Server errors
+    and requests slower than ``REQUEST_LOG_SLOW_MS`` are always logged. The
+    sampling decision comes first, so unsampled requests build no record.
+    """
+    access_logger = logging.getLogger(logger_name)
+    default_rate = app.config.get('REQUEST_LOG_SAMPLE_RATE', 1.0)
+    route_rates = app.config.get('REQUEST_LOG_ROUTE_RATES', {})
+    slow_ms = app.config.get('REQUEST_LOG_SLOW_MS', 1000)
+
+    @app.before_request
+    def start_request_timer():
+        g._request_started = time.perf_counter()
+
+    @app.after_request
+    def log_request(response):
+        started = g.get('_request_started')
+        if started is None:
+            return response
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        rate = route_rates.get(request.endpoint, default_rate)
+        if response.status_code < 500 and duration_ms < slow_ms:
+            if rate <= 0:
+                return response
+            if rate < 1 and random.random() >= rate:
+                return response
+
+        access_logger.info('request', extra={'fields': {
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 2),
+            'user_id': session.get('user_id'),
+            'sample_rate': rate
+        }})
+        return response
@@ -0,0 +1,83 @@
+from bson import ObjectId
+from models.user import User
+from models.assignment import Assignment
+from models.submission import Submission
+
+
+def student_assignments_pipeline(student_id):
+    """Stages that attach the student's submission and the professor's name to each assignment."""
+    return [
+        # The literal student match uses the (student, assignment) index on any server version;
+        # $expr then narrows that student's few submissions down to this assignment
+        {'$lookup': {
+            'from': Submission._get_collection_name(),
+            'let': {'assignment_id': '$_id'},
+            'pipeline': [
+                {'$match': {'student': student_id, '$expr': {'$eq': ['$assignment', '$$assignment_id']}}},
+                {'$project': {'_id': 0, 'status': 1, 'grade': 1, 'submitted_at': 1}},
+                {'$limit': 1}
+            ],
+            'as': 'submission'
+        }},
+        {'$lookup': {
+            'from': User._get_collection_name(),
+            'localField': 'professor',
+            'foreignField': '_id',
+            'as': 'professor_user'
+        }},
+        {'$project': {
+            'name': 1,
+            'course': 1,
+            'description': 1,
+            'due_date': 1,
+            'sections': 1,
+            'professor': 1,
+            'created_at': 1,
+            'is_active': 1,
+            'has_file': {'$gt': ['$question_file', None]},
+            'first_name': {'$arrayElemAt': ['$professor_user.first_name', 0]},
+            'last_name': {'$arrayElemAt': ['$professor_user.last_name', 0]},
+            'submission': {'$arrayElemAt': ['$submission', 0]}
+        }}
+    ]
+
+
+def _listing_json(doc):
+    """Shape an aggregated assignment like Assignment.to_json plus the student's submission state."""
+    submission = doc.get('submission')
+    return {
+        "id": str(doc['_id']),
+        "name": doc['name'],
+        "course": doc['course'],
+        "description": doc['description'],
+        "due_date": doc['due_date'].isoformat(),
+        "sections": doc['sections'],
+        "has_file": doc['has_file'],
+        "status": submission['status'] if submission else 'Not Started',
+        "professor_id": str(doc['professor']),
+        "professor_name": f"{doc.get('first_name', '')} {doc.get('last_name', '')}",
+        "created_at": doc['created_at'].isoformat(),
+        "is_active": doc['is_active'],
+        "grade": submission.get('grade') if submission else None,
+        "submitted_at": submission['submitted_at'].isoformat() if submission and submission.get('submitted_at') else None
+    }
+
+
+def section_assignments(section):
+    """Active assignments open to ``section``, newest first."""
+    return Assignment.objects(sections=section, is_active=True).order_by('-created_at', '-id')
+
+
+def student_assignments(student_id, section):
+    """
+    Active assignments open to a section, newest first, each with the student's submission state.
+
+    One aggregation round trip: the multikey (sections, is_active,
+    -created_at, -id) index selects and orders the section's assignments,
+    and lookups attach the student's submission and the professor's name,
+    so the cost follows the section's workload, not the whole institution.
+    """
+    if not section:
+        return []
+    docs = section_assignments(section).aggregate(student_assignments_pipeline(ObjectId(student_id)))
+    return [_listing_json(doc) for doc in docs]
@@ -0,0 +1,115 @@
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Pipeline stages in the order a submission goes through them
+TIMELINE_STAGES = ('queue', 'extraction', 'comparison', 'save')
+
+# Percentiles reported by the aggregate endpoint
+TIMELINE_PERCENTILES = (50, 95, 99)
+
+
+class ProcessingTimeline:
+    """
+    Start and end times of each processing stage of one submission.
+
+    Each stage keeps its timestamps, its duration in seconds and any counters
+    recorded while it ran (pages, bytes, documents compared). ``to_dict``
+    gives the compact form stored on ``Submission.processing_timeline``.
+    """
+
+    def __init__(self, queued_at=None):
+        self.queued_at = queued_at or datetime.utcnow()
+        self.stages = {}
+
+    def record(self, name, start, end, **fields):
+        """Record a stage that has already finished."""
+        self.stages[name] = {
+            'start': start,
+            'end': end,
+            'seconds': round((end - start).total_seconds(), 4),
+            **fields
+        }
+        return self.stages[name]
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """Time the enclosed block as a stage; counters can be added to the yielded dict."""
+        entry = dict(fields)
+        start = datetime.utcnow()
+        try:
+            yield entry
+        except Exception:
+            entry['failed'] = True
+            raise
+        finally:
+            self.record(name, start, datetime.utcnow(), **entry)
+
+    def started(self):
+        """Close the queue stage when a worker picks the submission up."""
+        self.record('queue', self.queued_at, datetime.utcnow())
+
+    def copy_stage(self, other, name):
+        """Reuse a stage recorded on another timeline, e.g. a shared batch extraction."""
+        if name in other.stages:
+            self.stages[name] = dict(other.stages[name])
+
+    def to_dict(self):
+        finished_at = max((stage['end'] for stage in self.stages.values()), default=self.queued_at)
+        return {
+            'queued_at': self.queued_at,
+            'finished_at': finished_at,
+            'total_seconds': round((finished_at - self.queued_at).total_seconds(), 4),
+            'stages': self.stages
+        }
+
+
+def timeline_to_json(timeline):
+    """Render a stored timeline with ISO 8601 timestamps."""
+    if not timeline:
+        return None
+
+    def convert(value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        if isinstance(value, dict):
+            return {key: convert(item) for key, item in value.items()}
+        return value
+
+    return convert(timeline)
+
+
+def stage_percentiles(timelines, percentiles=TIMELINE_PERCENTILES):
+    """
+    Summarize stage durations across stored timelines.
+
+    Returns:
+        dict: stage -> {'count', 'p50', 'p95', 'p99', 'max'} in seconds, with
+        a ``total`` entry for end-to-end turnaround
+    """
+    durations = {}
+    for timeline in timelines:
+        for name, stage in (timeline.get('stages') or {}).items():
+            if 'seconds' in stage:
+                durations.setdefault(name, []).append(stage['seconds'])
+        if 'total_seconds' in timeline:
+            durations.setdefault('total', []).append(timeline['total_seconds'])
+
+    order = TIMELINE_STAGES + ('total',)
+    summary = {}
+    for name in sorted(durations, key=lambda n: order.index(n) if n in order else len(order)):
+        values = np.asarray(durations[name], dtype=float)
+        summary[name] = {
+            'count': int(values.size),
+            **{
+                f'p{p}': round(float(v), 4)
+                for p, v in zip(percentiles, np.percentile(values, percentiles))
+            },
+            'max': round(float(values.max()), 4)
+        }
+    return summary
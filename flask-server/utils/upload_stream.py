@@ -0,0 +1,111 @@
+import hashlib
+import logging
+import tempfile
+from collections import namedtuple
+from flask import Request, current_app
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PDF_MAGIC = b'%PDF-'
+DEFAULT_SPOOL_THRESHOLD = 512 * 1024  # Uploads larger than this are spooled to disk
+UPLOAD_CHUNK_SIZE = 255 * 1024  # Matches the GridFS chunk size
+
+StoredUpload = namedtuple('StoredUpload', ['sha256', 'size', 'replaced_grid_id'])
+
+
+class UploadRejected(Exception):
+    """Raised when an upload fails validation while it is being streamed."""
+
+
+def max_upload_size(config_key):
+    """Raise the request body limit of a view to the size in ``config_key``."""
+    def decorator(f):
+        f.max_content_length_key = config_key
+        return f
+    return decorator
+
+
+class SpooledUploadRequest(Request):
+    """Request whose multipart file parts stay in memory only up to a fixed size."""
+
+    @property
+    def max_content_length(self):
+        # Views decorated with max_upload_size may accept larger bodies
+        view = current_app.view_functions.get(self.endpoint) if self.endpoint else None
+        config_key = getattr(view, 'max_content_length_key', 'MAX_CONTENT_LENGTH')
+        return current_app.config.get(config_key)
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        threshold = current_app.config.get('UPLOAD_SPOOL_THRESHOLD', DEFAULT_SPOOL_THRESHOLD)
+        return tempfile.SpooledTemporaryFile(max_size=threshold, mode='w+b')
+
+
+def stream_to_gridfs(file_storage, file_proxy, filename, max_size, magic=PDF_MAGIC):
+    """
+    Copy an uploaded file into a FileField in one pass.
+
+    The upload is read in GridFS-chunk-sized pieces; the magic bytes are
+    checked on the first piece, and the SHA-256 and size are computed as the
+    chunks are written, so the file is never held in memory as a whole.
+    If the field already holds a file, the new one is written alongside it
+    and the old GridFS id is returned so the caller can delete it once the
+    document has been saved.
+
+    Args:
+        file_storage: Werkzeug FileStorage from request.files
+        file_proxy: GridFSProxy of the FileField to write to
+        filename (str): Sanitized filename to store
+        max_size (int): Maximum accepted size in bytes
+        magic (bytes): Required file signature
+
+    Returns:
+        StoredUpload: Content hash, size and the replaced GridFS id (or None)
+    """
+    stream = file_storage.stream
+    if hasattr(stream, 'seek'):
+        stream.seek(0)
+
+    first = stream.read(UPLOAD_CHUNK_SIZE)
+    if not first:
+        raise UploadRejected('File is empty')
+    if magic and not first.startswith(magic):
+        raise UploadRejected('File content is not a valid PDF')
+
+    replaced_grid_id = file_proxy.grid_id
+    file_proxy.new_file(filename=filename, content_type=file_storage.content_type)
+    # Drop any cached reader for the previous file
+    file_proxy.gridout = None
+
+    digest = hashlib.sha256()
+    size = 0
+    chunk = first
+    try:
+        while chunk:
+            size += len(chunk)
+            if size > max_size:
+                raise UploadRejected(f'File size exceeds {max_size // (1024 * 1024)}MB limit')
+            digest.update(chunk)
+            file_proxy.write(chunk)
+            chunk = stream.read(UPLOAD_CHUNK_SIZE)
+        file_proxy.close()
+    except Exception:
+        file_proxy.newfile.abort()
+        file_proxy.grid_id = replaced_grid_id
+        raise
+
+    return StoredUpload(digest.hexdigest(), size, replaced_grid_id)
+
+
+def hash_stream(stream, max_size):
+    """Compute the SHA-256 and size of a stream without keeping its content."""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b''):
+        size += len(chunk)
+        if size > max_size:
+            raise UploadRejected(f'File size exceeds {max_size // (1024 * 1024)}MB limit')
+        digest.update(chunk)
+    return digest.hexdigest(), size
+